@@ -3,69 +3,304 @@
 
 import threading
 import time
+from concurrent.futures import TimeoutError as FutureTimeout
 from typing import Dict
 from queue import Queue
-from flask import Flask, jsonify, request
+import numpy as np
+from flask import Flask, Response, jsonify, request
 
 from database import DatabaseHandler
 from monitor import SerialMonitor
+from reader import SerialReader
+from pipeline import IngestPipeline
 from queue_processor import CMORequest, QueueProcessor
-
-
-class SystemState:
-    """시스템 상태 관리"""
-    
-    def __init__(self):
-        self.device_id = ''
-        self.data_type = ''
-        self.metric_name = ''
-        self.value = ''
-        self.lock = threading.Lock()
-
-    def update(self, device_id:str, data_type: str, metric_name: str, value: str):
-        """상태 업데이트 """
-        with self.lock:
-            self.device_id = device_id
-            self.data_type = data_type
-            self.metric_name = metric_name
-            self.value = value
-
-    def to_dict(self):
-        """딕셔너리로 반환 """
-        with self.lock:
-            return {
-                'device_id': self.device_id,
-                'data_type': self.data_type,
-                'metric_name': self.metric_name,
-                'value': self.value
-            }
+from lanes import PRIORITIES
+from state_store import StateStore
+from journal import CursorTooOld, EventJournal
+from broadcast import SSEBroadcaster, format_event
+from history import DOWNSAMPLE_METHODS, build_series, parse_time, to_arrays
+from ring_buffer import RingBufferStore
+from storage import StorageError
 
 
 class SerialMonitorApp:
     """시리얼 모니터 애플리케이션"""
     
-    def __init__(self, db_config: dict, port_config: dict):
+    # wait=true 명령 결과 -> HTTP 상태 코드
+    RESULT_STATUS = {
+        'acked': 200,
+        'superseded': 409,  # 전송 전에 더 새로운 명령으로 대체됨
+        'send_failed': 502,
+        'rejected': 503,  # 서킷 브레이커 open
+        'timeout': 504,
+        'error': 500,
+    }
+    MAX_WAIT_MS = 60000
+    MAX_EVENTS = 1000  # /api/events 한 번에 반환할 최대 이벤트 수
+    STREAM_KEEPALIVE = 15.0  # /api/stream 유휴 시 keepalive 주석 간격 (초)
+    MAX_HISTORY_POINTS = 10000  # /api/history max_points 상한
+    HISTORY_RANGE = 3600  # /api/history from 생략 시 기본 조회 구간 (초)
+    # 요청 처리 스레드를 오래 점유하는 요청(wait=true / long-poll / SSE)은 종류별로 스레드의 1/HOLD_SHARE까지
+    # (셋을 합쳐도 나머지는 /api/state, /api/health 같은 일반 요청용으로 남음)
+    HOLD_SHARE = 4
+    SERVER_DEFAULTS = {
+        'mode': 'dev',
+        'host': '0.0.0.0',
+        'port': 5000,
+        'threads': 32,  # 요청 처리 스레드 (long-poll / SSE / wait=true 요청도 하나씩 점유)
+        'keepalive': 30,  # 유휴 keep-alive 연결 유지 시간 (초)
+        'backlog': 1024,  # 수락 대기 연결 수 (listen backlog)
+        'connection_limit': 1000,  # 동시 연결 수
+    }
+    
+    def __init__(self, db_config: dict, port_config: dict,
+                 ingest_workers: int = 2, ingest_queue_size: int = 1000,
+                 sen_policy: str = 'latest', sen_sample_rate: int = 10,
+                 dispatch_workers: int = 4, correlation_ids: bool = False,
+                 coalesce: bool = True, retries: int = 0, backoff_base: float = 0.5,
+                 failure_threshold: int = 3, open_seconds: float = 15.0,
+                 probe_commands: dict = None, max_waiters: int = None,
+                 priority_aging: float = 2.0, tx_byte_rate: float = None,
+                 tx_line_rate: float = 10.0, journal_size: int = 10000,
+                 stream_buffer: int = 256, server_config: dict = None,
+                 history_capacity: int = 86400, history_budget_mb: float = 64,
+                 guarded: list = None, max_pollers: int = None, max_streams: int = None):
         self.db_handler = DatabaseHandler(**db_config)
         self.port_config = port_config
         self.cmd_queue = Queue()
         self.monitors: Dict[str, SerialMonitor] = {}
         self.threads = []
         self.queue_processor = None
+        self.dispatch_workers = dispatch_workers
+        self.correlation_ids = correlation_ids
+        self.coalesce = coalesce
+        self.priority_aging = priority_aging
+        self.tx_config = {'tx_byte_rate': tx_byte_rate, 'tx_line_rate': tx_line_rate}
+        # REST API 서버 설정 (mode: dev = Werkzeug 개발 서버, production = waitress)
+        self.server_config = {**self.SERVER_DEFAULTS, **(server_config or {})}
+        self.http_server = None
+        self.http_running = False
+        # ACK 타임아웃 재전송 / 서킷 브레이커 설정 (QueueProcessor로 전달, guarded 대상에만 적용)
+        self.retry_config = {
+            'guarded': guarded or (),
+            'retries': retries,
+            'backoff_base': backoff_base,
+            'failure_threshold': failure_threshold,
+            'open_seconds': open_seconds,
+            'probe_commands': probe_commands,
+        }
+        self.reader = SerialReader()
         
-        # 시스템 상태
-        self.system_state = SystemState()
+        # 스레드를 점유한 채 기다리는 요청 수 제한 (종류별로 따로, 없으면 HTTP 스레드의 1/HOLD_SHARE)
+        self.waiters = threading.BoundedSemaphore(self._hold_limit('wait=true', max_waiters))  # ACK 대기
+        self.pollers = threading.BoundedSemaphore(self._hold_limit('long-poll', max_pollers))  # /api/state wait_ms
+        self.streams = threading.BoundedSemaphore(self._hold_limit('SSE', max_streams))  # /api/stream
+        
+        # 수신 프레임 파싱 / 저장 워커
+        self.ingest = IngestPipeline(
+            self.monitors, ingest_workers, ingest_queue_size,
+            sen_policy, sen_sample_rate
+        )
+        
+        # 디바이스 / metric별 최신 상태 (읽기는 lock 없는 스냅샷)
+        self.system_state = StateStore()
+        
+        # 수신 데이터 / CMO 이벤트 저널 (/api/events) + SSE 푸시 (/api/stream)
+        self.broadcaster = SSEBroadcaster(stream_buffer, stream_buffer // 2)
+        self.journal = EventJournal(journal_size, self.broadcaster)
+        
+        # metric별 최근 이력 (/api/history는 여기서 먼저 조회, 더 오래된 구간만 DB)
+        self.history = RingBufferStore(history_capacity, int(history_budget_mb * 1024 * 1024))
         
         # Flask 앱 생성
         self.flask_app = Flask(__name__)
         self._setup_routes()
     
+    def _hold_limit(self, name: str, requested: int = None) -> int:
+        """스레드를 점유하는 요청 종류별 동시 처리 수 (HTTP 스레드의 1/HOLD_SHARE를 넘지 않음)"""
+        threads = self.server_config['threads']
+        limit = max(1, threads // self.HOLD_SHARE)
+        if requested is None:
+            return limit
+        if requested > limit:
+            print(f"[WARNING] {name} 동시 요청 수 {requested} -> {limit} (HTTP 스레드 {threads}개의 1/{self.HOLD_SHARE})")
+            return limit
+        return max(1, requested)
+    
     def _setup_routes(self):
         """REST API 라우트 설정"""
         
         @self.flask_app.route('/api/state', methods=['GET'])
         def get_state():
-            """현재 시스템 상태 조회"""
-            return jsonify(self.system_state.to_dict())
+            """현재 시스템 상태 조회
+            
+            기존 필드(device_id, data_type, metric_name, value)는 가장 최근 업데이트,
+            devices에는 디바이스 / metric별 최신 값 (value, data_type, timestamp, seq)
+            
+            ETag는 상태 버전 - If-None-Match가 현재 버전이면 304 (본문 없음)
+            wait_ms를 주면 If-None-Match 버전이 바뀔 때까지 최대 wait_ms 대기 (long-poll)
+            """
+            snapshot = self.system_state.snapshot()
+            wait_ms = min(max(request.args.get('wait_ms', 0, type=int), 0), self.MAX_WAIT_MS)
+            
+            if wait_ms and request.if_none_match.contains(snapshot.etag):
+                # 대기 요청 수 제한을 넘으면 기다리지 않고 바로 304
+                if self.pollers.acquire(blocking=False):
+                    try:
+                        snapshot = self.system_state.wait_for_change(snapshot.version, wait_ms / 1000)
+                    finally:
+                        self.pollers.release()
+            
+            headers = {'ETag': f'"{snapshot.etag}"', 'Cache-Control': 'no-cache'}
+            if request.if_none_match.contains(snapshot.etag):
+                return Response(status=304, headers=headers)
+            return Response(snapshot.to_json(), mimetype='application/json', headers=headers)
+        
+        @self.flask_app.route('/api/events', methods=['GET'])
+        def get_events():
+            """커서 이후 이벤트 조회
+            
+            쿼리: since (마지막으로 받은 seq, 없으면 남아 있는 가장 오래된 이벤트부터),
+                  limit (기본 100, 최대 MAX_EVENTS)
+            응답: events, next (다음 요청의 since), latest, more (남은 이벤트 여부)
+            since 이후 이벤트가 이미 밀려났으면 410 - /api/state로 다시 맞춘 뒤 latest부터 조회
+            """
+            since = request.args.get('since', type=int)
+            limit = min(max(request.args.get('limit', 100, type=int), 1), self.MAX_EVENTS)
+            
+            try:
+                events = self.journal.read(since, limit)
+            except CursorTooOld as e:
+                return jsonify({
+                    'success': False,
+                    'error': 'cursor too old',
+                    'oldest': e.oldest,
+                    'latest': e.latest
+                }), 410
+            
+            latest = self.journal.latest()
+            next_cursor = events[-1]['seq'] if events else (latest if since is None else since)
+            return jsonify({
+                'events': events,
+                'next': next_cursor,
+                'latest': latest,
+                'more': next_cursor < latest
+            })
+        
+        @self.flask_app.route('/api/stream', methods=['GET'])
+        def stream_events():
+            """SSE 이벤트 스트림 (/api/events와 같은 이벤트를 수신 즉시 푸시)
+            
+            재연결 시 Last-Event-ID 헤더(또는 since 쿼리) 이후 이벤트를 저널에서 먼저 보냄
+            이어받을 수 없으면 reset 이벤트 - /api/state로 다시 맞춤
+            """
+            last_id = request.headers.get('Last-Event-ID', type=int)
+            if last_id is None:
+                last_id = request.args.get('since', type=int)
+            
+            if not self.streams.acquire(blocking=False):
+                return jsonify({
+                    'success': False,
+                    'error': 'Too many stream clients'
+                }), 503, {'Retry-After': '5'}
+            
+            # 구독 먼저 -> 저널 조회 (사이에 들어온 이벤트는 seq로 중복 제거)
+            subscriber = self.broadcaster.subscribe()
+            backlog, reset = [], False
+            if last_id is not None:
+                try:
+                    backlog = self.journal.read(last_id, self.journal.capacity)
+                except CursorTooOld:
+                    reset = True
+            
+            def generate():
+                # reset이면 클라이언트 커서는 무효 (서버 재시작 등) - 구독 이후 이벤트는 모두 전송
+                sent = 0 if reset else last_id or 0
+                try:
+                    yield b"retry: 2000\n\n"
+                    if reset:
+                        yield f"event: reset\ndata: {self.journal.latest()}\n\n".encode('utf-8')
+                    if backlog:
+                        yield b''.join(format_event(event) for event in backlog)
+                        sent = backlog[-1]['seq']
+                    
+                    while True:
+                        frames = subscriber.next_frames(self.STREAM_KEEPALIVE)
+                        if frames is None:
+                            break
+                        if not frames:
+                            yield b": keepalive\n\n"
+                            continue
+                        
+                        chunk = b''.join(frame for seq, frame in frames if seq > sent)
+                        sent = max(sent, frames[-1][0])
+                        if chunk:
+                            yield chunk
+                finally:
+                    self.broadcaster.unsubscribe(subscriber)
+            
+            response = Response(generate(), mimetype='text/event-stream',
+                                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+            
+            # 생성기가 시작되기 전에 연결이 끊겨도 정리되도록 응답 종료 시 구독 해제 / 자리 반환
+            def on_close():
+                self.broadcaster.unsubscribe(subscriber)
+                self.streams.release()
+            
+            response.call_on_close(on_close)
+            return response
+        
+        @self.flask_app.route('/api/history', methods=['GET'])
+        def get_history():
+            """metric 이력 조회 (서버 측 다운샘플링)
+            
+            쿼리: device_id, metric (필수), from / to (epoch 초 또는 ISO 8601, 기본 최근 1시간),
+                  max_points (기본 1000, 최대 MAX_HISTORY_POINTS),
+                  method (minmax: 구간별 min / max / avg / count, lttb: 모양 유지 점 선택)
+            응답은 열 단위 배열 - 원본이 max_points 이하면 t / value 그대로
+            source: memory (링 버퍼), db, memory+db (버퍼 이전 구간만 DB)
+            """
+            device_id = request.args.get('device_id')
+            metric_name = request.args.get('metric')
+            if not device_id or not metric_name:
+                return jsonify({
+                    'success': False,
+                    'error': 'Missing parameters: device_id, metric'
+                }), 400
+            
+            method = request.args.get('method', 'minmax')
+            if method not in DOWNSAMPLE_METHODS:
+                return jsonify({
+                    'success': False,
+                    'error': f'Invalid method: {method} (one of {", ".join(DOWNSAMPLE_METHODS)})'
+                }), 400
+            
+            try:
+                end = parse_time(request.args.get('to'))
+                start = parse_time(request.args.get('from'))
+            except (ValueError, OverflowError, OSError) as e:
+                return jsonify({'success': False, 'error': f'Invalid time: {e}'}), 400
+            if end is None:
+                end = time.time()
+            if start is None:
+                start = max(0.0, end - self.HISTORY_RANGE)
+            if start > end:
+                return jsonify({'success': False, 'error': 'Invalid time: from is after to'}), 400
+            max_points = min(max(request.args.get('max_points', 1000, type=int), 2), self.MAX_HISTORY_POINTS)
+            
+            try:
+                times, values, source = self._read_history(device_id, metric_name, start, end)
+            except StorageError as e:
+                return jsonify({'success': False, 'error': str(e)}), 503
+            
+            return jsonify({
+                'device_id': device_id,
+                'metric': metric_name,
+                'from': start,
+                'to': end,
+                'source': source,
+                **build_series(times, values, max_points, method)
+            })
         
         @self.flask_app.route('/api/command', methods=['POST'])
         def send_command():
@@ -75,8 +310,14 @@ class SerialMonitorApp:
             {
                 "device_id": "ele_001",  # 대상 디바이스
                 "metric_name": "FLOOR",  # 명령 종류
-                "value": "1"             # 값
+                "value": "1",            # 값
+                "priority": "critical",  # (선택) critical / interactive / background, 없으면 기본 규칙
+                "wait": true,            # (선택) ACK까지 대기 후 응답시간 반환
+                "timeout_ms": 5000       # (선택) 대기 시간 (0~60000), 기본은 명령 타임아웃
             }
+            wait / timeout_ms는 쿼리스트링으로도 지정 가능
+            wait=true 요청은 결과가 나올 때까지 HTTP 스레드 하나를 점유하므로
+            동시 대기 수는 max_waiters(기본: HTTP 스레드의 1/4, 32 스레드면 8)까지, 넘으면 503
             """
             try:
                 data = request.json
@@ -90,12 +331,46 @@ class SerialMonitorApp:
                         'error': 'Missing parameters: device_id, metric_name, value'
                     }), 400
                 
+                priority = data.get('priority')
+                if priority is not None and priority not in PRIORITIES:
+                    return jsonify({
+                        'success': False,
+                        'error': f'Invalid priority: {priority} (one of {", ".join(PRIORITIES)})'
+                    }), 400
+                
+                # 큐에 넣기 전에 검증 (잘못된 값이면 명령을 보내지 않음)
+                timeout_ms = data.get('timeout_ms', request.args.get('timeout_ms'))
+                if timeout_ms is not None:
+                    try:
+                        timeout_ms = min(max(int(timeout_ms), 0), self.MAX_WAIT_MS)
+                    except (TypeError, ValueError):
+                        return jsonify({
+                            'success': False,
+                            'error': f'Invalid timeout_ms: {timeout_ms}'
+                        }), 400
+                
                 if device_id not in self.monitors:
                     return jsonify({
                         'success': False,
                         'error': f'Device "{device_id}" not found'
                     }), 404
                 
+                # 응답 없는 디바이스는 큐에 넣지 않고 즉시 실패
+                if self.queue_processor and self.queue_processor.health.is_open(device_id):
+                    retry_after = self.queue_processor.health.retry_after(device_id)
+                    return jsonify({
+                        'success': False,
+                        'error': f'Device "{device_id}" is not responding',
+                        'retry_after': round(retry_after, 1)
+                    }), 503, {'Retry-After': str(max(1, round(retry_after)))}
+                
+                wait = str(data.get('wait', request.args.get('wait', ''))).lower() in ('1', 'true', 'yes')
+                if wait and not self.waiters.acquire(blocking=False):
+                    return jsonify({
+                        'success': False,
+                        'error': 'Too many requests waiting for ACK'
+                    }), 503
+                
                 # CMO 명령 생성
                 command = f"CMO,{metric_name},{value}"
 
@@ -103,8 +378,17 @@ class SerialMonitorApp:
                     device_id=device_id,
                     metric_name=metric_name,
                     value=value,
-                    command=command
+                    command=command,
+                    priority=priority
                 )
+                
+                if wait:
+                    try:
+                        self.cmd_queue.put(cmo)
+                        return self._wait_for_result(cmo, timeout_ms)
+                    finally:
+                        self.waiters.release()
+                
                 self.cmd_queue.put(cmo)
                 
                 print(f"[QUEUE] CMO 큐에 추가: {device_id} (명령: {command})")
@@ -127,9 +411,61 @@ class SerialMonitorApp:
             return jsonify({
                 'status': 'ok',
                 'devices': len(self.monitors),
-                'queue_size': self.cmd_queue.qsize()
+                'queue_size': self.cmd_queue.qsize(),
+                'lanes': self.queue_processor.lanes.stats() if self.queue_processor else {},
+                'priorities': self.queue_processor.lanes.priority_stats() if self.queue_processor else {},
+                'tx': {
+                    device_id: {
+                        **monitor.shaper.stats(),
+                        'writer': monitor.writer.stats() if monitor.writer else {}
+                    }
+                    for device_id, monitor in self.monitors.items()
+                },
+                'device_health': self.queue_processor.health.stats() if self.queue_processor else {},
+                'ingest': self.ingest.stats(),
+                'db': self.db_handler.stats(),
+                'journal': self.journal.stats(),
+                'history': self.history.stats(),
+                'stream': self.broadcaster.stats()
             })
     
+    def _read_history(self, device_id: str, metric_name: str, start: float, end: float):
+        """
+        [start, end] 구간 (시각, 값) 배열과 출처 (memory / db / memory+db)
+        링 버퍼에 남아 있는 구간은 메모리에서, 그보다 오래된 구간만 DB에서 조회
+        """
+        ring = self.history.get(device_id, metric_name)
+        times, values, oldest = ring.read(start, end) if ring else (None, None, None)
+        if oldest is None or oldest > end:
+            return (*to_arrays(self.db_handler.read_series(device_id, metric_name, start, end)), 'db')
+        
+        if start >= oldest:
+            return times, values, 'memory'
+        
+        # 버퍼 이전 구간 [start, oldest) - oldest 샘플은 버퍼에 있으므로 제외
+        old_times, old_values = to_arrays(
+            self.db_handler.read_series(device_id, metric_name, start, oldest, include_end=False)
+        )
+        return np.concatenate([old_times, times]), np.concatenate([old_values, values]), 'memory+db'
+    
+    def _wait_for_result(self, cmo: CMORequest, timeout_ms: int = None):
+        """명령 결과(ACK / 타임아웃 등)까지 대기 후 응답 생성 (timeout_ms는 검증된 값)"""
+        if timeout_ms is None:
+            timeout_ms = min(int(cmo.timeout * 1000), self.MAX_WAIT_MS)
+        
+        body = {'device_id': cmo.device_id, 'command': cmo.command}
+        try:
+            # ACK 처리 스레드가 future를 완료하면 바로 깨어남 (폴링 없음)
+            result = cmo.future.result(timeout=timeout_ms / 1000)
+        except FutureTimeout:
+            body.update({'success': False, 'status': 'pending',
+                         'error': f'No ACK within {timeout_ms}ms'})
+            return jsonify(body), 504
+        
+        body.update(result)
+        body['success'] = result['status'] == 'acked'
+        return jsonify(body), self.RESULT_STATUS.get(result['status'], 500)
+    
     def start(self) -> bool:
         """애플리케이션 시작"""
         print("=" * 60)
@@ -147,6 +483,9 @@ class SerialMonitorApp:
             self.db_handler.close()
             return False
         
+        # 파싱 / 저장 워커 시작
+        self.ingest.start()
+        
         # 모니터 스레드 시작
         self._start_monitor_threads()
         
@@ -157,21 +496,29 @@ class SerialMonitorApp:
         self._start_flask_server()
         
         print(f"\n[✓] {len(self.monitors)}개 포트 모니터링 중")
-        print("[✓] REST API 서버 실행 중 (http://localhost:5000)\n")
+        print(f"[✓] REST API 서버 실행 중 (http://localhost:{self.server_config['port']}, {self.server_config['mode']})\n")
         return True
     
     def _setup_monitors(self):
         """모니터 설정"""
         for device_id, port in self.port_config.items():
-            monitor = SerialMonitor(device_id, port, self.cmd_queue, self.db_handler)
+            monitor = SerialMonitor(device_id, port, self.cmd_queue, self.db_handler,
+                                    **self.tx_config)
             monitor.available_devices = list(self.port_config.keys())
             monitor.system_state = self.system_state  # 상태 관리 객체 할당
+            monitor.pipeline = self.ingest
+            monitor.journal = self.journal
+            monitor.history = self.history
             if monitor.connect():
                 self.monitors[device_id] = monitor
     
     def _start_monitor_threads(self):
-        """모니터 스레드 시작"""
+        """모니터 스레드 시작 - 모든 포트를 하나의 리더 스레드에서 처리"""
         for device_id, monitor in self.monitors.items():
+            if self.reader.register(monitor):
+                continue
+            
+            # fileno 미지원 포트는 개별 스레드로 처리
             thread = threading.Thread(
                 target=monitor.run,
                 daemon=True,
@@ -179,11 +526,23 @@ class SerialMonitorApp:
             )
             thread.start()
             self.threads.append(thread)
+        
+        thread = threading.Thread(
+            target=self.reader.run,
+            daemon=True,
+            name="SerialReader"
+        )
+        thread.start()
+        self.threads.append(thread)
     
     def _start_queue_processor(self):
         """큐 처리 스레드 시작"""
-        self.queue_processor = QueueProcessor(self.cmd_queue, self.monitors)
+        self.queue_processor = QueueProcessor(self.cmd_queue, self.monitors,
+                                              self.dispatch_workers, self.correlation_ids,
+                                              self.coalesce, priority_aging=self.priority_aging,
+                                              **self.retry_config)
         
+        self.queue_processor.journal = self.journal
         for monitor in self.monitors.values():
             monitor.queue_processor = self.queue_processor
         
@@ -197,6 +556,7 @@ class SerialMonitorApp:
     
     def _start_flask_server(self):
         """Flask API 서버 시작"""
+        self.http_running = True
         flask_thread = threading.Thread(
             target=self._run_flask,
             daemon=True,
@@ -208,7 +568,48 @@ class SerialMonitorApp:
     
     def _run_flask(self):
         """Flask 서버 실행"""
-        self.flask_app.run(host='0.0.0.0', port=5000, debug=False, use_reloader=False)
+        config = self.server_config
+        if config['mode'] == 'production':
+            self.http_server = self._create_production_server()
+            if self.http_server:
+                self._serve_production(self.http_server)
+                return
+        
+        self.flask_app.run(host=config['host'], port=config['port'], debug=False,
+                           use_reloader=False, threaded=True)
+    
+    def _create_production_server(self):
+        """waitress WSGI 서버 생성 (설치되어 있지 않으면 None - 개발 서버로 실행)"""
+        try:
+            from waitress import create_server
+        except ImportError:
+            print("[WARNING] waitress가 설치되어 있지 않아 개발 서버로 실행합니다 (pip install waitress)")
+            return None
+        
+        config = self.server_config
+        return create_server(
+            self.flask_app,
+            host=config['host'],
+            port=config['port'],
+            threads=config['threads'],
+            channel_timeout=config['keepalive'],
+            backlog=config['backlog'],
+            connection_limit=config['connection_limit'],
+            ident='iot-serial-monitor',
+        )
+    
+    def _serve_production(self, server):
+        """
+        waitress 이벤트 루프 (http_running이 False가 되면 종료)
+        server.close()를 다른 스레드에서 부르면 루프가 닫힌 소켓을 select해 EBADF가 나므로
+        소켓 / 연결 정리는 루프를 돌던 이 스레드에서 수행
+        """
+        while self.http_running:
+            server.asyncore.loop(timeout=0.5, map=server._map,
+                                 use_poll=server.adj.asyncore_use_poll, count=1)
+        
+        server.task_dispatcher.shutdown()
+        server.asyncore.close_all(server._map)
     
     def stop(self):
         """애플리케이션 종료"""
@@ -219,14 +620,25 @@ class SerialMonitorApp:
         if self.queue_processor:
             self.queue_processor.stop()
         
+        self.broadcaster.close()
+        self.http_running = False  # production 서버 스레드가 0.5초 안에 스스로 종료
+        self.reader.stop()
+        
         for monitor in self.monitors.values():
             monitor.close()
         
+        # 큐에 남은 프레임까지 처리 후 종료
+        self.ingest.stop()
+        
+        # 일괄 저장 버퍼에 남은 데이터 저장 후 종료
+        self.db_handler.flush()
         self.db_handler.close()
         
         for thread in self.threads:
             thread.join(timeout=1)
         
+        self.reader.close()
+        
         print("[✓] 모든 리소스 종료 완료")
     
     def run(self):
@@ -0,0 +1,230 @@
+# async_app.py
+"""asyncio 이벤트 루프 기반 시리얼 모니터 애플리케이션"""
+
+import asyncio
+import threading
+from typing import Dict, Optional
+
+from app import SerialMonitorApp
+from models import CMORequest
+from queue_processor import QueueProcessor
+
+
+class AsyncCommandQueue:
+    """
+    asyncio.Queue 래퍼
+    Flask 스레드 등 루프 밖에서도 put()을 호출할 수 있도록 루프로 전달
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+
+    def put(self, item):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def get_nowait(self):
+        return self.queue.get_nowait()
+
+    def qsize(self) -> int:
+        return self.queue.qsize()
+
+
+class AsyncQueueProcessor(QueueProcessor):
+    """
+    코루틴 기반 큐 처리 - ACK 타임아웃은 loop.call_later로 예약
+    전송 워커 스레드 대신 루프에서 디바이스 레인을 비움 (병합 / 우선순위는 스레드 방식과 동일하게 적용)
+    """
+
+    def __init__(self, cmd_queue: AsyncCommandQueue, monitors: Dict[str, object],
+                 loop: asyncio.AbstractEventLoop, correlation_ids: bool = False, **kwargs):
+        super().__init__(cmd_queue, monitors, correlation_ids=correlation_ids, **kwargs)
+        self.loop = loop
+        self.timers: Dict[str, asyncio.TimerHandle] = {}  # 타임아웃 key -> 핸들
+        self.loop_thread = None
+
+    async def run_async(self):
+        """큐 처리 코루틴"""
+        self.running = True
+        self.loop_thread = threading.get_ident()
+        if self.probe_commands:
+            self._probe_timer()
+
+        while self.running:
+            try:
+                cmo = await self.cmd_queue.get()
+                self._enqueue(cmo)
+                # 이미 도착한 명령까지 레인에 넣은 뒤 전송 (한 번에 들어온 명령끼리 병합 / 우선순위 적용)
+                while True:
+                    try:
+                        self._enqueue(self.cmd_queue.get_nowait())
+                    except asyncio.QueueEmpty:
+                        break
+                self._drain_lanes()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                print(f"[ERROR] 큐 처리 오류: {e}")
+
+    def _drain_lanes(self):
+        """꺼낼 수 있는 명령을 우선순위 순으로 전송 (write가 끝나지 않은 레인은 끝난 뒤 다시 호출)"""
+        while True:
+            item = self.lanes.take(timeout=0)
+            if not item:
+                return
+
+            self._dispatch(*item)
+
+    def _release(self, device_id: str):
+        self.lanes.done(device_id)
+        # 송신 스레드에서 write가 끝났으면 루프에서 레인의 다음 명령 전송
+        if self.loop_thread and threading.get_ident() != self.loop_thread:
+            self.loop.call_soon_threadsafe(self._drain_lanes)
+
+    def _schedule_timeout(self, key: str, cmo: CMORequest):
+        """ACK 타임아웃 예약 (같은 키의 이전 예약은 취소)"""
+        self._cancel_timeout(key)
+
+        delay = max(0.0, cmo.timeout - cmo.round_trip_time())
+        self.timers[key] = self.loop.call_later(delay, self._expire_timer, key, cmo)
+
+    def _cancel_timeout(self, key: str):
+        timer = self.timers.pop(key, None)
+        if timer:
+            timer.cancel()
+
+    def _expire_timer(self, key: str, cmo: CMORequest):
+        """예약된 타임아웃 도달 - 아직 ACK가 없으면 삭제"""
+        self.timers.pop(key, None)
+        self._expire(key, cmo)
+
+    def _schedule_retry(self, cmo: CMORequest, delay: float):
+        key = f"retry:{self._timeout_key(cmo)}"
+        self.timers[key] = self.loop.call_later(delay, self._retry_timer, key, cmo)
+
+    def _retry_timer(self, key: str, cmo: CMORequest):
+        self.timers.pop(key, None)
+        self._requeue(cmo)
+
+    def _requeue(self, cmo: CMORequest):
+        # 재전송 / 프로브도 레인을 거쳐야 그 사이 들어온 새 명령을 덮어쓰지 않음
+        self._enqueue(cmo)
+        self._drain_lanes()
+
+    def _probe_timer(self):
+        """MAX_WAIT 주기로 프로브 확인"""
+        if not self.running:
+            return
+        self._send_probes()
+        self.timers['probe'] = self.loop.call_later(self.MAX_WAIT, self._probe_timer)
+
+    def handle_ack(self, device_id: str, metric_name: str, seq: Optional[int] = None):
+        # 파싱 워커 스레드에서 호출되면 루프로 넘겨서 처리
+        if self.loop_thread and threading.get_ident() != self.loop_thread:
+            self.loop.call_soon_threadsafe(self.handle_ack, device_id, metric_name, seq)
+            return
+
+        super().handle_ack(device_id, metric_name, seq)
+
+    def _on_written(self, cmo: CMORequest, command: str, ok: bool):
+        # 포트 송신 스레드에서 호출되면 루프로 넘겨서 처리 (타임아웃 예약은 루프에서만)
+        if self.loop_thread and threading.get_ident() != self.loop_thread:
+            self.loop.call_soon_threadsafe(self._on_written, cmo, command, ok)
+            return
+
+        super()._on_written(cmo, command, ok)
+
+    def stop(self):
+        super().stop()
+
+        for timer in self.timers.values():
+            timer.cancel()
+        self.timers.clear()
+
+
+class AsyncSerialMonitorApp(SerialMonitorApp):
+    """
+    asyncio 런타임
+    - 시리얼 포트: loop.add_reader로 데이터 도착 시에만 읽고, 파싱 / 저장은 워커로 넘김
+    - 큐 처리: asyncio.Queue를 소비하는 코루틴
+    - Flask: WSGI 서버이므로 기존처럼 별도 스레드
+    """
+
+    def __init__(self, db_config: dict, port_config: dict, **kwargs):
+        super().__init__(db_config, port_config, **kwargs)
+        self.loop = None
+        self.queue_task = None
+        self.stop_event = None
+
+    def _start_monitor_threads(self):
+        """포트를 이벤트 루프에 등록"""
+        for device_id, monitor in self.monitors.items():
+            try:
+                self.loop.add_reader(monitor.fileno(), self._on_readable, monitor)
+                continue
+            except (AttributeError, OSError, ValueError):
+                pass
+
+            # fileno 미지원 포트는 개별 스레드로 처리
+            thread = threading.Thread(
+                target=monitor.run,
+                daemon=True,
+                name=f"Monitor-{device_id}"
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def _on_readable(self, monitor):
+        """읽기 가능 콜백"""
+        if not monitor.read_available():
+            print(f"[○] {monitor.port} 이벤트 루프에서 제외")
+            self._remove_reader(monitor)
+
+    def _remove_reader(self, monitor):
+        try:
+            self.loop.remove_reader(monitor.fileno())
+        except (AttributeError, OSError, ValueError):
+            pass
+
+    def _start_queue_processor(self):
+        """큐 처리 코루틴 시작"""
+        self.queue_processor = AsyncQueueProcessor(self.cmd_queue, self.monitors, self.loop,
+                                                   self.correlation_ids, coalesce=self.coalesce,
+                                                   priority_aging=self.priority_aging,
+                                                   **self.retry_config)
+
+        self.queue_processor.journal = self.journal
+        for monitor in self.monitors.values():
+            monitor.queue_processor = self.queue_processor
+
+        self.queue_task = self.loop.create_task(self.queue_processor.run_async())
+
+    async def _main(self):
+        """이벤트 루프 메인"""
+        self.loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+
+        # 모니터가 CMD를 넣는 큐도 asyncio 큐로 교체
+        self.cmd_queue = AsyncCommandQueue(self.loop)
+
+        if not self.start():
+            return
+
+        try:
+            await self.stop_event.wait()
+        finally:
+            for monitor in self.monitors.values():
+                self._remove_reader(monitor)
+            if self.queue_task:
+                self.queue_task.cancel()
+            self.stop()
+
+    def run(self):
+        """메인 루프"""
+        try:
+            asyncio.run(self._main())
+        except KeyboardInterrupt:
+            print("\n\nCtrl+C로 종료...")
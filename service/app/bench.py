@@ -0,0 +1,175 @@
+# bench.py
+"""
+REST API 부하 측정 - /api/state, /api/command의 초당 요청 수와 지연 시간(p50 / p99)
+
+사용 예:
+    python bench.py --server dev                # 가짜 디바이스로 앱을 띄워 개발 서버 측정
+    python bench.py --server production         # 같은 조건으로 waitress 측정
+    python bench.py --url http://localhost:5000 --endpoints state
+                                                # 실행 중인 서버 측정 (command는 실제 디바이스로 전송되므로 주의)
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import sys
+import time
+from queue import Queue
+from urllib.parse import urlparse
+
+from app import SerialMonitorApp
+from storage import SQLiteBackend
+
+
+class FakeMonitor:
+    """시리얼 포트 대신 명령을 받고 바로 ACK를 돌려주는 모니터"""
+
+    def __init__(self, device_id: str, acks: Queue):
+        self.device_id = device_id
+        self.acks = acks
+
+    def send_command(self, command: str) -> bool:
+        metric_name = command.split(',')[1]
+        self.acks.put((self.device_id, metric_name))
+        return True
+
+    def close(self):
+        pass
+
+
+def start_local_app(mode: str, threads: int, tmp_dir: str) -> str:
+    """가짜 디바이스로 앱 실행 - base URL 반환"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    app = SerialMonitorApp(
+        {'backend': SQLiteBackend(os.path.join(tmp_dir, 'bench.db'))}, {},
+        server_config={'mode': mode, 'host': '127.0.0.1', 'port': port, 'threads': threads}
+    )
+
+    acks = Queue()
+    for device_id in ('ele_001', 'dht_001'):
+        app.monitors[device_id] = FakeMonitor(device_id, acks)
+    app._start_queue_processor()
+
+    def ack_loop():
+        while True:
+            app.queue_processor.handle_ack(*acks.get())
+
+    threading.Thread(target=ack_loop, daemon=True, name="FakeAck").start()
+    for i in range(20):
+        app.system_state.update('dht_001', 'SEN', f'M{i}', str(i))
+
+    app._start_flask_server()
+    return f"http://127.0.0.1:{port}"
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_load(base_url: str, method: str, path: str, body, concurrency: int, duration: float) -> dict:
+    """concurrency개 keep-alive 연결로 duration초 동안 요청"""
+    url = urlparse(base_url)
+    payload = json.dumps(body).encode('utf-8') if body is not None else None
+    headers = {'Content-Type': 'application/json'} if payload else {}
+
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        local, failed = [], 0
+        conn = http.client.HTTPConnection(url.hostname, url.port, timeout=10)
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=payload, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500:
+                    failed += 1
+                else:
+                    local.append(time.perf_counter() - start)
+            except (OSError, http.client.HTTPException):
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection(url.hostname, url.port, timeout=10)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    workers = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="REST API 부하 측정")
+    parser.add_argument('--url', help="측정할 서버 (없으면 가짜 디바이스로 앱을 직접 실행)")
+    parser.add_argument('--server', choices=['dev', 'production'], default='production',
+                        help="직접 실행할 때 서버 종류")
+    parser.add_argument('--http-threads', type=int, default=32, help="production 서버 스레드 수")
+    parser.add_argument('--endpoints', default='state,command', help="측정할 API (state, command)")
+    parser.add_argument('--concurrency', type=int, default=16, help="동시 연결 수")
+    parser.add_argument('--duration', type=float, default=10.0, help="API별 측정 시간 (초)")
+    parser.add_argument('--device', default='ele_001', help="command 대상 device_id")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    out = sys.stdout
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        base_url = args.url
+        if not base_url:
+            # 앱 로그 출력이 측정에 섞이지 않도록 버림 (결과는 out으로 출력)
+            sys.stdout = open(os.devnull, 'w')
+            logging.getLogger('werkzeug').setLevel(logging.ERROR)
+            base_url = start_local_app(args.server, args.http_threads, tmp_dir)
+
+        scenarios = {
+            'state': ('GET', '/api/state', None),
+            'command': ('POST', '/api/command', {'device_id': args.device, 'metric_name': 'FLOOR', 'value': '1'}),
+        }
+
+        print(f"대상: {base_url} ({args.url and '외부 서버' or args.server}), "
+              f"동시 연결 {args.concurrency}, API별 {args.duration:.0f}초", file=out)
+        print(f"{'API':<10}{'요청 수':>10}{'req/s':>10}{'p50(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}{'오류':>8}",
+              file=out)
+
+        for name in args.endpoints.split(','):
+            method, path, body = scenarios[name.strip()]
+            result = run_load(base_url, method, path, body, args.concurrency, args.duration)
+            print(f"{name:<10}{result['requests']:>10}{result['rps']:>10.0f}{result['p50_ms']:>10.1f}"
+                  f"{result['p99_ms']:>10.1f}{result['max_ms']:>10.1f}{result['errors']:>8}", file=out)
+
+
+if __name__ == '__main__':
+    main()
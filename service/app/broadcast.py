@@ -0,0 +1,117 @@
+# broadcast.py
+"""SSE 이벤트 브로드캐스트"""
+
+import json
+import threading
+from collections import deque
+from typing import List, Optional, Tuple
+
+
+def format_event(event: dict) -> bytes:
+    """저널 이벤트 -> SSE 프레임 (id는 저널 seq, 재연결 시 Last-Event-ID로 이어받음)"""
+    data = json.dumps(event, ensure_ascii=False, separators=(',', ':'))
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {data}\n\n".encode('utf-8')
+
+
+class Subscriber:
+    """
+    SSE 클라이언트 하나의 송신 버퍼 (크기 제한)
+    - downsample_at 이상 쌓이면 SEN(센서값)은 건너뜀 (상태는 다음 값으로 갱신되므로)
+    - max_buffer가 차면 연결 종료 (클라이언트는 Last-Event-ID로 재연결해 저널에서 이어받음)
+    """
+
+    def __init__(self, max_buffer: int = 256, downsample_at: int = 128):
+        self.buffer = deque()  # (seq, frame)
+        self.max_buffer = max_buffer
+        self.downsample_at = downsample_at
+        self.cond = threading.Condition()
+        self.closed = False
+        self.skipped = 0
+
+    def push(self, seq: int, frame: bytes, droppable: bool) -> bool:
+        """프레임 추가 - 버퍼가 넘쳐 연결을 끊어야 하면 False"""
+        with self.cond:
+            if self.closed:
+                return False
+            if len(self.buffer) >= self.max_buffer:
+                self.closed = True
+                self.cond.notify()
+                return False
+            if droppable and len(self.buffer) >= self.downsample_at:
+                self.skipped += 1
+                return True
+            self.buffer.append((seq, frame))
+            self.cond.notify()
+            return True
+
+    def next_frames(self, timeout: float) -> Optional[List[Tuple[int, bytes]]]:
+        """쌓인 프레임 전부 꺼냄 - timeout 동안 없으면 빈 목록, 연결 종료면 None"""
+        with self.cond:
+            if not self.buffer and not self.closed:
+                self.cond.wait(timeout)
+            if self.closed:
+                return None
+            frames = list(self.buffer)
+            self.buffer.clear()
+            return frames
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+
+
+class SSEBroadcaster:
+    """
+    이벤트를 한 번만 직렬화해서 모든 구독자 버퍼에 넣음
+    구독자 목록은 변경 시 새 튜플로 교체하므로 publish는 lock 없이 순회
+    """
+
+    def __init__(self, max_buffer: int = 256, downsample_at: int = 128):
+        self.max_buffer = max_buffer
+        self.downsample_at = downsample_at
+        self.subscribers: Tuple[Subscriber, ...] = ()
+        self.lock = threading.Lock()
+        self.published = 0
+        self.disconnected = 0
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(self.max_buffer, self.downsample_at)
+        with self.lock:
+            self.subscribers = self.subscribers + (subscriber,)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscriber.close()
+        with self.lock:
+            self.subscribers = tuple(s for s in self.subscribers if s is not subscriber)
+
+    def publish(self, event: dict):
+        """이벤트 전달 (구독자가 없으면 직렬화도 하지 않음)"""
+        subscribers = self.subscribers
+        if not subscribers:
+            return
+
+        frame = format_event(event)
+        droppable = event['type'] == 'SEN'
+        self.published += 1
+        for subscriber in subscribers:
+            if not subscriber.push(event['seq'], frame, droppable):
+                print("[STREAM] 느린 클라이언트 연결 종료 (버퍼 초과)")
+                self.disconnected += 1
+                self.unsubscribe(subscriber)
+
+    def stats(self) -> dict:
+        subscribers = self.subscribers
+        return {
+            'subscribers': len(subscribers),
+            'published': self.published,
+            'disconnected': self.disconnected,
+            'skipped': sum(s.skipped for s in subscribers),
+        }
+
+    def close(self):
+        with self.lock:
+            subscribers, self.subscribers = self.subscribers, ()
+        for subscriber in subscribers:
+            subscriber.close()
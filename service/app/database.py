@@ -1,62 +1,187 @@
 # database.py
-"""MySQL 데이터베이스 관리"""
+"""로그 저장 관리 (일괄 저장 / 장애 시 스풀)"""
 
 import threading
-import pymysql
+import time
+import uuid
+from datetime import datetime
+
+from spool import LogSpool
+from storage import MySQLBackend, SchemaError, StorageBackend, StorageError
 
 
 class DatabaseHandler:
-    """MySQL 데이터베이스 관리"""
+    """로그 저장 관리 - 실제 저장은 StorageBackend (기본 MySQL)"""
     
-    def __init__(self, host: str, user: str, password: str, database: str):
-        self.config = {
-            'host': host, 'user': user, 'password': password,
-            'database': database, 'charset': 'utf8mb4'
-        }
-        self.conn = None
-        self.lock = threading.Lock()
+    def __init__(self, host: str = None, user: str = None, password: str = None,
+                 database: str = None, batch_size: int = 100, flush_interval_ms: int = 200,
+                 pool_min: int = 1, pool_max: int = 4,
+                 spool_path: str = None, retry_interval: float = 5.0,
+                 backend: StorageBackend = None):
+        # log_key(중복 방지) 컬럼은 스풀 재전송에만 필요 - 스풀이 없으면 마이그레이션 전 테이블도 허용
+        self.backend = backend or MySQLBackend(host, user, password, database,
+                                               pool_min, pool_max, require_log_key=bool(spool_path))
+        
+        # 일괄 저장 버퍼 (batch_size개 또는 flush_interval_ms 경과 시 저장)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000
+        self.buffer = []
+        self.buffer_lock = threading.Lock()
+        self.flush_event = threading.Event()
+        self.flush_thread = None
+        self.running = False
+        
+        # DB 장애 시 로컬 스풀 (spool_path가 없으면 사용 안 함)
+        self.spool = LogSpool(spool_path) if spool_path else None
+        self.spooling = bool(self.spool and self.spool.pending())
+        self.retry_interval = retry_interval
+        self.retry_at = 0.0  # 이 시각 전까지는 DB에 쓰지 않고 스풀에 저장
     
     def connect(self) -> bool:
-        """DB 연결"""
+        """저장소 연결"""
         try:
-            self.conn = pymysql.connect(**self.config)
-            print(f"[✓] DB 연결 성공: {self.config['host']}/{self.config['database']}")
+            self.backend.connect()
+            print(f"[✓] DB 연결 성공: {self.backend.describe()}")
+            self._start_flush_thread()
             return True
-        except pymysql.Error as e:
-            print(f"[✗] DB 연결 실패: {e}")
+        except SchemaError as e:
+            # 스키마 문제는 기다려도 복구되지 않으므로 스풀에 쌓지 않고 시작 실패
+            print(f"[✗] DB 스키마 오류: {e}")
             return False
+        except StorageError as e:
+            print(f"[✗] DB 연결 실패: {e}")
+            if not self.spool:
+                return False
+            
+            # 스풀이 있으면 로컬에 저장하면서 계속 실행
+            print(f"[!] 로컬 스풀에 저장 후 DB 복구 시 재전송: {self.spool.path}")
+            self.retry_at = time.time() + self.retry_interval
+            self._start_flush_thread()
+            return True
     
-    def insert_log(self, device_id: str, data_type: str, metric_name: str, value: str) -> bool:
-        """데이터 저장"""
-        if not self.conn:
-            print("[✗] DB 연결이 없습니다")
-            return False
+    def _start_flush_thread(self):
+        """주기적 저장 스레드 시작"""
+        if self.batch_size <= 1 or self.flush_thread:
+            return
+        
+        self.running = True
+        self.flush_thread = threading.Thread(
+            target=self._flush_loop,
+            daemon=True,
+            name="DBFlush"
+        )
+        self.flush_thread.start()
+    
+    def _flush_loop(self):
+        """크기 도달 신호 또는 주기마다 버퍼 저장"""
+        while self.running:
+            self.flush_event.wait(self.flush_interval)
+            self.flush_event.clear()
+            self.flush()
+    
+    def insert_log(self, device_id: str, data_type: str, metric_name: str, value: str,
+                   timestamp: float = None) -> bool:
+        """데이터 저장 (timestamp: 수신 시각, 일괄 저장 시에도 그대로 기록)"""
+        row = (uuid.uuid4().hex, device_id, data_type, metric_name, value,
+               datetime.fromtimestamp(timestamp if timestamp is not None else time.time()))
+        
+        if self.batch_size <= 1:
+            return self._store([row])
+        
+        with self.buffer_lock:
+            self.buffer.append(row)
+            full = len(self.buffer) >= self.batch_size
+        
+        if full:
+            self.flush_event.set()
+        return True
+    
+    def flush(self) -> bool:
+        """버퍼에 쌓인 데이터를 하나의 트랜잭션으로 저장"""
+        with self.buffer_lock:
+            rows, self.buffer = self.buffer, []
+        
+        if rows:
+            return self._store(rows)
         
+        if self.spooling and time.time() >= self.retry_at:
+            self._replay_spool()
+        return True
+    
+    def _store(self, rows: list) -> bool:
+        """DB에 저장, 장애 중이면 스풀에 저장"""
+        if not self.spool:
+            return self._write_rows(rows)
+        
+        if time.time() < self.retry_at:
+            self._spool(rows)
+            return True
+        
+        # 스풀에 남은 데이터부터 재전송
+        if self.spooling and not self._replay_spool():
+            self._spool(rows)
+            return True
+        
+        if not self._write_rows(rows):
+            self._spool(rows)
+            self.retry_at = time.time() + self.retry_interval
+        return True
+    
+    def _spool(self, rows: list):
+        self.spool.append(rows)
+        self.spooling = True
+    
+    def _replay_spool(self) -> bool:
+        """스풀 재전송 - 모두 보냈으면 True"""
+        count = self.spool.replay(self._write_rows)
+        if count:
+            print(f"[✓] 스풀 재전송: {count}건")
+        
+        self.spooling = self.spool.pending() > 0
+        if self.spooling:
+            self.retry_at = time.time() + self.retry_interval
+        return not self.spooling
+    
+    def _write_rows(self, rows: list) -> bool:
+        """여러 행을 한 트랜잭션으로 저장"""
         try:
-            with self.lock:
-                with self.conn.cursor() as cursor:
-                    cursor.execute(
-                        "INSERT INTO logs (device_id, data_type, metric_name, value) VALUES (%s, %s, %s, %s)",
-                        (device_id, data_type, metric_name, value)
-                    )
-                    self.conn.commit()
-            print(f"[✓] DB 저장: {device_id},{data_type},{metric_name},{value}")
+            self.backend.write_rows(rows)
+            print(f"[✓] DB 저장: {len(rows)}건")
             return True
-        except pymysql.Error as e:
-            print(f"[✗] DB 저장 실패: {e}")
-            self._reconnect()
+        except StorageError as e:
+            print(f"[✗] DB 저장 실패 ({len(rows)}건): {e}")
             return False
     
-    def _reconnect(self):
-        """DB 재연결"""
-        try:
-            if self.conn:
-                self.conn.ping()
-        except:
-            self.connect()
+    def query(self, sql: str, params: tuple = None) -> list:
+        """조회 (결과는 dict 목록, SQL placeholder는 백엔드 형식)"""
+        return self.backend.query(sql, params)
+    
+    def read_series(self, device_id: str, metric_name: str, start: float, end: float,
+                    include_end: bool = True) -> list:
+        """metric 하나의 [start, end] 구간 (epoch 초, 값) 목록 (아직 버퍼에 있는 데이터는 제외)"""
+        return self.backend.read_series(device_id, metric_name, start, end, include_end)
+    
+    def stats(self) -> dict:
+        """저장소 / 버퍼 / 스풀 지표"""
+        with self.buffer_lock:
+            buffered = len(self.buffer)
+        return {
+            'backend': self.backend.name,
+            'buffered': buffered,
+            **self.backend.stats(),
+            'spool': self.spool.stats() if self.spool else None
+        }
     
     def close(self):
-        """연결 종료"""
-        if self.conn:
-            self.conn.close()
-            print("[○] DB 연결 종료")
\ No newline at end of file
+        """연결 종료 (남은 버퍼 저장 후)"""
+        self.running = False
+        self.flush_event.set()
+        if self.flush_thread:
+            self.flush_thread.join(timeout=2)
+            self.flush_thread = None
+        self.flush()
+        
+        if self.spool:
+            self.spool.close()
+        self.backend.close()
+        print("[○] DB 연결 종료")
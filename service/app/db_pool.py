@@ -0,0 +1,166 @@
+# db_pool.py
+"""스레드 안전 DB 커넥션 풀"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, List
+
+
+class PoolTimeout(Exception):
+    """acquire 대기 시간 초과"""
+
+
+class ConnectionPool:
+    """
+    min_size ~ max_size개 커넥션 관리
+    - 오래 쉰 커넥션은 꺼낼 때 ping으로 확인, 죽었으면 새로 만들어 교체
+    - 사용 중 오류가 난 커넥션은 release(broken=True)로 폐기
+    """
+
+    def __init__(self, connect_fn: Callable[[], object], min_size: int = 1,
+                 max_size: int = 4, ping_interval: float = 30.0,
+                 acquire_timeout: float = 5.0):
+        self.connect_fn = connect_fn
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.ping_interval = ping_interval
+        self.acquire_timeout = acquire_timeout
+
+        self.idle: List[tuple] = []  # (conn, 마지막 사용 시각)
+        self.size = 0  # 생성된 커넥션 수 (idle + in_use)
+        self.in_use = 0
+        self.cond = threading.Condition()
+        self.closed = False
+
+        # 지표
+        self.acquire_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.created = 0
+        self.replaced = 0
+
+    def open(self):
+        """min_size개 커넥션 미리 생성 (실패 시 예외)"""
+        with self.cond:
+            self.closed = False
+            while self.size < self.min_size:
+                self.idle.append((self._create(), time.time()))
+                self.size += 1
+
+    def _create(self):
+        conn = self.connect_fn()
+        self.created += 1
+        return conn
+
+    def _is_alive(self, conn) -> bool:
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def acquire(self, timeout: float = None):
+        """커넥션 꺼내기 (없으면 생성, max_size면 대기)"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        start = time.time()
+        deadline = start + timeout
+
+        with self.cond:
+            while True:
+                if self.closed:
+                    raise PoolTimeout("풀이 닫혀 있습니다")
+
+                if self.idle:
+                    conn, last_used = self.idle.pop()
+                    break
+
+                if self.size < self.max_size:
+                    # 생성 중에도 다른 스레드가 max_size를 넘지 않도록 먼저 자리 확보
+                    self.size += 1
+                    conn, last_used = None, None
+                    break
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise PoolTimeout(f"커넥션 대기 시간 초과 ({timeout:.1f}초)")
+                self.cond.wait(remaining)
+
+            self.in_use += 1
+
+        try:
+            if conn is None:
+                conn = self._create()
+            elif time.time() - last_used > self.ping_interval and not self._is_alive(conn):
+                self._close_quietly(conn)
+                conn = self._create()
+                self.replaced += 1
+        except Exception:
+            with self.cond:
+                self.size -= 1
+                self.in_use -= 1
+                self.cond.notify()
+            raise
+
+        waited = time.time() - start
+        with self.cond:
+            self.acquire_count += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        return conn
+
+    def release(self, conn, broken: bool = False):
+        """커넥션 반납 (broken이면 폐기하고 자리만 비움)"""
+        with self.cond:
+            self.in_use -= 1
+            if broken or self.closed:
+                self.size -= 1
+                self._close_quietly(conn)
+            else:
+                self.idle.append((conn, time.time()))
+            self.cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        """with pool.connection() as conn: ... (예외 시 커넥션 폐기)"""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except Exception:
+            self.release(conn, broken=True)
+            raise
+        else:
+            self.release(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        """풀 사용 지표"""
+        with self.cond:
+            return {
+                'size': self.size,
+                'idle': len(self.idle),
+                'in_use': self.in_use,
+                'max_size': self.max_size,
+                'utilization': round(self.in_use / self.max_size, 3),
+                'acquire_count': self.acquire_count,
+                'wait_avg_ms': round(self.wait_total / self.acquire_count * 1000, 3) if self.acquire_count else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+                'created': self.created,
+                'replaced': self.replaced,
+            }
+
+    def close(self):
+        """모든 idle 커넥션 종료 (사용 중인 것은 반납 시 종료)"""
+        with self.cond:
+            self.closed = True
+            for conn, _ in self.idle:
+                self._close_quietly(conn)
+            self.size -= len(self.idle)
+            self.idle.clear()
+            self.cond.notify_all()
@@ -0,0 +1,197 @@
+# device_health.py
+"""디바이스 상태 점수 및 서킷 브레이커"""
+
+import random
+import threading
+import time
+from typing import Dict, List
+
+
+class DeviceHealth:
+    """
+    디바이스 1개의 ACK 성공률 / RTT 지수이동평균과 서킷 브레이커
+
+    closed    : 정상 전송
+    open      : 연속 실패 - 즉시 실패 처리, open_seconds 후 half_open
+    half_open : 프로브 명령 1개만 허용, 성공하면 closed / 실패하면 open (대기 시간 2배)
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+    ALPHA = 0.2  # 지수이동평균 가중치
+    RTT_REF = 1.0  # 이 RTT(초)까지는 점수 감점 없음
+
+    def __init__(self, failure_threshold: int = 3, open_seconds: float = 15.0,
+                 max_open_seconds: float = 120.0):
+        self.failure_threshold = failure_threshold
+        self.base_open_seconds = open_seconds
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.consecutive_failures = 0
+
+        self.success_rate = 1.0
+        self.rtt = 0.0
+        self.successes = 0
+        self.failures = 0
+
+    def _refresh(self, now: float):
+        if self.state == self.OPEN and now - self.opened_at >= self.open_seconds:
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+
+    def is_open(self, now: float = None) -> bool:
+        """즉시 실패 처리해야 하는 상태인지 (프로브 자리를 차지하지 않음)"""
+        self._refresh(now or time.time())
+        return self.state == self.OPEN or (self.state == self.HALF_OPEN and self.probe_in_flight)
+
+    def allow(self, now: float = None) -> bool:
+        """전송 허용 여부 - half_open이면 첫 요청을 프로브로 사용"""
+        self._refresh(now or time.time())
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def release_probe(self):
+        """프로브가 성공 / 실패 판정 없이 끝남 (병합 / 거부 / 오류) - 다음 요청이 프로브를 맡을 수 있게"""
+        if self.state == self.HALF_OPEN:
+            self.probe_in_flight = False
+
+    def record_success(self, rtt: float):
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.success_rate += self.ALPHA * (1.0 - self.success_rate)
+        self.rtt = rtt if self.successes == 1 else self.rtt + self.ALPHA * (rtt - self.rtt)
+
+        self.state = self.CLOSED
+        self.probe_in_flight = False
+        self.open_seconds = self.base_open_seconds
+
+    def record_failure(self, now: float = None):
+        now = now or time.time()
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.success_rate -= self.ALPHA * self.success_rate
+
+        if self.state == self.HALF_OPEN:
+            # 프로브 실패 - 더 오래 차단
+            self.open_seconds = min(self.open_seconds * 2, self.max_open_seconds)
+            self._open(now)
+        elif self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._open(now)
+
+    def _open(self, now: float):
+        self.state = self.OPEN
+        self.opened_at = now
+        self.probe_in_flight = False
+
+    def retry_after(self, now: float = None) -> float:
+        """open 상태가 끝날 때까지 남은 시간 (초)"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.open_seconds - (now or time.time()))
+
+    def score(self) -> int:
+        """0~100 상태 점수 (성공률 x RTT 감점)"""
+        rtt_factor = min(1.0, self.RTT_REF / self.rtt) if self.rtt > self.RTT_REF else 1.0
+        return round(100 * self.success_rate * rtt_factor)
+
+    def to_dict(self) -> dict:
+        return {
+            'state': self.state,
+            'score': self.score(),
+            'success_rate': round(self.success_rate, 3),
+            'rtt_ms': round(self.rtt * 1000, 1),
+            'successes': self.successes,
+            'failures': self.failures,
+            'retry_after': round(self.retry_after(), 1),
+        }
+
+
+class DeviceHealthRegistry:
+    """디바이스별 DeviceHealth 관리 (스레드 안전)"""
+
+    CLOSED, OPEN, PROBE = 'closed', 'open', 'probe'  # admit() 결과
+
+    def __init__(self, failure_threshold: int = 3, open_seconds: float = 15.0):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.devices: Dict[str, DeviceHealth] = {}
+        self.lock = threading.Lock()
+
+    def _get(self, device_id: str) -> DeviceHealth:
+        health = self.devices.get(device_id)
+        if health is None:
+            health = self.devices[device_id] = DeviceHealth(self.failure_threshold, self.open_seconds)
+        return health
+
+    def allow(self, device_id: str) -> bool:
+        with self.lock:
+            return self._get(device_id).allow()
+
+    def admit(self, device_id: str, guarded: bool = True) -> str:
+        """
+        전송 허용 여부 - 'closed'(정상 전송) / 'probe'(half_open 프로브 자리 확보) / 'open'(즉시 실패)
+        guarded가 아닌 명령은 결과가 브레이커에 반영되지 않으므로 프로브 자리를 차지하지 않음
+        """
+        with self.lock:
+            health = self._get(device_id)
+            if not guarded:
+                return self.OPEN if health.is_open() else self.CLOSED
+            if not health.allow():
+                return self.OPEN
+            return self.CLOSED if health.state == DeviceHealth.CLOSED else self.PROBE
+
+    def release_probe(self, device_id: str):
+        with self.lock:
+            health = self.devices.get(device_id)
+            if health:
+                health.release_probe()
+
+    def is_open(self, device_id: str) -> bool:
+        with self.lock:
+            return self._get(device_id).is_open()
+
+    def retry_after(self, device_id: str) -> float:
+        with self.lock:
+            return self._get(device_id).retry_after()
+
+    def record_success(self, device_id: str, rtt: float):
+        with self.lock:
+            health = self._get(device_id)
+            if health.state != DeviceHealth.CLOSED:
+                print(f"[BREAKER] {device_id} 응답 복구 - closed")
+            health.record_success(rtt)
+
+    def record_failure(self, device_id: str):
+        with self.lock:
+            health = self._get(device_id)
+            was_closed = health.state == DeviceHealth.CLOSED
+            health.record_failure()
+            if was_closed and health.state == DeviceHealth.OPEN:
+                print(f"[BREAKER] {device_id} 연속 {health.consecutive_failures}회 응답 없음 - open")
+
+    def claim_probes(self, device_ids) -> List[str]:
+        """half_open이고 프로브를 아직 안 보낸 디바이스의 프로브 자리 확보"""
+        now = time.time()
+        with self.lock:
+            claimed = []
+            for device_id in device_ids:
+                health = self.devices.get(device_id)
+                if health and health.state != DeviceHealth.CLOSED and health.allow(now):
+                    claimed.append(device_id)
+            return claimed
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {device_id: health.to_dict() for device_id, health in self.devices.items()}
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 5.0) -> float:
+    """지수 백오프 + full jitter (attempt: 1부터)"""
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
@@ -0,0 +1,54 @@
+# framer.py
+"""시리얼 바이트 스트림 줄 단위 프레이밍"""
+
+from typing import List
+
+
+class LineFramer:
+    """
+    재사용 bytearray 버퍼에 수신 데이터를 누적하고
+    '\\n'으로 끝나는 완성된 프레임만 잘라서 반환 (미완성 프레임은 다음 수신까지 보관)
+    """
+
+    DELIMITER = b'\n'
+
+    def __init__(self, max_frame_size: int = 1024):
+        self.buffer = bytearray()
+        self.max_frame_size = max_frame_size
+        self.dropped_bytes = 0  # 구분자 없이 너무 길어 버린 바이트 수
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """수신 데이터 추가 후 완성된 프레임 목록 반환"""
+        buf = self.buffer
+        buf += data
+
+        frames = []
+        start = 0
+        end = buf.find(self.DELIMITER)
+        if end >= 0:
+            view = memoryview(buf)
+            try:
+                while end >= 0:
+                    frame = bytes(view[start:end]).strip()
+                    if frame:
+                        frames.append(frame)
+                    start = end + 1
+                    end = buf.find(self.DELIMITER, start)
+            finally:
+                view.release()
+
+            del buf[:start]
+
+        if len(buf) > self.max_frame_size:
+            self.dropped_bytes += len(buf)
+            print(f"[ERROR] 구분자 없는 프레임 폐기 ({len(buf)} bytes)")
+            buf.clear()
+
+        return frames
+
+    def pending(self) -> int:
+        """아직 완성되지 않은 프레임 길이"""
+        return len(self.buffer)
+
+    def reset(self):
+        self.buffer.clear()
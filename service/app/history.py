@@ -0,0 +1,118 @@
+# history.py
+"""시계열 이력 조회 / 서버 측 다운샘플링 (NumPy)"""
+
+import math
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+DOWNSAMPLE_METHODS = ('minmax', 'lttb')
+MAX_TIME = 4102444800.0  # 2100-01-01 (조회 시각 상한)
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """
+    쿼리 시각 -> epoch 초 (epoch 숫자 또는 ISO 8601, 없으면 None)
+    형식 오류 / nan / inf / 0~MAX_TIME 범위 밖은 ValueError
+    """
+    if value is None or value == '':
+        return None
+    try:
+        timestamp = float(value)
+    except ValueError:
+        timestamp = datetime.fromisoformat(value).timestamp()
+    if not math.isfinite(timestamp) or not 0 <= timestamp <= MAX_TIME:
+        raise ValueError(f"out of range: {value}")
+    return timestamp
+
+
+def to_arrays(rows: Iterable[Tuple[float, str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """(epoch 초, 값 문자열) 행 -> (시각, 값) float64 배열 (숫자가 아닌 값은 제외)"""
+    times, values = [], []
+    for timestamp, value in rows:
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            continue
+        times.append(timestamp)
+        values.append(number)
+    return np.asarray(times, dtype=np.float64), np.asarray(values, dtype=np.float64)
+
+
+def downsample_minmax(times: np.ndarray, values: np.ndarray, buckets: int) -> dict:
+    """
+    시간 구간을 buckets개로 균등 분할해 구간별 min / max / avg / count
+    데이터가 없는 구간은 생략, t는 구간 시작 시각
+    """
+    start = times[0]
+    width = max((times[-1] - start) / buckets, 1e-9)
+    index = np.minimum(((times - start) / width).astype(np.int64), buckets - 1)
+
+    # 시각이 정렬되어 있으므로 구간 번호가 바뀌는 위치가 각 구간의 시작
+    starts = np.flatnonzero(np.diff(index, prepend=-1))
+    counts = np.diff(np.append(starts, len(values)))
+    sums = np.add.reduceat(values, starts)
+    return {
+        't': (start + index[starts] * width).round(3).tolist(),
+        'min': np.minimum.reduceat(values, starts).tolist(),
+        'max': np.maximum.reduceat(values, starts).tolist(),
+        'avg': (sums / counts).round(4).tolist(),
+        'count': counts.tolist(),
+    }
+
+
+def downsample_lttb(times: np.ndarray, values: np.ndarray, threshold: int) -> dict:
+    """
+    Largest-Triangle-Three-Buckets - 모양을 유지하는 threshold개 점 선택
+    첫 / 마지막 점은 항상 포함, 구간 안의 삼각형 넓이 계산은 벡터 연산
+    """
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return {'t': times.round(3).tolist(), 'value': values.tolist()}
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # 다음 구간 평균점 (마지막 구간은 마지막 점)
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        if next_lo >= next_hi:
+            next_lo, next_hi = n - 1, n
+        avg_t = times[next_lo:next_hi].mean()
+        avg_v = values[next_lo:next_hi].mean()
+
+        prev_t, prev_v = times[previous], values[previous]
+        area = np.abs((prev_t - avg_t) * (values[lo:hi] - prev_v)
+                      - (prev_t - times[lo:hi]) * (avg_v - prev_v))
+        previous = lo + int(area.argmax())
+        selected[i + 1] = previous
+
+    return {'t': times[selected].round(3).tolist(), 'value': values[selected].tolist()}
+
+
+def build_series(times: np.ndarray, values: np.ndarray, max_points: int, method: str) -> dict:
+    """
+    /api/history 응답 본문 (열 단위) - max_points 이하면 원본 그대로
+    lttb는 첫 / 마지막 점 외에 한 점 이상 필요하므로 max_points < 3이면 minmax로 대체
+    """
+    raw_points = len(values)
+    if raw_points <= max_points:
+        body = {'t': times.round(3).tolist(), 'value': values.tolist()}
+        method = None
+    elif method == 'lttb' and max_points >= 3:
+        body = downsample_lttb(times, values, max_points)
+    else:
+        method = 'minmax'
+        body = downsample_minmax(times, values, max_points)
+
+    return {
+        'raw_points': raw_points,
+        'points': len(body['t']),
+        'downsampled': method,
+        **body,
+    }
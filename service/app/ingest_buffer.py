@@ -0,0 +1,147 @@
+# ingest_buffer.py
+"""수신 큐 용량 제한 및 부하 차단 정책"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+
+class IngestItem:
+    """수신 프레임 1개 (latest 정책에서 frame을 제자리 교체하므로 mutable)"""
+
+    __slots__ = ('device_id', 'frame', 'received_at', 'key')
+
+    def __init__(self, device_id: str, frame: bytes, received_at: float, key=None):
+        self.device_id = device_id
+        self.frame = frame
+        self.received_at = received_at
+        self.key = key  # SEN이면 (device_id, metric_name), 아니면 None
+
+
+class IngestBuffer:
+    """
+    용량 제한 수신 버퍼
+
+    - CMD / ACK 등 SEN이 아닌 프레임: 절대 버리지 않음 (용량 초과 시 카운트만)
+    - SEN 프레임: 큐가 high_watermark 이상 차면 정책 적용
+        latest: 큐에 같은 metric이 있으면 값만 최신으로 교체
+        sample: metric별 sample_rate개 중 1개만 받음
+        drop:   새 SEN 버림
+      용량(capacity)에 도달하면 정책과 관계없이 새 SEN은 버림
+    """
+
+    POLICIES = ('latest', 'sample', 'drop')
+    SEN_PREFIX = b'SEN,'
+
+    def __init__(self, capacity: int = 1000, sen_policy: str = 'latest',
+                 sample_rate: int = 10, high_watermark: float = 0.8):
+        if sen_policy not in self.POLICIES:
+            raise ValueError(f"알 수 없는 정책: {sen_policy}")
+
+        self.capacity = capacity
+        self.sen_policy = sen_policy
+        self.sample_rate = max(1, sample_rate)
+        self.high_mark = max(1, int(capacity * high_watermark))
+
+        self.items = deque()
+        self.queued_sen: Dict[Tuple[str, str], IngestItem] = {}  # 큐에 있는 SEN (latest 정책용)
+        self.sample_counters: Dict[Tuple[str, str], int] = {}
+        self.cond = threading.Condition()
+
+        self.shed = {'coalesced': 0, 'sampled_out': 0, 'dropped': 0}
+        self.critical_over_capacity = 0
+
+    @classmethod
+    def sen_key(cls, device_id: str, frame: bytes) -> Optional[Tuple[str, str]]:
+        """SEN 프레임이면 (device_id, metric_name)"""
+        if not frame.startswith(cls.SEN_PREFIX):
+            return None
+        parts = frame.split(b',', 2)
+        if len(parts) < 3:
+            return None
+        return device_id, parts[1].decode('utf-8', 'replace')
+
+    def put(self, device_id: str, frame: bytes, received_at: float = None) -> bool:
+        """프레임 추가 - 버려지면 False (블로킹하지 않음)"""
+        if received_at is None:
+            received_at = time.time()
+        key = self.sen_key(device_id, frame)
+
+        with self.cond:
+            size = len(self.items)
+
+            if key is None:
+                if size >= self.capacity:
+                    self.critical_over_capacity += 1
+                self._append(IngestItem(device_id, frame, received_at))
+                return True
+
+            if size >= self.high_mark and not self._admit_sen(key, frame, received_at, size):
+                return False
+
+            item = IngestItem(device_id, frame, received_at, key)
+            self.queued_sen[key] = item
+            self._append(item)
+            return True
+
+    def _admit_sen(self, key, frame: bytes, received_at: float, size: int) -> bool:
+        """부하 상태에서 SEN 수용 여부 (lock 보유 상태에서 호출)"""
+        if self.sen_policy == 'latest':
+            queued = self.queued_sen.get(key)
+            if queued is not None:
+                queued.frame = frame
+                queued.received_at = received_at
+                self.shed['coalesced'] += 1
+                return False
+
+        elif self.sen_policy == 'sample':
+            count = self.sample_counters.get(key, 0) + 1
+            self.sample_counters[key] = count
+            if (count - 1) % self.sample_rate:
+                self.shed['sampled_out'] += 1
+                return False
+
+        if self.sen_policy == 'drop' or size >= self.capacity:
+            self.shed['dropped'] += 1
+            return False
+
+        return True
+
+    def _append(self, item: IngestItem):
+        self.items.append(item)
+        self.cond.notify()
+
+    def get_batch(self, max_items: int = 100, timeout: float = 0.5) -> List[IngestItem]:
+        """최대 max_items개를 꺼냄 (비어 있으면 timeout 동안 대기)"""
+        with self.cond:
+            if not self.items:
+                self.cond.wait(timeout)
+
+            batch = []
+            while self.items and len(batch) < max_items:
+                item = self.items.popleft()
+                if item.key is not None and self.queued_sen.get(item.key) is item:
+                    del self.queued_sen[item.key]
+                batch.append(item)
+
+            if not self.items:
+                self.sample_counters.clear()
+            return batch
+
+    def qsize(self) -> int:
+        with self.cond:
+            return len(self.items)
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def stats(self) -> dict:
+        with self.cond:
+            return {
+                'depth': len(self.items),
+                'capacity': self.capacity,
+                'policy': self.sen_policy,
+                'shed': dict(self.shed),
+                'critical_over_capacity': self.critical_over_capacity,
+            }
@@ -0,0 +1,73 @@
+# journal.py
+"""순번이 매겨진 이벤트 저널 (메모리 링 버퍼)"""
+
+import threading
+import time
+from typing import List, Optional
+
+
+class CursorTooOld(Exception):
+    """요청한 커서 이후의 이벤트 일부가 이미 버퍼에서 밀려남 (또는 서버 재시작 전 커서)"""
+
+    def __init__(self, oldest: int, latest: int):
+        super().__init__(f"cursor too old (oldest: {oldest}, latest: {latest})")
+        self.oldest = oldest
+        self.latest = latest
+
+
+class EventJournal:
+    """
+    수신 데이터 / CMO 이벤트를 순번(seq)과 함께 최근 capacity개까지 보관
+    - seq는 1부터 단조 증가, 커서(since) 이후 이벤트를 순서대로 조회
+    - 버퍼는 고정 크기 (capacity개를 넘으면 가장 오래된 이벤트부터 덮어씀)
+    """
+
+    def __init__(self, capacity: int = 10000, broadcaster=None):
+        self.capacity = capacity
+        self.broadcaster = broadcaster  # 있으면 추가된 이벤트를 SSE 구독자에게 전달
+        self.buffer: List[Optional[dict]] = [None] * capacity
+        self.next_seq = 1
+        self.lock = threading.Lock()
+
+    def append(self, event: dict) -> int:
+        """이벤트 추가 - seq / ts를 붙여 저장하고 seq 반환"""
+        with self.lock:
+            seq = self.next_seq
+            self.next_seq += 1
+            event = {'seq': seq, 'ts': event.pop('ts', None) or time.time(), **event}
+            self.buffer[seq % self.capacity] = event
+            if self.broadcaster:
+                # lock 안에서 전달해야 구독자에게도 seq 순서대로 도착
+                self.broadcaster.publish(event)
+            return seq
+
+    def latest(self) -> int:
+        """마지막 seq (없으면 0)"""
+        return self.next_seq - 1
+
+    def oldest(self) -> int:
+        """버퍼에 남아 있는 가장 오래된 seq"""
+        return max(1, self.next_seq - self.capacity)
+
+    def read(self, since: Optional[int] = None, limit: int = 100) -> List[dict]:
+        """
+        since 다음 seq부터 최대 limit개 (since가 None이면 남아 있는 가장 오래된 이벤트부터)
+        중간 이벤트가 밀려났으면 CursorTooOld
+        """
+        with self.lock:
+            latest = self.next_seq - 1
+            oldest = max(1, self.next_seq - self.capacity)
+            if since is None:
+                since = oldest - 1
+            if since + 1 < oldest or since > latest:
+                raise CursorTooOld(oldest, latest)
+
+            end = min(latest, since + limit)
+            return [self.buffer[seq % self.capacity] for seq in range(since + 1, end + 1)]
+
+    def stats(self) -> dict:
+        return {
+            'capacity': self.capacity,
+            'oldest': self.oldest(),
+            'latest': self.latest(),
+        }
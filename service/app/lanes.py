@@ -0,0 +1,229 @@
+# lanes.py
+"""디바이스별 명령 레인"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Set, Tuple
+
+from models import CMORequest
+
+
+# 우선순위 클래스 (앞일수록 먼저 전송)
+PRIORITIES = ('critical', 'interactive', 'background')
+
+
+class PriorityRules:
+    """
+    명령 기본 우선순위 (요청에 priority가 없을 때 적용)
+    디바이스 prefix -> metric -> 클래스, '*'는 해당 디바이스의 나머지 metric
+    - 출입문 / 엘리베이터 취소: 안전 관련이므로 critical
+    - 커튼 / 냉난방: 자동화 트래픽이므로 background
+    """
+
+    DEFAULTS = {
+        'ent': {'MOTOR': 'critical'},
+        'ele': {'CANCEL': 'critical', 'FLOOR': 'interactive'},
+        'cur': {'*': 'background'},
+        'dht': {'*': 'background'},
+    }
+
+    def __init__(self, rules: Dict[str, Dict[str, str]] = None, default: str = 'interactive'):
+        self.rules = self.DEFAULTS if rules is None else rules
+        self.default = default
+
+    def classify(self, cmo: CMORequest) -> str:
+        metrics = self.rules.get(cmo.device_id.split('_')[0], {})
+        return metrics.get(cmo.metric_name, metrics.get('*', self.default))
+
+
+class CoalesceRules:
+    """
+    전송 전 명령 병합 규칙 (아직 큐에 있는 명령에만 적용)
+    - dedupe: 같은 metric / value 명령이 대기 중이면 새 명령은 합침
+    - supersede: 상태를 지정하는 metric은 마지막 명령만 의미가 있으므로 대기 중인 이전 명령을 교체
+      (디바이스 prefix -> metric 목록, 엘리베이터 FLOOR 같은 누적 호출은 제외)
+    """
+
+    SUPERSEDE = {
+        'cur': {'MOTOR', 'MODE'},
+        'dht': {'AIR', 'HEAT', 'HUMI'},
+    }
+
+    def __init__(self, dedupe: bool = True, supersede: Dict[str, Set[str]] = None):
+        self.dedupe = dedupe
+        self.supersede = self.SUPERSEDE if supersede is None else supersede
+
+    def supersedes(self, cmo: CMORequest) -> bool:
+        prefix = cmo.device_id.split('_')[0]
+        return cmo.metric_name in self.supersede.get(prefix, ())
+
+
+class CommandLanes:
+    """
+    device_id별 명령 대기열 (레인마다 우선순위 클래스별 FIFO)
+    - 레인마다 한 번에 하나씩만 전송 (같은 클래스 안에서는 순서 유지)
+    - 높은 클래스 먼저 꺼냄, 같은 클래스는 먼저 들어온 순서
+    - 기아 방지: aging초 기다릴 때마다 한 단계씩 승격 취급 (0 이하면 승격 없음)
+    """
+
+    def __init__(self, rules: Optional[CoalesceRules] = None,
+                 priorities: Optional[PriorityRules] = None, aging: float = 2.0):
+        self.lanes: Dict[str, Dict[str, deque]] = {}  # device_id -> 클래스 -> 대기열
+        self.busy = set()  # 전송 중인 레인
+        self.rules = rules  # None이면 병합하지 않음
+        self.priorities = priorities or PriorityRules()
+        self.aging = aging
+        self.dispatched: Dict[str, int] = {}
+        self.merged: Dict[str, int] = {}
+        self.superseded: Dict[str, int] = {}
+        # supersede 대상 metric별 가장 최근 명령 생성 시각 (늦게 들어온 이전 명령 판별)
+        self.latest: Dict[Tuple[str, str], float] = {}
+        # 클래스별 큐 대기 시간 (take 시점 기준)
+        self.waits = {priority: {'count': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0}
+                      for priority in PRIORITIES}
+        self.cond = threading.Condition()
+
+    def put(self, cmo: CMORequest) -> CMORequest:
+        """
+        명령 추가 - 실제로 전송될 요청 반환 (병합되면 대기 중이던 요청)
+        이미 더 새로운 명령이 들어온 이전 명령(재전송 등)이면 superseded로 확정하고 그대로 반환 (대기열에 넣지 않음)
+        """
+        if cmo.priority not in PRIORITIES:
+            cmo.priority = self.priorities.classify(cmo)
+
+        with self.cond:
+            lane = self.lanes.get(cmo.device_id)
+            if lane is None:
+                lane = self.lanes[cmo.device_id] = {priority: deque() for priority in PRIORITIES}
+
+            if self.rules:
+                existing = self._coalesce(lane, cmo)
+                if existing is not None:
+                    return existing
+
+            cmo.queued_at = time.time()
+            lane[cmo.priority].append(cmo)
+            if cmo.device_id not in self.busy:
+                self.cond.notify()
+            return cmo
+
+    def _coalesce(self, lane: Dict[str, deque], cmo: CMORequest) -> Optional[CMORequest]:
+        """병합 규칙 적용 (lock 보유 상태) - 합쳐졌으면 대기 중인 요청 반환"""
+        device_id = cmo.device_id
+        supersedes = self.rules.supersedes(cmo)
+        if supersedes:
+            key = (device_id, cmo.metric_name)
+            if self.latest.get(key, 0.0) > cmo.timestamp:
+                # 재전송이 늦게 들어옴 - 그 사이 사용자가 보낸 새 명령을 덮어쓰면 안 됨
+                cmo.resolve('superseded')
+                self.superseded[device_id] = self.superseded.get(device_id, 0) + 1
+                print(f"[QUEUE] {device_id} {cmo.metric_name} 이전 명령 생략 (새 명령이 이미 들어옴): {cmo.command}")
+                return cmo
+            self.latest[key] = cmo.timestamp
+
+        same_metric = [queued for queue in lane.values() for queued in queue
+                       if queued.metric_name == cmo.metric_name]
+        if not same_metric:
+            return None
+
+        if supersedes:
+            for queued in same_metric:
+                lane[queued.priority].remove(queued)
+                queued.resolve('superseded')
+            self.superseded[device_id] = self.superseded.get(device_id, 0) + len(same_metric)
+            print(f"[QUEUE] 대기 중인 {device_id} {cmo.metric_name} 명령 {len(same_metric)}개를 새 명령으로 교체")
+            return None
+
+        if self.rules.dedupe:
+            for queued in same_metric:
+                if queued.value == cmo.value:
+                    self.merged[device_id] = self.merged.get(device_id, 0) + 1
+                    return queued
+
+        return None
+
+    def _pick(self, now: float) -> Optional[Tuple[str, str]]:
+        """꺼낼 (device_id, 클래스) 선택 (lock 보유 상태) - 유효 우선순위, 대기 시작 순"""
+        best, best_key = None, None
+        for device_id, lane in self.lanes.items():
+            if device_id in self.busy:
+                continue
+            for rank, priority in enumerate(PRIORITIES):
+                queue = lane[priority]
+                if not queue:
+                    continue
+                head = queue[0]
+                waited = now - head.queued_at
+                promoted = int(waited // self.aging) if self.aging > 0 else 0
+                key = (max(0, rank - promoted), head.queued_at)
+                if best_key is None or key < best_key:
+                    best, best_key = (device_id, priority), key
+        return best
+
+    def take(self, timeout: float = 0.5) -> Optional[Tuple[str, CMORequest]]:
+        """다음 명령 꺼내기 - 처리 후 반드시 done() 호출"""
+        with self.cond:
+            picked = self._pick(time.time())
+            if picked is None:
+                self.cond.wait(timeout)
+                picked = self._pick(time.time())
+            if picked is None:
+                return None
+
+            device_id, priority = picked
+            cmo = self.lanes[device_id][priority].popleft()
+            self.busy.add(device_id)
+
+            waited = time.time() - cmo.queued_at
+            stats = self.waits[priority]
+            stats['count'] += 1
+            stats['total'] += waited
+            stats['max'] = max(stats['max'], waited)
+            stats['last'] = waited
+            return device_id, cmo
+
+    def done(self, device_id: str):
+        """전송 완료 - 남은 명령이 있으면 다른 워커가 꺼낼 수 있도록 알림"""
+        with self.cond:
+            self.busy.discard(device_id)
+            self.dispatched[device_id] = self.dispatched.get(device_id, 0) + 1
+            if any(self.lanes.get(device_id, {}).values()):
+                self.cond.notify()
+
+    def qsize(self) -> int:
+        with self.cond:
+            return sum(len(queue) for lane in self.lanes.values() for queue in lane.values())
+
+    def stats(self) -> dict:
+        """레인별 대기 수 / 전송 수"""
+        with self.cond:
+            return {
+                device_id: {
+                    'depth': sum(len(queue) for queue in lane.values()),
+                    'busy': device_id in self.busy,
+                    'dispatched': self.dispatched.get(device_id, 0),
+                    'merged': self.merged.get(device_id, 0),
+                    'superseded': self.superseded.get(device_id, 0),
+                }
+                for device_id, lane in self.lanes.items()
+            }
+
+    def priority_stats(self) -> dict:
+        """클래스별 대기 수 / 큐 대기 시간 (ms)"""
+        with self.cond:
+            result = {}
+            for priority, stats in self.waits.items():
+                count = stats['count']
+                result[priority] = {
+                    'depth': sum(len(lane[priority]) for lane in self.lanes.values()),
+                    'dispatched': count,
+                    'avg_wait_ms': round(stats['total'] / count * 1000, 1) if count else 0.0,
+                    'max_wait_ms': round(stats['max'] * 1000, 1),
+                    'last_wait_ms': round(stats['last'] * 1000, 1),
+                }
+            return result
+
+    def wake_all(self):
+        with self.cond:
+            self.cond.notify_all()
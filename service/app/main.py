@@ -2,21 +2,195 @@
 """메인 실행 파일"""
 
 import os
+import argparse
 from dotenv import load_dotenv
 
 from app import SerialMonitorApp
+from async_app import AsyncSerialMonitorApp
+from storage import SQLiteBackend
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="시리얼 모니터")
+    parser.add_argument(
+        '--runtime', choices=['thread', 'asyncio'], default='thread',
+        help="실행 방식 (thread: 스레드 기반, asyncio: 이벤트 루프 기반)"
+    )
+    parser.add_argument(
+        '--server', choices=['dev', 'production'], default='dev',
+        help="REST API 서버 (dev: Flask 개발 서버, production: waitress 멀티스레드 WSGI 서버)"
+    )
+    parser.add_argument(
+        '--http-port', type=int, default=5000,
+        help="REST API 포트"
+    )
+    parser.add_argument(
+        '--http-threads', type=int, default=32,
+        help="production 서버 요청 처리 스레드 수"
+    )
+    parser.add_argument(
+        '--http-keepalive', type=int, default=30,
+        help="production 서버 유휴 keep-alive 연결 유지 시간 (초)"
+    )
+    parser.add_argument(
+        '--http-backlog', type=int, default=1024,
+        help="production 서버 수락 대기 연결 수"
+    )
+    parser.add_argument(
+        '--http-connection-limit', type=int, default=1000,
+        help="production 서버 동시 연결 수"
+    )
+    parser.add_argument(
+        '--ingest-workers', type=int, default=2,
+        help="수신 데이터 파싱 / 저장 워커 수"
+    )
+    parser.add_argument(
+        '--ingest-queue-size', type=int, default=1000,
+        help="워커별 수신 큐 최대 크기"
+    )
+    parser.add_argument(
+        '--sen-policy', choices=['latest', 'sample', 'drop'], default='latest',
+        help="수신 큐가 찼을 때 SEN 처리 정책 (CMD/ACK는 버리지 않음)"
+    )
+    parser.add_argument(
+        '--sen-sample-rate', type=int, default=10,
+        help="sample 정책에서 metric별 N개 중 1개만 저장"
+    )
+    parser.add_argument(
+        '--dispatch-workers', type=int, default=4,
+        help="디바이스 레인 명령 전송 워커 수"
+    )
+    parser.add_argument(
+        '--correlation-ids', action='store_true',
+        help="CMO에 seq를 붙여 전송 (펌웨어가 ACK,metric,value,seq로 응답해야 함)"
+    )
+    parser.add_argument(
+        '--no-coalesce', dest='coalesce', action='store_false',
+        help="대기 중인 중복 / 대체 명령 병합 끄기"
+    )
+    parser.add_argument(
+        '--tx-bytes-per-sec', type=float, default=0,
+        help="포트별 송신 바이트 속도 제한 (0이면 baudrate / 10)"
+    )
+    parser.add_argument(
+        '--tx-lines-per-sec', type=float, default=10.0,
+        help="포트별 초당 송신 명령 수 제한"
+    )
+    parser.add_argument(
+        '--priority-aging', type=float, default=2.0,
+        help="낮은 우선순위 명령이 N초 기다릴 때마다 한 단계씩 승격 (기아 방지, 0이면 승격 없음)"
+    )
+    parser.add_argument(
+        '--cmd-retries', type=int, default=0,
+        help="ACK 타임아웃 시 재전송 횟수 (지수 백오프 + jitter, --guard 대상만)"
+    )
+    parser.add_argument(
+        '--guard', action='append', default=[], metavar='DEVICE[:METRIC]',
+        help="재전송 / 서킷 브레이커를 적용할 디바이스 또는 명령 (예: dht_001, dht_001:AIR) - "
+             "ACK가 바로 오고 다시 보내도 안전한 명령만 지정"
+    )
+    parser.add_argument(
+        '--retry-backoff', type=float, default=0.5,
+        help="재전송 백오프 기본 간격 (초, 재시도마다 2배)"
+    )
+    parser.add_argument(
+        '--breaker-failures', type=int, default=3,
+        help="--guard 대상 명령이 연속 N회 ACK 실패면 디바이스 차단 (/api/command 503)"
+    )
+    parser.add_argument(
+        '--breaker-open-s', type=float, default=15.0,
+        help="차단 후 프로브를 허용하기까지 대기 시간 (초)"
+    )
+    parser.add_argument(
+        '--probe', action='append', default=[], metavar='DEVICE=METRIC,VALUE',
+        help="차단된 디바이스에 주기적으로 보낼 프로브 명령 (예: ele_001=FLOOR,1)"
+    )
+    parser.add_argument(
+        '--max-waiters', type=int, default=None,
+        help="/api/command wait=true로 동시에 ACK를 기다릴 수 있는 요청 수 - 대기 요청마다 HTTP 스레드 하나를 "
+             "점유하므로 --http-threads의 1/4까지 (기본 32 스레드면 8, 초과 요청은 503)"
+    )
+    parser.add_argument(
+        '--max-pollers', type=int, default=None,
+        help="/api/state wait_ms로 동시에 대기할 수 있는 요청 수 (기본: HTTP 스레드의 1/4)"
+    )
+    parser.add_argument(
+        '--max-streams', type=int, default=None,
+        help="/api/stream 동시 연결 수 (기본: HTTP 스레드의 1/4)"
+    )
+    parser.add_argument(
+        '--journal-size', type=int, default=10000,
+        help="/api/events 이벤트 저널에 보관할 최근 이벤트 수"
+    )
+    parser.add_argument(
+        '--history-points', type=int, default=86400,
+        help="metric별 메모리에 보관할 최근 값 수 (/api/history, 1초 주기면 하루)"
+    )
+    parser.add_argument(
+        '--history-memory-mb', type=float, default=64,
+        help="최근 이력 링 버퍼 전체 메모리 상한 (MB, 넘는 metric은 DB에서만 조회)"
+    )
+    parser.add_argument(
+        '--stream-buffer', type=int, default=256,
+        help="/api/stream 클라이언트별 버퍼 이벤트 수 (절반부터 SEN 생략, 가득 차면 연결 종료)"
+    )
+    parser.add_argument(
+        '--db-backend', choices=['mysql', 'sqlite'],
+        default=os.getenv('DB_BACKEND', 'mysql'),
+        help="로그 저장소 (mysql: DB_HOST 등 환경변수 사용, sqlite: 내장 DB 파일)"
+    )
+    parser.add_argument(
+        '--sqlite-path', default=os.getenv('SQLITE_PATH', 'iot_logs.db'),
+        help="sqlite 저장소 파일 경로"
+    )
+    parser.add_argument(
+        '--db-batch-size', type=int, default=100,
+        help="DB 일괄 저장 행 수 (1이면 한 건씩 즉시 저장)"
+    )
+    parser.add_argument(
+        '--db-flush-ms', type=int, default=200,
+        help="DB 일괄 저장 최대 대기 시간 (ms)"
+    )
+    parser.add_argument(
+        '--db-pool-min', type=int, default=1,
+        help="DB 커넥션 풀 최소 크기"
+    )
+    parser.add_argument(
+        '--db-pool-max', type=int, default=4,
+        help="DB 커넥션 풀 최대 크기"
+    )
+    parser.add_argument(
+        '--spool-path', default='log_spool.db',
+        help="DB 장애 시 로그를 보관할 로컬 스풀 파일 (빈 값이면 사용 안 함)"
+    )
+    args = parser.parse_args()
+    if args.priority_aging < 0:
+        parser.error("--priority-aging은 0 이상이어야 합니다")
+    return args
 
 
 def main():
     load_dotenv()
+    args = parse_args()
     
     # DB 설정
     db_config = {
-        'host': os.getenv('DB_HOST'),
-        'user': os.getenv('DB_USER'),
-        'password': os.getenv('DB_PASSWORD'),
-        'database': os.getenv('DB_NAME')
+        'batch_size': args.db_batch_size,
+        'flush_interval_ms': args.db_flush_ms
     }
+    if args.db_backend == 'sqlite':
+        # 로컬 파일이라 장애 스풀 불필요
+        db_config['backend'] = SQLiteBackend(args.sqlite_path)
+    else:
+        db_config.update({
+            'host': os.getenv('DB_HOST'),
+            'user': os.getenv('DB_USER'),
+            'password': os.getenv('DB_PASSWORD'),
+            'database': os.getenv('DB_NAME'),
+            'pool_min': args.db_pool_min,
+            'pool_max': args.db_pool_max,
+            'spool_path': args.spool_path or None
+        })
     
     # 포트 설정
     port_config = {
@@ -26,8 +200,52 @@ def main():
         'cur_001': '/dev/ttyACM#',
     }
     
+    if args.cmd_retries and not args.guard:
+        print("[WARNING] --guard 대상이 없어 --cmd-retries는 적용되지 않습니다")
+    
+    # 서킷 브레이커 프로브 명령
+    probe_commands = {}
+    for probe in args.probe:
+        device_id, _, command = probe.partition('=')
+        metric_name, _, value = command.partition(',')
+        probe_commands[device_id] = (metric_name, value)
+    
     # 애플리케이션 실행
-    app = SerialMonitorApp(db_config, port_config)
+    app_class = AsyncSerialMonitorApp if args.runtime == 'asyncio' else SerialMonitorApp
+    app = app_class(
+        db_config, port_config,
+        ingest_workers=args.ingest_workers,
+        ingest_queue_size=args.ingest_queue_size,
+        sen_policy=args.sen_policy,
+        sen_sample_rate=args.sen_sample_rate,
+        dispatch_workers=args.dispatch_workers,
+        correlation_ids=args.correlation_ids,
+        coalesce=args.coalesce,
+        priority_aging=args.priority_aging,
+        tx_byte_rate=args.tx_bytes_per_sec or None,
+        tx_line_rate=args.tx_lines_per_sec,
+        retries=args.cmd_retries,
+        backoff_base=args.retry_backoff,
+        failure_threshold=args.breaker_failures,
+        open_seconds=args.breaker_open_s,
+        probe_commands=probe_commands,
+        guarded=args.guard,
+        max_waiters=args.max_waiters,
+        max_pollers=args.max_pollers,
+        max_streams=args.max_streams,
+        journal_size=args.journal_size,
+        stream_buffer=args.stream_buffer,
+        history_capacity=args.history_points,
+        history_budget_mb=args.history_memory_mb,
+        server_config={
+            'mode': args.server,
+            'port': args.http_port,
+            'threads': args.http_threads,
+            'keepalive': args.http_keepalive,
+            'backlog': args.http_backlog,
+            'connection_limit': args.http_connection_limit,
+        }
+    )
     app.run()
 
 
@@ -2,7 +2,9 @@
 """데이터 모델 정의"""
 
 import time
+from concurrent.futures import Future, InvalidStateError
 from dataclasses import dataclass, field
+from typing import Optional
 
 
 @dataclass
@@ -14,12 +16,36 @@ class CMORequest:
     command: str
     timestamp: float = field(default_factory=time.time)
     timeout: float = 10.0
+    seq: int = 0  # 전송 시 QueueProcessor가 부여하는 상관 ID
+    sent_at: float = 0.0  # 시리얼 전송 시각
+    attempts: int = 0  # 전송 횟수 (재전송 포함)
+    probe: bool = False  # 서킷 브레이커 프로브 명령
+    priority: Optional[str] = None  # critical / interactive / background (None이면 레인 규칙으로 결정)
+    queued_at: float = 0.0  # 레인에 들어간 시각
+    future: Future = field(default_factory=Future, repr=False, compare=False)  # 처리 결과 (ACK / 타임아웃 등)
+    
+    def resolve(self, status: str, **info):
+        """처리 결과 확정 - 처음 한 번만 반영 (acked / timeout / superseded / rejected / send_failed / error)"""
+        try:
+            self.future.set_result({'status': status, 'seq': self.seq, 'attempts': self.attempts, **info})
+        except InvalidStateError:
+            pass
+    
+    def follow(self, other: 'CMORequest'):
+        """병합된 요청 - other의 결과를 그대로 따름"""
+        other.future.add_done_callback(
+            lambda future: self.resolve(**{**future.result(), 'merged': True})
+        )
     
     def is_expired(self) -> bool:
         return (time.time() - self.timestamp) > self.timeout
     
     def elapsed_time(self) -> float:
         return time.time() - self.timestamp
+    
+    def round_trip_time(self) -> float:
+        """전송 후 경과 시간 (큐 대기 제외)"""
+        return time.time() - (self.sent_at or self.timestamp)
 
 
 @dataclass
@@ -28,4 +54,6 @@ class SerialData:
     device_id: str
     data_type: str
     metric_name: str
-    value: str
\ No newline at end of file
+    value: str
+    received_at: float = field(default_factory=time.time)  # 포트에서 읽은 시각
+    seq: Optional[int] = None  # CMO/ACK 상관 ID (4번째 필드, 없으면 None)
\ No newline at end of file
@@ -1,12 +1,16 @@
 # monitor.py
 """단일 포트 시리얼 모니터"""
 
+import time
 import serial
 from queue import Queue
 from datetime import datetime
 
 from models import CMORequest
 from parser import SerialParser
+from framer import LineFramer
+from shaper import TxShaper
+from writer import PortWriter, WriteHandle
 from database import DatabaseHandler
 
 
@@ -14,7 +18,9 @@ class SerialMonitor:
     """단일 포트 모니터"""
     
     def __init__(self, device_id: str, port: str, cmd_queue: Queue,
-                 db_handler: DatabaseHandler, baudrate: int = 9600):
+                 db_handler: DatabaseHandler, baudrate: int = 9600,
+                 tx_byte_rate: float = None, tx_line_rate: float = 10.0,
+                 tx_timeout: float = 5.0):
         self.device_id = device_id
         self.port = port
         self.baudrate = baudrate
@@ -24,6 +30,15 @@ class SerialMonitor:
         self.db_handler = db_handler
         self.available_devices = []  # app.py에서 할당됨
         self.queue_processor = None  # app.py에서 할당됨 (ACK 처리)
+        self.framer = LineFramer()  # 줄바꿈 전까지의 미완성 데이터 보관
+        self.pipeline = None  # app.py에서 할당됨 (없으면 리더 스레드에서 바로 처리)
+        self.journal = None  # app.py에서 할당됨 (이벤트 저널)
+        self.history = None  # app.py에서 할당됨 (최근 이력 링 버퍼)
+        
+        # 송신 속도 제한 (기본: 8N1 기준 baudrate / 10 바이트/초)
+        self.shaper = TxShaper(tx_byte_rate or baudrate / 10, tx_line_rate)
+        self.tx_timeout = tx_timeout
+        self.writer = None  # 송신 스레드 (첫 전송 시 시작)
     
     @staticmethod
     def find_target_device(metric_name: str, available_devices: list):
@@ -48,37 +63,93 @@ class SerialMonitor:
             print(f"[✗] {self.port} 연결 실패: {e}")
             return False
     
+    def fileno(self) -> int:
+        """selector 등록용 파일 디스크립터"""
+        return self.ser.fileno()
+    
     def run(self):
-        """데이터 수신 및 처리"""
+        """데이터 수신 및 처리 (fileno를 지원하지 않는 포트용 단독 루프)"""
         while self.running:
             try:
-                if self.ser and self.ser.in_waiting > 0:
-                    line = self.ser.readline().decode('utf-8').strip()
-                    if not line:
-                        continue
-                    
-                    self._log_received(line)
-                    self._process_data(line)
+                if not self.ser:
+                    break
+                
+                # timeout=1 동안 블로킹 대기 - 유휴 시 CPU를 점유하지 않음
+                line = self.ser.readline().strip()
+                if not line:
+                    continue
+                
+                self._dispatch_frames([line], time.time())
             
-            except UnicodeDecodeError:
-                continue
             except Exception as e:
                 print(f"[ERROR] {self.port} 오류: {e}")
     
+    def read_available(self) -> bool:
+        """
+        수신 버퍼의 데이터를 한 번에 읽어 완성된 프레임만 넘김 (SerialReader에서 호출)
+        포트가 닫혔거나 오류가 나면 False
+        """
+        if not self.running or not self.ser:
+            return False
+        
+        try:
+            chunk = self.ser.read(self.ser.in_waiting or 1)
+        except Exception as e:
+            print(f"[ERROR] {self.port} 오류: {e}")
+            return False
+        
+        if not chunk:
+            return True
+        
+        frames = self.framer.feed(chunk)
+        if frames:
+            self._dispatch_frames(frames, time.time())
+        
+        return True
+    
+    def _dispatch_frames(self, frames, received_at: float):
+        """파이프라인이 있으면 워커로 넘기고, 없으면 바로 처리"""
+        if self.pipeline:
+            self.pipeline.submit(self.device_id, frames, received_at)
+        else:
+            self._process_frames(frames, received_at)
+    
+    def _process_frames(self, frames, received_at: float = None):
+        """프레임 묶음 처리"""
+        for parsed in SerialParser.parse_batch(frames, self.device_id, received_at):
+            try:
+                self._process_parsed(parsed)
+            except Exception as e:
+                print(f"[ERROR] {self.port} 처리 오류: {e}")
+    
     def _process_data(self, line: str):
         """수신 데이터 처리"""
         parsed = SerialParser.parse(line, self.device_id)
         if not parsed:
             return
         
+        self._process_parsed(parsed)
+    
+    def _process_parsed(self, parsed):
+        """파싱된 데이터 처리"""
         if hasattr(self, 'system_state') and self.system_state:
             self.system_state.update(
                 parsed.device_id,
                 parsed.data_type,
                 parsed.metric_name,
-                parsed.value
+                parsed.value,
+                parsed.received_at
         )
         
+        if self.journal:
+            self.journal.append({
+                'type': parsed.data_type,
+                'device_id': parsed.device_id,
+                'metric_name': parsed.metric_name,
+                'value': parsed.value,
+                'ts': parsed.received_at,
+            })
+        
         if parsed.data_type == 'CMD':
             self._handle_cmd(parsed)
         
@@ -113,7 +184,10 @@ class SerialMonitor:
     def _handle_sen(self, parsed):
         """센서 데이터 처리"""
         self.db_handler.insert_log(parsed.device_id, parsed.data_type,
-                                  parsed.metric_name, parsed.value)
+                                  parsed.metric_name, parsed.value, parsed.received_at)
+        if self.history:
+            self.history.append(parsed.device_id, parsed.metric_name,
+                                parsed.received_at, parsed.value)
     
     def _handle_ack(self, parsed):
         """ACK 응답 처리"""
@@ -121,29 +195,36 @@ class SerialMonitor:
         
         # queue_processor에 ACK 처리 요청
         if self.queue_processor:
-            self.queue_processor.handle_ack(parsed.device_id, parsed.metric_name)
+            self.queue_processor.handle_ack(parsed.device_id, parsed.metric_name, parsed.seq)
     
     def _log_received(self, data: str):
         """수신 로그"""
         ts = datetime.now().strftime("%H:%M:%S.%f")[:-3]
         #print(f"[{ts}] [{self.port}] 수신: {data}")
     
-    def send_command(self, command: str) -> bool:
-        """명령 전송"""
+    def send_command(self, command: str) -> WriteHandle:
+        """
+        명령 전송 요청 - 포트 송신 스레드에 넘기고 완료 핸들을 바로 반환
+        (핸들 결과: 전송 성공 여부, 실패가 확정되기 전까지는 참)
+        """
         if not self.ser or not self.ser.is_open:
-            return False
+            return WriteHandle.failed()
         
-        try:
-            self.ser.write(f"{command}\n".encode('utf-8'))
-            print(f"[SEND] [{self.port}] {command}")
-            return True
-        except Exception as e:
-            print(f"[ERROR] {self.port} 전송 실패: {e}")
-            return False
+        if self.writer is None:
+            # 링크 / Arduino 수신 버퍼가 감당할 수 있는 속도로만 전송
+            self.writer = PortWriter(self.port, lambda data: self.ser.write(data),
+                                     self.shaper, self.tx_timeout)
+            self.writer.start()
+        
+        handle = self.writer.submit(f"{command}\n".encode('utf-8'))
+        print(f"[SEND] [{self.port}] {command}")
+        return handle
     
     def close(self):
         """연결 종료"""
         self.running = False
+        if self.writer:
+            self.writer.stop()
         if self.ser and self.ser.is_open:
             self.ser.close()
             print(f"[○] {self.port} 연결 종료")
\ No newline at end of file
@@ -1,7 +1,7 @@
 # parser.py
 """시리얼 데이터 파싱"""
 
-from typing import Optional
+from typing import Iterable, List, Optional
 from models import SerialData
 
 
@@ -10,27 +10,52 @@ class SerialParser:
     
     DELIMITER = ','
     VALID_TYPES = {'SEN', 'CMD', 'ACK', 'CMO'}
+    SEQ_TYPES = {'ACK', 'CMO'}
     
     @staticmethod
     def parse(raw_data: str, device_id: str) -> Optional[SerialData]:
         """
-        파싱: data_type,metric_name,value
+        파싱: data_type,metric_name,value[,seq]
         device_id는 포트에서 주입
+        seq는 CMO/ACK에만 선택적으로 붙는 상관 ID
         """
         try:
             parts = raw_data.strip().split(SerialParser.DELIMITER)
-            if len(parts) != 3:
+            if len(parts) == 4 and parts[0] in SerialParser.SEQ_TYPES:
+                data_type, metric_name, value, seq = parts
+                seq = int(seq)
+            elif len(parts) == 3:
+                data_type, metric_name, value = parts
+                seq = None
+            else:
                 print(f"[ERROR] 잘못된 형식: {raw_data}")
                 return None
             
-            data_type, metric_name, value = parts
-            
             if data_type not in SerialParser.VALID_TYPES:
                 print(f"[ERROR] 잘못된 data_type: {data_type}")
                 return None
             
-            return SerialData(device_id, data_type, metric_name, value)
+            return SerialData(device_id, data_type, metric_name, value, seq=seq)
         
         except Exception as e:
             print(f"[ERROR] 파싱 실패: {e}")
-            return None
\ No newline at end of file
+            return None
+    
+    @staticmethod
+    def parse_batch(frames: Iterable[bytes], device_id: str,
+                    received_at: Optional[float] = None) -> List[SerialData]:
+        """프레임 묶음을 한 번에 파싱 (디코딩 실패 / 잘못된 형식은 건너뜀)"""
+        results = []
+        for frame in frames:
+            try:
+                line = frame.decode('utf-8')
+            except UnicodeDecodeError:
+                continue
+            
+            parsed = SerialParser.parse(line, device_id)
+            if parsed:
+                if received_at is not None:
+                    parsed.received_at = received_at
+                results.append(parsed)
+        
+        return results
@@ -0,0 +1,112 @@
+# pipeline.py
+"""수신 프레임 처리 파이프라인 (프레이밍 스레드 → 파싱/저장 워커)"""
+
+import threading
+import time
+import zlib
+from itertools import groupby
+from typing import Dict, List
+
+from ingest_buffer import IngestBuffer
+
+
+class IngestPipeline:
+    """
+    리더는 프레임과 수신 시각만 버퍼에 넣고,
+    워커 풀이 파싱 / 상태 갱신 / CMD 라우팅 / DB 저장을 수행
+
+    같은 device_id는 항상 같은 워커로 보내 순서를 보장
+    버퍼가 차면 IngestBuffer 정책에 따라 SEN만 버리고 리더는 블로킹하지 않음
+    """
+
+    def __init__(self, monitors: Dict[str, object], workers: int = 2,
+                 queue_size: int = 1000, sen_policy: str = 'latest',
+                 sample_rate: int = 10):
+        self.monitors = monitors  # device_id -> SerialMonitor
+        self.buffers = [
+            IngestBuffer(queue_size, sen_policy, sample_rate)
+            for _ in range(max(1, workers))
+        ]
+        self.threads = []
+        self.running = False
+
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.processed = 0
+
+    def _buffer_for(self, device_id: str) -> IngestBuffer:
+        return self.buffers[zlib.crc32(device_id.encode()) % len(self.buffers)]
+
+    def submit(self, device_id: str, frames: List[bytes], received_at: float = None):
+        """리더 스레드에서 호출 - 프레임을 워커 버퍼에 추가"""
+        if received_at is None:
+            received_at = time.time()
+
+        buffer = self._buffer_for(device_id)
+        for frame in frames:
+            buffer.put(device_id, frame, received_at)
+
+        with self.lock:
+            self.submitted += len(frames)
+
+    def start(self):
+        """워커 스레드 시작"""
+        self.running = True
+        for i, buffer in enumerate(self.buffers):
+            thread = threading.Thread(
+                target=self._worker,
+                args=(buffer,),
+                daemon=True,
+                name=f"IngestWorker-{i}"
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def _worker(self, buffer: IngestBuffer):
+        """파싱 / 처리 워커"""
+        while self.running or not buffer.empty():
+            by_device: Dict[str, list] = {}
+            for item in buffer.get_batch():
+                by_device.setdefault(item.device_id, []).append(item)
+
+            for device_id, items in by_device.items():
+                monitor = self.monitors.get(device_id)
+                if monitor:
+                    # 같은 읽기에서 나온 프레임(수신 시각이 같음)끼리 parse_batch로 한 번에 파싱
+                    for received_at, run in groupby(items, key=lambda item: item.received_at):
+                        try:
+                            monitor._process_frames([item.frame for item in run], received_at)
+                        except Exception as e:
+                            print(f"[ERROR] {device_id} 처리 오류: {e}")
+
+                with self.lock:
+                    self.processed += len(items)
+
+    def stats(self) -> dict:
+        """단계별 큐 상태 및 버린 프레임 수"""
+        buffers = [buffer.stats() for buffer in self.buffers]
+        shed = {}
+        for buffer_stats in buffers:
+            for reason, count in buffer_stats['shed'].items():
+                shed[reason] = shed.get(reason, 0) + count
+
+        with self.lock:
+            return {
+                'workers': len(self.buffers),
+                'queue_depths': [b['depth'] for b in buffers],
+                'framer_pending': {
+                    device_id: monitor.framer.pending()
+                    for device_id, monitor in list(self.monitors.items())
+                },
+                'submitted': self.submitted,
+                'processed': self.processed,
+                'shed': shed,
+                'critical_over_capacity': sum(b['critical_over_capacity'] for b in buffers),
+            }
+
+    def stop(self, timeout: float = 2.0):
+        """남은 프레임을 처리한 뒤 워커 종료"""
+        self.running = False
+        for thread in self.threads:
+            thread.join(timeout=timeout)
+        self.threads.clear()
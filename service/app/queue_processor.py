@@ -1,88 +1,393 @@
 # queue_processor.py
 """CMD 큐 처리 및 CMO 전송"""
 
-from typing import Dict
+import time
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Iterable, Optional, Tuple
 from queue import Queue, Empty
 
 from models import CMORequest
+from scheduler import DeadlineScheduler
+from lanes import CoalesceRules, CommandLanes
+from device_health import DeviceHealthRegistry, backoff_delay
 
 
 class QueueProcessor:
     """CMO 큐 처리 및 전송, ACK 대기"""
     
-    def __init__(self, cmd_queue: Queue, monitors: Dict[str, object]):
+    MAX_WAIT = 1.0  # 큐 대기 최대 시간 (초)
+    
+    def __init__(self, cmd_queue: Queue, monitors: Dict[str, object],
+                 dispatch_workers: int = 4, correlation_ids: bool = False,
+                 coalesce: bool = True, retries: int = 0,
+                 backoff_base: float = 0.5, backoff_max: float = 5.0,
+                 failure_threshold: int = 3, open_seconds: float = 15.0,
+                 probe_commands: Dict[str, Tuple[str, str]] = None,
+                 priority_aging: float = 2.0, guarded: Iterable[str] = ()):
         self.cmd_queue = cmd_queue
         self.monitors = monitors  # device_id -> SerialMonitor
         self.running = False
-        self.pending_requests = {}  # device_id:metric_name -> CMORequest (전송 대기 중)
+        # device_id:metric_name -> OrderedDict(seq -> CMORequest) (ACK 대기 중, 전송 순서)
+        self.pending_requests: Dict[str, OrderedDict] = {}
+        
+        # correlation_ids=True면 "CMO,metric,value,seq"로 전송 (펌웨어가 ACK에 seq를 돌려줘야 함)
+        self.correlation_ids = correlation_ids
+        self.seq_counter = itertools.count(1)
+        # ACK 타임아웃 / 재전송 예정 시각 (최소 힙) - 둘이 같은 Condition을 공유해 타이머 스레드 하나가 대기
+        self.timer_cond = threading.Condition()
+        self.timer_thread = None
+        self.deadlines = DeadlineScheduler(self.timer_cond)
+        self.lock = threading.Lock()  # pending_requests 보호 (ACK는 다른 스레드에서 옴)
+        
+        # 디바이스별 레인 + 전송 워커 (느린 포트가 다른 디바이스 명령을 막지 않음)
+        # coalesce=True면 대기 중인 중복 / 대체되는 명령은 전송 전에 병합
+        # 레인 안에서는 우선순위 클래스 순 (priority_aging초마다 한 단계씩 승격 취급)
+        self.lanes = CommandLanes(CoalesceRules() if coalesce else None, aging=priority_aging)
+        self.dispatch_workers = max(1, dispatch_workers)
+        self.dispatch_threads = []
+        
+        # 재전송 / 서킷 브레이커 적용 대상 ("device_id" 또는 "device_id:metric_name")
+        # 펌웨어가 ACK를 보내지 않거나 늦게 보내는 명령(출입문 MOTOR, 엘리베이터 도착 ACK 등)이 있으므로
+        # 다시 보내도 안전하고 ACK가 바로 오는 명령만 지정
+        self.guarded = set(guarded)
+        
+        # ACK 타임아웃 시 재전송 (지수 백오프 + jitter)
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_at = DeadlineScheduler(self.timer_cond)
+        
+        # 디바이스별 상태 점수 / 서킷 브레이커
+        # probe_commands: device_id -> (metric_name, value), half_open 시 주기적으로 전송
+        # (설정이 없는 디바이스는 half_open 이후 첫 명령이 프로브 역할)
+        self.health = DeviceHealthRegistry(failure_threshold, open_seconds)
+        self.probe_commands = probe_commands or {}
+        
+        self.journal = None  # app.py에서 할당됨 (CMO 전송 / 결과 이벤트 기록)
     
     def run(self):
-        """큐 처리"""
+        """큐 처리 - 큐에서 꺼낸 명령을 디바이스 레인으로 분배"""
         self.running = True
+        self._start_dispatchers()
+        self.timer_thread = threading.Thread(target=self._timer_loop, daemon=True, name="DeadlineTimer")
+        self.timer_thread.start()
         
         while self.running:
             try:
-                cmo = self.cmd_queue.get(timeout=1)
-                self._process_cmo(cmo)
+                cmo = self.cmd_queue.get(timeout=self.MAX_WAIT)
+                self._enqueue(cmo)
             
             except Empty:
-                # 타임아웃 확인
-                self._check_pending_timeouts()
-                continue
+                pass
             except Exception as e:
                 print(f"[ERROR] 큐 처리 오류: {e}")
     
+    def _timer_loop(self):
+        """
+        ACK 만료 / 재전송 / 프로브 확인 (힙 top만 확인하므로 O(1))
+        전송 워커가 더 이른 만료 시각을 등록하면 바로 깨어나므로 큐 대기와 관계없이 제시간에 만료
+        """
+        while self.running:
+            try:
+                self._check_pending_timeouts()
+                self._check_retries()
+                self._send_probes()
+            except Exception as e:
+                print(f"[ERROR] 만료 처리 오류: {e}")
+            
+            with self.timer_cond:
+                if self.running:
+                    self.timer_cond.wait(self._wait_time())
+    
+    def _start_dispatchers(self):
+        """레인 전송 워커 시작"""
+        for i in range(self.dispatch_workers):
+            thread = threading.Thread(
+                target=self._dispatch_loop,
+                daemon=True,
+                name=f"Dispatch-{i}"
+            )
+            thread.start()
+            self.dispatch_threads.append(thread)
+    
+    def _dispatch_loop(self):
+        """레인에서 명령을 꺼내 전송"""
+        while self.running:
+            try:
+                item = self.lanes.take()
+            except Exception as e:
+                # 레인 오류로 전송 워커가 조용히 종료되지 않도록
+                print(f"[ERROR] 레인 처리 오류: {e}")
+                time.sleep(self.MAX_WAIT)
+                continue
+            if not item:
+                continue
+            
+            device_id, cmo = item
+            self._dispatch(device_id, cmo)
+    
+    def _dispatch(self, device_id: str, cmo: CMORequest):
+        """
+        레인에서 꺼낸 명령 전송 - 실제 write가 끝날 때까지 레인을 점유
+        (송신 대기열에는 디바이스당 한 줄만 두고, 나머지는 레인에서 병합 / 우선순위 적용)
+        """
+        handle = None
+        try:
+            handle = self._process_cmo(cmo)
+        except Exception as e:
+            print(f"[ERROR] {device_id} 전송 오류: {e}")
+        
+        if isinstance(handle, Future):
+            handle.add_done_callback(lambda _: self._release(device_id))
+        else:
+            self._release(device_id)
+    
+    def _release(self, device_id: str):
+        """레인 점유 해제 (다음 명령을 꺼낼 수 있음)"""
+        self.lanes.done(device_id)
+    
+    def _wait_time(self) -> float:
+        """다음 만료 / 재전송 시각까지 대기할 시간 (최대 MAX_WAIT, 프로브 확인 주기)"""
+        deadlines = [d for d in (self.deadlines.next_deadline(), self.retry_at.next_deadline()) if d is not None]
+        if not deadlines:
+            return self.MAX_WAIT
+        return min(self.MAX_WAIT, max(0.0, min(deadlines) - time.time()))
+    
     def _process_cmo(self, cmo: CMORequest):
         """
-        4. CMO 명령 전송
+        4. CMO 명령 전송 - send_command 결과(완료 핸들) 반환, 전송하지 않았으면 None
         """
         target_device_id = cmo.device_id
         
         if target_device_id not in self.monitors:
             print(f"[ERROR] device_id '{target_device_id}'에 대한 모니터가 없음")
+            cmo.resolve('error', error=f"no monitor for {target_device_id}")
             return
         
-        # 명령 전송
+        # 브레이커가 열린 디바이스는 즉시 실패 (프로브는 자리를 이미 확보함)
+        if not cmo.probe:
+            admitted = self.health.admit(target_device_id, self._is_guarded(cmo))
+            if admitted == DeviceHealthRegistry.OPEN:
+                print(f"[BREAKER] {target_device_id} 응답 없음 - 전송 생략: {cmo.command}")
+                cmo.resolve('rejected')
+                return
+            if admitted == DeviceHealthRegistry.PROBE:
+                # half_open 이후 첫 guarded 명령이 프로브 역할 (재전송 없이 결과로 판정)
+                cmo.probe = True
+                self._watch_probe(cmo)
+        
         monitor = self.monitors[target_device_id]
-        if monitor.send_command(cmo.command):
-            # 전송 성공 -> pending 목록에 추가 (ACK 대기)
-            key = f"{target_device_id}:{cmo.metric_name}"
-            self.pending_requests[key] = cmo
-            print(f"[SEND] CMO 전송: {cmo.command}")
+        key = f"{target_device_id}:{cmo.metric_name}"
+        
+        # ACK가 전송 직후 바로 올 수 있으므로 pending에 먼저 등록
+        with self.lock:
+            cmo.seq = next(self.seq_counter)
+            self.pending_requests.setdefault(key, OrderedDict())[cmo.seq] = cmo
+        
+        command = f"{cmo.command},{cmo.seq}" if self.correlation_ids else cmo.command
+        cmo.sent_at = time.time()
+        cmo.attempts += 1
+        
+        # 명령 전송 (포트 송신 스레드에 넘기고 바로 반환)
+        sent = monitor.send_command(command)
+        if isinstance(sent, Future):
+            # 실제 write가 끝난 뒤에 ACK 타임아웃 시작 (송신 대기 중에는 만료되지 않음)
+            sent.add_done_callback(lambda handle: self._on_written(cmo, command, handle.result()))
+        elif sent:
+            self._mark_sent(cmo, command)
+        else:
+            self._send_failed(cmo, command)
+        return sent
+    
+    def _on_written(self, cmo: CMORequest, command: str, ok: bool):
+        """송신 스레드에서 write 완료 / 실패 확정"""
+        if ok:
+            self._mark_sent(cmo, command)
         else:
-            print(f"[ERROR] CMO 전송 실패: {cmo.command}")
+            self._send_failed(cmo, command)
+    
+    def _mark_sent(self, cmo: CMORequest, command: str):
+        """전송 완료 - 이 시점부터 RTT / ACK 타임아웃 계산"""
+        cmo.sent_at = time.time()
+        self._record(cmo, 'sent')
+        print(f"[SEND] CMO 전송: {command}")
+        # write 직후 ACK가 먼저 처리됐으면 타임아웃 등록 불필요
+        if not cmo.future.done():
+            self._schedule_timeout(self._timeout_key(cmo), cmo)
+    
+    def _send_failed(self, cmo: CMORequest, command: str):
+        """전송 실패 - 대기 중인 요청 정리"""
+        self._cancel_timeout(self._timeout_key(cmo))
+        if not self._remove_pending(cmo):
+            return
+        if self._is_guarded(cmo):
+            self.health.record_failure(cmo.device_id)
+        cmo.resolve('send_failed')
+        print(f"[ERROR] CMO 전송 실패: {command}")
+    
+    def _record(self, cmo: CMORequest, status: str):
+        """CMO 이벤트를 저널에 기록"""
+        if self.journal:
+            self.journal.append({
+                'type': 'CMO',
+                'device_id': cmo.device_id,
+                'metric_name': cmo.metric_name,
+                'value': cmo.value,
+                'status': status,
+                'cmo_seq': cmo.seq,
+                'attempt': cmo.attempts,
+            })
+    
+    def _is_guarded(self, cmo: CMORequest) -> bool:
+        """재전송 / 서킷 브레이커 적용 대상인지 (프로브는 항상 적용)"""
+        return (cmo.probe or cmo.device_id in self.guarded
+                or f"{cmo.device_id}:{cmo.metric_name}" in self.guarded)
+    
+    @staticmethod
+    def _timeout_key(cmo: CMORequest) -> str:
+        return f"{cmo.device_id}:{cmo.metric_name}#{cmo.seq}"
+    
+    def _schedule_timeout(self, key: str, cmo: CMORequest):
+        """ACK 타임아웃 등록"""
+        self.deadlines.schedule(key, cmo.sent_at + cmo.timeout, cmo)
+    
+    def _cancel_timeout(self, key: str):
+        """ACK 타임아웃 취소"""
+        self.deadlines.cancel(key)
     
     def _check_pending_timeouts(self):
         """
         5. 타임아웃 확인 - ACK가 없으면 삭제 및 에러 로그
         """
-        expired_keys = []
+        for key, cmo in self.deadlines.pop_expired(time.time()):
+            self._expire(key, cmo)
+    
+    def _schedule_retry(self, cmo: CMORequest, delay: float):
+        """delay초 후 재전송 예약"""
+        self.retry_at.schedule(self._timeout_key(cmo), time.time() + delay, cmo)
+    
+    def _check_retries(self):
+        """재전송 시각이 된 요청을 레인에 다시 넣음"""
+        for _, cmo in self.retry_at.pop_expired(time.time()):
+            self._requeue(cmo)
+    
+    def _requeue(self, cmo: CMORequest):
+        """재전송 / 프로브 명령을 디바이스 레인에 넣음"""
+        self._enqueue(cmo)
+    
+    def _track(self, cmo: CMORequest):
+        """최종 결과(acked / timeout / superseded 등)를 저널에 한 번만 기록하도록 등록 (재전송은 제외)"""
+        if self.journal and cmo.attempts == 0:
+            cmo.future.add_done_callback(lambda future: self._record(cmo, future.result()['status']))
+    
+    def _enqueue(self, cmo: CMORequest):
+        """레인에 추가 - 대기 중인 명령과 병합되면 그 결과를 따름"""
+        # 레인에서 병합 / 대체되어 전송되지 않는 명령도 결과가 기록되도록 레인에 넣기 전에 등록
+        self._track(cmo)
+        survivor = self.lanes.put(cmo)
+        if survivor is not cmo:
+            cmo.follow(survivor)
+    
+    def _send_probes(self):
+        """half_open 디바이스에 프로브 명령 전송 (probe_commands 설정된 디바이스만)"""
+        if not self.probe_commands:
+            return
+        
+        for device_id in self.health.claim_probes(self.probe_commands):
+            metric_name, value = self.probe_commands[device_id]
+            print(f"[BREAKER] {device_id} 프로브 전송")
+            probe = CMORequest(
+                device_id=device_id,
+                metric_name=metric_name,
+                value=value,
+                command=f"CMO,{metric_name},{value}",
+                probe=True
+            )
+            self._watch_probe(probe)
+            self._requeue(probe)
+    
+    def _watch_probe(self, cmo: CMORequest):
+        """프로브가 acked / timeout / send_failed 외의 결과로 끝나면 프로브 자리 반환 (브레이커 고착 방지)"""
+        def on_done(future):
+            if future.result()['status'] not in ('acked', 'timeout', 'send_failed'):
+                self.health.release_probe(cmo.device_id)
+        
+        cmo.future.add_done_callback(on_done)
+    
+    def _remove_pending(self, cmo: CMORequest) -> bool:
+        """pending에서 해당 요청만 제거 - 있었으면 True"""
+        key = f"{cmo.device_id}:{cmo.metric_name}"
+        with self.lock:
+            in_flight = self.pending_requests.get(key)
+            if not in_flight or in_flight.get(cmo.seq) is not cmo:
+                return False
+            del in_flight[cmo.seq]
+            if not in_flight:
+                del self.pending_requests[key]
+        return True
+    
+    def _expire(self, key: str, cmo: CMORequest):
+        """만료된 요청 제거 (이미 ACK를 받은 요청이면 무시) - 재시도 횟수가 남았으면 재전송 예약"""
+        if not self._remove_pending(cmo):
+            return
+        
+        print(f"[TIMEOUT] ACK 응답 없음: {cmo.device_id},{cmo.metric_name} #{cmo.seq} (경과: {cmo.elapsed_time():.1f}초)")
+        if not self._is_guarded(cmo):
+            cmo.resolve('timeout')
+            return
+        self.health.record_failure(cmo.device_id)
         
-        for key, cmo in self.pending_requests.items():
-            if cmo.is_expired():
-                expired_keys.append(key)
-                device_id = cmo.device_id
-                metric_name = cmo.metric_name
-                print(f"[TIMEOUT] ACK 응답 없음: {device_id},{metric_name} (경과: {cmo.elapsed_time():.1f}초)")
+        if cmo.probe or cmo.attempts > self.retries:
+            cmo.resolve('timeout')
+            return
+        if self.health.is_open(cmo.device_id):
+            print(f"[BREAKER] {cmo.device_id} 차단 중 - 재전송 포기: {cmo.command}")
+            cmo.resolve('timeout')
+            return
         
-        # 만료된 요청 제거
-        for key in expired_keys:
-            del self.pending_requests[key]
+        delay = backoff_delay(cmo.attempts, self.backoff_base, self.backoff_max)
+        print(f"[RETRY] {delay:.2f}초 후 재전송 ({cmo.attempts}/{self.retries}): {cmo.command}")
+        self._schedule_retry(cmo, delay)
     
-    def handle_ack(self, device_id: str, metric_name: str):
+    def handle_ack(self, device_id: str, metric_name: str, seq: Optional[int] = None):
         """
         ACK 수신 시 호출 - pending 목록에서 제거
+        seq가 있으면 해당 요청, 없으면(기존 형식) 가장 먼저 보낸 요청과 매칭
         """
         key = f"{device_id}:{metric_name}"
         
-        if key in self.pending_requests:
-            cmo = self.pending_requests[key]
-            elapsed = cmo.elapsed_time()
-            del self.pending_requests[key]
-            print(f"[ACK] 응답 수신: {device_id},{metric_name} (응답시간: {elapsed:.1f}초)")
+        cmo = None
+        with self.lock:
+            in_flight = self.pending_requests.get(key)
+            if in_flight:
+                if seq is None:
+                    _, cmo = in_flight.popitem(last=False)
+                else:
+                    cmo = in_flight.pop(seq, None)
+                if not in_flight:
+                    del self.pending_requests[key]
+        
+        if cmo:
+            rtt = cmo.round_trip_time()
+            self._cancel_timeout(self._timeout_key(cmo))
+            self.health.record_success(device_id, rtt)
+            cmo.resolve('acked', rtt_ms=round(rtt * 1000, 1),
+                        queue_ms=round((cmo.sent_at - cmo.timestamp) * 1000, 1))
+            print(f"[ACK] 응답 수신: {device_id},{metric_name} #{cmo.seq} (응답시간: {rtt * 1000:.0f}ms)")
         else:
-            print(f"[WARNING] 예상하지 못한 ACK: {device_id},{metric_name}")
+            print(f"[WARNING] 예상하지 못한 ACK: {device_id},{metric_name} #{seq}")
     
     def stop(self):
         """처리 중지"""
-        self.running = False
\ No newline at end of file
+        self.running = False
+        self.lanes.wake_all()
+        with self.timer_cond:
+            self.timer_cond.notify_all()
+        if self.timer_thread:
+            self.timer_thread.join(timeout=1)
+        for thread in self.dispatch_threads:
+            thread.join(timeout=1)
+        self.dispatch_threads.clear()
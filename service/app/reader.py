@@ -0,0 +1,84 @@
+# reader.py
+"""다중 포트 시리얼 리더 (selectors 기반)"""
+
+import selectors
+import threading
+import time
+from typing import Dict
+
+
+class SerialReader:
+    """
+    여러 포트의 파일 디스크립터를 하나의 selector에 등록하고
+    데이터가 도착한 포트만 깨워서 처리하는 단일 스레드 리더
+    """
+
+    def __init__(self, select_timeout: float = 1.0):
+        self.selector = selectors.DefaultSelector()
+        self.select_timeout = select_timeout
+        self.monitors: Dict[int, object] = {}  # fd -> SerialMonitor
+        self.running = False
+        self.lock = threading.Lock()
+
+    def register(self, monitor) -> bool:
+        """모니터 등록 (fileno를 지원하지 않는 포트는 False)"""
+        try:
+            fd = monitor.fileno()
+        except (AttributeError, OSError, ValueError):
+            return False
+
+        with self.lock:
+            self.selector.register(fd, selectors.EVENT_READ, monitor)
+            self.monitors[fd] = monitor
+        return True
+
+    def unregister(self, monitor):
+        """모니터 등록 해제"""
+        with self.lock:
+            for fd, registered in list(self.monitors.items()):
+                if registered is monitor:
+                    try:
+                        self.selector.unregister(fd)
+                    except (KeyError, ValueError):
+                        pass
+                    del self.monitors[fd]
+
+    def run(self):
+        """이벤트 루프 - 읽을 데이터가 있을 때만 깨어남"""
+        self.running = True
+
+        while self.running:
+            if not self.monitors:
+                time.sleep(self.select_timeout)
+                continue
+
+            try:
+                events = self.selector.select(timeout=self.select_timeout)
+            except (OSError, ValueError) as e:
+                # 닫힌 fd가 남아 있는 경우
+                print(f"[ERROR] selector 오류: {e}")
+                self._drop_closed()
+                continue
+
+            for key, _ in events:
+                monitor = key.data
+                if not monitor.read_available():
+                    print(f"[○] {monitor.port} 리더에서 제외")
+                    self.unregister(monitor)
+
+    def _drop_closed(self):
+        """닫힌 포트 정리"""
+        for monitor in list(self.monitors.values()):
+            if not monitor.running:
+                self.unregister(monitor)
+
+    def stop(self):
+        """리더 중지"""
+        self.running = False
+
+    def close(self):
+        """selector 종료"""
+        self.stop()
+        with self.lock:
+            self.selector.close()
+            self.monitors.clear()
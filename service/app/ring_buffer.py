@@ -0,0 +1,145 @@
+# ring_buffer.py
+"""metric별 최근 이력 메모리 링 버퍼 (NumPy)"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+ENTRY_BYTES = 16  # 시각 float64 + 값 float64
+
+
+class MetricRing:
+    """
+    metric 하나의 고정 크기 링 버퍼 - 시각 / 값 배열을 미리 할당
+    - append: O(1), 가득 차면 가장 오래된 값부터 덮어씀
+    - 시각은 수신 순서대로 증가한다고 가정 (구간 탐색에 searchsorted 사용)
+    - 다른 스레드에서 조회할 때는 read() (append와 같은 lock 안에서 복사)
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = np.empty(capacity, dtype=np.float64)
+        self.values = np.empty(capacity, dtype=np.float64)
+        self.count = 0  # 지금까지 추가된 수 (capacity를 넘으면 덮어쓰는 중)
+        self.lock = threading.Lock()
+
+    def append(self, timestamp: float, value: float):
+        with self.lock:
+            index = self.count % self.capacity
+            self.times[index] = timestamp
+            self.values[index] = value
+            self.count += 1
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def oldest(self) -> Optional[float]:
+        """남아 있는 가장 오래된 시각 (비어 있으면 None)"""
+        count = self.count
+        if not count:
+            return None
+        return float(self.times[count % self.capacity if count > self.capacity else 0])
+
+    def window(self, start: float, end: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        [start, end] 구간 (시각, 값) 배열
+        링 경계에 걸치지 않으면 복사 없이 배열 view 반환 (경계에 걸친 구간만 이어 붙여 복사)
+        view는 이후 append로 덮어써지므로 쓰기와 같은 스레드에서 바로 쓸 때만 사용 (그 외에는 read)
+        """
+        count = self.count
+        if count <= self.capacity:
+            segments = [(0, count)]
+        else:
+            head = count % self.capacity
+            segments = [(head, self.capacity), (0, head)]
+
+        parts = []
+        for lo, hi in segments:
+            times = self.times[lo:hi]
+            left = np.searchsorted(times, start, side='left')
+            right = np.searchsorted(times, end, side='right')
+            if left < right:
+                parts.append((lo + left, lo + right))
+
+        if not parts:
+            return self.times[:0], self.values[:0]
+        if len(parts) == 1:
+            lo, hi = parts[0]
+            return self.times[lo:hi], self.values[lo:hi]
+        return (np.concatenate([self.times[lo:hi] for lo, hi in parts]),
+                np.concatenate([self.values[lo:hi] for lo, hi in parts]))
+
+    def read(self, start: float, end: float) -> Tuple[np.ndarray, np.ndarray, Optional[float]]:
+        """
+        [start, end] 구간 (시각, 값) 복사본과 같은 시점의 가장 오래된 시각
+        lock 안에서 복사하므로 조회 중 append가 덮어쓴 값이 섞이지 않음
+        """
+        with self.lock:
+            times, values = self.window(start, end)
+            return times.copy(), values.copy(), self.oldest()
+
+
+class RingBufferStore:
+    """
+    (device_id, metric_name)별 MetricRing 보관
+    - 숫자 값만 저장 (SEN 수신 시 채움)
+    - 전체 메모리는 memory_budget 바이트 이하: 예산을 넘는 새 metric은 버퍼를 만들지 않고 DB에서만 조회
+    """
+
+    def __init__(self, capacity: int = 86400, memory_budget: int = 64 * 1024 * 1024):
+        self.capacity = max(1, capacity)
+        self.memory_budget = memory_budget
+        self.rings: Dict[Tuple[str, str], MetricRing] = {}
+        self.lock = threading.Lock()  # 링 생성만 직렬화
+        self.untracked = set()  # 예산 초과로 버퍼를 만들지 않은 metric
+
+    def append(self, device_id: str, metric_name: str, timestamp: float, value: str):
+        """수신 값 추가 (숫자가 아니면 무시)"""
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return
+
+        key = (device_id, metric_name)
+        ring = self.rings.get(key)
+        if ring is None:
+            if key in self.untracked:
+                return
+            ring = self._create(key)
+            if ring is None:
+                return
+        ring.append(timestamp, number)
+
+    def _create(self, key: Tuple[str, str]) -> Optional[MetricRing]:
+        with self.lock:
+            ring = self.rings.get(key)
+            if ring or key in self.untracked:
+                return ring
+
+            if self.memory_bytes() + self.capacity * ENTRY_BYTES > self.memory_budget:
+                self.untracked.add(key)
+                print(f"[HISTORY] 메모리 예산 초과 - {key[0]},{key[1]}는 DB에서만 조회")
+                return None
+
+            ring = MetricRing(self.capacity)
+            # 참조 교체 (읽는 쪽은 lock 없이 조회)
+            self.rings = {**self.rings, key: ring}
+            return ring
+
+    def get(self, device_id: str, metric_name: str) -> Optional[MetricRing]:
+        return self.rings.get((device_id, metric_name))
+
+    def memory_bytes(self) -> int:
+        return len(self.rings) * self.capacity * ENTRY_BYTES
+
+    def stats(self) -> dict:
+        rings = self.rings
+        return {
+            'metrics': len(rings),
+            'points': sum(len(ring) for ring in rings.values()),
+            'capacity': self.capacity,
+            'memory_bytes': self.memory_bytes(),
+            'memory_budget': self.memory_budget,
+            'untracked': len(self.untracked),
+        }
@@ -0,0 +1,71 @@
+# scheduler.py
+"""최소 힙 기반 만료 시각 스케줄러"""
+
+import heapq
+import itertools
+import threading
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+class DeadlineScheduler:
+    """
+    key별 만료 시각 관리 - 등록 / 취소 / 만료 추출 모두 O(log n)
+    취소는 지연 삭제 (힙에 남은 항목은 pop 시 무시), 무효 항목이 많아지면 힙 재구성
+    가장 이른 만료 시각이 바뀌면 cond를 notify (cond.wait 중인 타이머 스레드가 깨어나 다시 계산)
+    여러 스케줄러가 cond 하나를 공유하면 타이머 스레드 하나로 모두 대기 가능
+    """
+
+    def __init__(self, cond: Optional[threading.Condition] = None):
+        self.heap: List[list] = []  # [deadline, seq, key, item, valid]
+        self.entries: Dict[Hashable, list] = {}  # key -> 힙 항목
+        self.counter = itertools.count()
+        self.lock = cond or threading.Condition()  # RLock 기반 (wait 중 next_deadline 재진입)
+
+    def schedule(self, key: Hashable, deadline: float, item=None):
+        """만료 시각 등록 (같은 key가 있으면 교체)"""
+        with self.lock:
+            self._invalidate(key)
+            entry = [deadline, next(self.counter), key, item, True]
+            self.entries[key] = entry
+            heapq.heappush(self.heap, entry)
+            if self.heap[0] is entry:
+                self.lock.notify_all()
+
+    def cancel(self, key: Hashable) -> bool:
+        """등록 취소 - 등록되어 있었으면 True"""
+        with self.lock:
+            return self._invalidate(key)
+
+    def _invalidate(self, key: Hashable) -> bool:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+
+        entry[4] = False
+        # 무효 항목이 절반을 넘으면 정리
+        if len(self.heap) > 64 and len(self.heap) > 2 * len(self.entries):
+            self.heap = [e for e in self.heap if e[4]]
+            heapq.heapify(self.heap)
+        return True
+
+    def pop_expired(self, now: float) -> List[Tuple[Hashable, object]]:
+        """now까지 만료된 (key, item) 목록을 만료 순서대로 꺼냄"""
+        expired = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                deadline, _, key, item, valid = heapq.heappop(self.heap)
+                if valid:
+                    del self.entries[key]
+                    expired.append((key, item))
+        return expired
+
+    def next_deadline(self) -> Optional[float]:
+        """가장 이른 만료 시각 (없으면 None)"""
+        with self.lock:
+            while self.heap and not self.heap[0][4]:
+                heapq.heappop(self.heap)
+            return self.heap[0][0] if self.heap else None
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.entries)
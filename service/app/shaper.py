@@ -0,0 +1,138 @@
+# shaper.py
+"""포트별 송신 속도 제한 (토큰 버킷)"""
+
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+class TokenBucket:
+    """초당 rate개씩 채워지고 최대 capacity개까지 쌓이는 토큰 버킷"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount: float, now: float) -> float:
+        """amount개를 쓸 수 있을 때까지 남은 시간 (capacity보다 크면 가득 찰 때까지)"""
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def available(self, now: float) -> float:
+        """지금 쓸 수 있는 토큰 수"""
+        self._refill(now)
+        return self.tokens
+
+    def consume(self, amount: float):
+        # capacity보다 큰 요청은 음수(빚)로 남겨 다음 전송에서 갚음
+        self.tokens -= amount
+
+
+class TxShaper:
+    """
+    시리얼 송신 속도 제한 - 바이트 / 줄 두 버킷을 모두 만족할 때만 전송
+    - 바이트: 기본 baudrate / 10 (8N1), 버스트는 Arduino Serial 수신 버퍼(64바이트) 이내
+    - 줄: 펌웨어가 loop 한 번에 명령 하나씩 처리하므로 초당 명령 수도 제한
+    초과분은 acquire()에서 도착 순서대로 대기
+    """
+
+    ARDUINO_RX_BUFFER = 64
+    WINDOW = 10.0  # 사용률 계산 구간 (초)
+
+    def __init__(self, byte_rate: float, line_rate: float = 10.0,
+                 byte_burst: float = ARDUINO_RX_BUFFER, line_burst: float = 2):
+        self.bytes = TokenBucket(byte_rate, byte_burst)
+        self.lines = TokenBucket(line_rate, line_burst)
+        self.lock = threading.Lock()  # 대기 중인 송신자 직렬화
+        self.stats_lock = threading.Lock()
+
+        self.waiting = 0
+        self.sent_bytes = 0
+        self.sent_lines = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.recent = deque()  # (monotonic 시각, 바이트 수) - 최근 WINDOW초
+
+    def acquire(self, nbytes: int, lines: int = 1, timeout: Optional[float] = None) -> bool:
+        """nbytes (lines줄) 전송 허가 대기 - timeout 안에 허가되지 않으면 False"""
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+
+        with self.stats_lock:
+            self.waiting += 1
+        try:
+            if not self.lock.acquire(timeout=-1 if timeout is None else timeout):
+                return self._reject()
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = max(self.bytes.delay_for(nbytes, now), self.lines.delay_for(lines, now))
+                    if delay <= 0:
+                        break
+                    if deadline is not None and now + delay > deadline:
+                        return self._reject()
+                    time.sleep(delay)
+
+                self.bytes.consume(nbytes)
+                self.lines.consume(lines)
+            finally:
+                self.lock.release()
+        finally:
+            with self.stats_lock:
+                self.waiting -= 1
+
+        waited = time.monotonic() - start
+        with self.stats_lock:
+            self.sent_bytes += nbytes
+            self.sent_lines += lines
+            self.wait_total += waited * lines
+            if waited > 0.001:
+                self.throttled += 1
+            self.recent.append((now, nbytes))
+        return True
+
+    def line_allowance(self) -> int:
+        """지금 바로 보낼 수 있는 줄 수 (최소 1, 최대 line_burst) - 송신 묶음 크기 상한"""
+        with self.lock:
+            tokens = self.lines.available(time.monotonic())
+        return max(1, min(int(tokens), int(self.lines.capacity)))
+
+    def _reject(self) -> bool:
+        with self.stats_lock:
+            self.rejected += 1
+        return False
+
+    def utilization(self) -> float:
+        """최근 WINDOW초 동안 바이트 버킷 사용률 (0~1)"""
+        cutoff = time.monotonic() - self.WINDOW
+        with self.stats_lock:
+            while self.recent and self.recent[0][0] < cutoff:
+                self.recent.popleft()
+            sent = sum(nbytes for _, nbytes in self.recent)
+        return min(1.0, sent / (self.bytes.rate * self.WINDOW))
+
+    def stats(self) -> dict:
+        utilization = self.utilization()
+        with self.stats_lock:
+            return {
+                'byte_rate': self.bytes.rate,
+                'line_rate': self.lines.rate,
+                'utilization': round(utilization, 3),
+                'waiting': self.waiting,
+                'sent_bytes': self.sent_bytes,
+                'sent_lines': self.sent_lines,
+                'throttled': self.throttled,
+                'rejected': self.rejected,
+                'avg_wait_ms': round(self.wait_total / self.sent_lines * 1000, 1) if self.sent_lines else 0.0,
+            }
@@ -0,0 +1,92 @@
+# spool.py
+"""DB 장애 시 로그를 보관하는 로컬 스풀 (SQLite WAL)"""
+
+import sqlite3
+import threading
+from typing import Callable, List
+
+
+class LogSpool:
+    """
+    DB에 못 쓴 행을 로컬 디스크에 추가 전용으로 보관하고,
+    DB가 돌아오면 오래된 순서대로 큰 묶음으로 재전송
+
+    행 형식: (log_key, device_id, data_type, metric_name, value, timestamp)
+    log_key는 행마다 고유하므로 재전송이 중복 저장되지 않음 (중복 log_key는 무시)
+    """
+
+    def __init__(self, path: str = 'log_spool.db', replay_batch: int = 500):
+        self.path = path
+        self.replay_batch = replay_batch
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " log_key TEXT NOT NULL UNIQUE,"
+            " device_id TEXT, data_type TEXT, metric_name TEXT, value TEXT,"
+            " timestamp TEXT)"
+        )
+        self.conn.commit()
+
+        self.spooled = 0
+        self.replayed = 0
+
+    def append(self, rows: List[tuple]):
+        """행 보관 (로컬 디스크 속도)"""
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO spool "
+                "(log_key, device_id, data_type, metric_name, value, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(*row[:5], str(row[5])) for row in rows]
+            )
+            self.conn.commit()
+            self.spooled += len(rows)
+
+    def pending(self) -> int:
+        """재전송 대기 행 수"""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def replay(self, write_fn: Callable[[List[tuple]], bool]) -> int:
+        """
+        오래된 순서로 replay_batch개씩 write_fn에 전달
+        write_fn이 성공한 묶음만 삭제, 실패하면 중단 - 재전송한 행 수 반환
+        """
+        total = 0
+        while True:
+            with self.lock:
+                records = self.conn.execute(
+                    "SELECT id, log_key, device_id, data_type, metric_name, value, timestamp "
+                    "FROM spool ORDER BY id LIMIT ?",
+                    (self.replay_batch,)
+                ).fetchall()
+
+            if not records:
+                break
+
+            if not write_fn([record[1:] for record in records]):
+                break
+
+            with self.lock:
+                self.conn.execute("DELETE FROM spool WHERE id <= ?", (records[-1][0],))
+                self.conn.commit()
+                self.replayed += len(records)
+            total += len(records)
+
+        return total
+
+    def stats(self) -> dict:
+        return {
+            'pending': self.pending(),
+            'spooled': self.spooled,
+            'replayed': self.replayed,
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,126 @@
+# state_store.py
+"""디바이스 / metric별 최신 상태 저장소"""
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+
+@dataclass(frozen=True)
+class MetricState:
+    """metric 하나의 최신 값"""
+    device_id: str
+    data_type: str
+    metric_name: str
+    value: str
+    timestamp: float
+    seq: int
+
+    def to_dict(self) -> dict:
+        return {
+            'data_type': self.data_type,
+            'value': self.value,
+            'timestamp': self.timestamp,
+            'seq': self.seq,
+        }
+
+
+@dataclass(frozen=True)
+class StateSnapshot:
+    """
+    특정 시점의 전체 상태 (변경 불가)
+    devices: device_id -> metric_name -> MetricState
+    """
+    version: int
+    last: Optional[MetricState]
+    devices: Mapping[str, Mapping[str, MetricState]]
+
+    def to_dict(self) -> dict:
+        """/api/state 응답 - 스냅샷마다 한 번만 생성 (스냅샷이 불변이므로 재사용)"""
+        payload = self.__dict__.get('_payload')
+        if payload is None:
+            payload = self.__dict__['_payload'] = self._build_payload()
+        return payload
+
+    def to_json(self) -> bytes:
+        """/api/state 응답 본문 - 스냅샷마다 한 번만 인코딩"""
+        body = self.__dict__.get('_json')
+        if body is None:
+            body = self.__dict__['_json'] = json.dumps(self.to_dict(), ensure_ascii=False).encode('utf-8')
+        return body
+
+    @property
+    def etag(self) -> str:
+        return f"v{self.version}"
+
+    def _build_payload(self) -> dict:
+        last = self.last
+        return {
+            # 기존 단일 값 형식 (대시보드 호환) - 가장 최근 업데이트
+            'device_id': last.device_id if last else '',
+            'data_type': last.data_type if last else '',
+            'metric_name': last.metric_name if last else '',
+            'value': last.value if last else '',
+            'version': self.version,
+            'devices': {
+                device_id: {metric_name: state.to_dict() for metric_name, state in metrics.items()}
+                for device_id, metrics in self.devices.items()
+            },
+        }
+
+
+class StateStore:
+    """
+    디바이스 / metric별 최신 값, 시각, seq 보관
+    - 쓰기: lock 안에서 바뀐 디바이스만 복사해 새 스냅샷을 만들고 참조 교체 (copy-on-write)
+    - 읽기: 현재 스냅샷 참조만 가져오므로 lock 없음, 받은 스냅샷은 이후 변경되지 않음
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()  # 쓰기끼리만 직렬화
+        self.current = StateSnapshot(0, None, MappingProxyType({}))
+        self.changed = threading.Event()  # 다음 변경 시 set (버전마다 새 Event)
+
+    def update(self, device_id: str, data_type: str, metric_name: str, value: str,
+               timestamp: float = None) -> MetricState:
+        """상태 업데이트"""
+        with self.lock:
+            snapshot = self.current
+            seq = snapshot.version + 1
+            state = MetricState(device_id, data_type, metric_name, value,
+                                timestamp or time.time(), seq)
+
+            metrics = dict(snapshot.devices.get(device_id, {}))
+            metrics[metric_name] = state
+            devices = dict(snapshot.devices)
+            devices[device_id] = MappingProxyType(metrics)
+
+            # 참조 교체는 원자적 - 읽는 쪽은 이전 / 새 스냅샷 중 하나를 온전히 봄
+            self.current = StateSnapshot(seq, state, MappingProxyType(devices))
+
+            # 이 버전을 기다리던 long-poll 깨우기
+            changed, self.changed = self.changed, threading.Event()
+            changed.set()
+            return state
+
+    def snapshot(self) -> StateSnapshot:
+        """현재 스냅샷 (lock 없음)"""
+        return self.current
+
+    def wait_for_change(self, version: int, timeout: float) -> StateSnapshot:
+        """버전이 version에서 바뀔 때까지 최대 timeout초 대기 후 현재 스냅샷 반환"""
+        changed = self.changed
+        snapshot = self.current
+        if snapshot.version != version:
+            return snapshot
+        changed.wait(timeout)
+        return self.current
+
+    def get(self, device_id: str, metric_name: str) -> Optional[MetricState]:
+        return self.current.devices.get(device_id, {}).get(metric_name)
+
+    def to_dict(self) -> dict:
+        return self.current.to_dict()
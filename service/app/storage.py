@@ -0,0 +1,275 @@
+# storage.py
+"""로그 저장소 백엔드 (MySQL / SQLite)"""
+
+import sqlite3
+import threading
+from datetime import datetime
+from typing import List, Tuple
+
+import pymysql
+
+from db_pool import ConnectionPool, PoolTimeout
+
+
+class StorageError(Exception):
+    """저장소 연결 / 쓰기 / 조회 실패"""
+
+
+class SchemaError(StorageError):
+    """저장소 스키마가 맞지 않음 (마이그레이션 필요 - 스풀로 넘기지 않고 시작 실패)"""
+
+
+class StorageBackend:
+    """
+    저장소 인터페이스
+
+    행 형식: (log_key, device_id, data_type, metric_name, value, timestamp)
+    """
+
+    name = 'base'
+
+    def connect(self):
+        """연결 (실패 시 StorageError)"""
+        raise NotImplementedError
+
+    def write_rows(self, rows: List[tuple]):
+        """여러 행을 하나의 트랜잭션으로 저장 (실패 시 StorageError)"""
+        raise NotImplementedError
+
+    def query(self, sql: str, params: tuple = None) -> list:
+        """조회 (결과는 dict 목록)"""
+        raise NotImplementedError
+
+    def read_series(self, device_id: str, metric_name: str, start: float, end: float,
+                    include_end: bool = True) -> List[Tuple[float, str]]:
+        """metric 하나의 [start, end] 구간 값 - (epoch 초, 값) 시각순 목록 (include_end=False면 [start, end))"""
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        return self.name
+
+    def stats(self) -> dict:
+        return {}
+
+    def close(self):
+        pass
+
+
+class MySQLBackend(StorageBackend):
+    """
+    MySQL 저장소 (커넥션 풀 사용)
+
+    logs.log_key UNIQUE 컬럼은 스풀 재전송 시 중복 방지용 (require_log_key=True면 connect()에서 필수)
+        ALTER TABLE logs ADD COLUMN log_key CHAR(32) NULL UNIQUE;
+    컬럼이 없고 스풀도 쓰지 않으면 log_key 없이 기존 방식으로 저장
+    """
+
+    name = 'mysql'
+
+    MIGRATION = "ALTER TABLE logs ADD COLUMN log_key CHAR(32) NULL UNIQUE"
+
+    LOG_KEY_CHECK_SQL = (
+        "SELECT 1 FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'logs' "
+        "AND COLUMN_NAME = 'log_key' AND NON_UNIQUE = 0 LIMIT 1"
+    )
+
+    # 중복 log_key만 무시 (INSERT IGNORE는 잘림 / NULL / 잘못된 시각 오류까지 경고로 바꿔 저장해 버림)
+    INSERT_SQL = (
+        "INSERT INTO logs (log_key, device_id, data_type, metric_name, value, timestamp) "
+        "VALUES (%s, %s, %s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE log_key = log_key"
+    )
+
+    # log_key 마이그레이션 전 테이블 (스풀 미사용 시)
+    PLAIN_INSERT_SQL = (
+        "INSERT INTO logs (device_id, data_type, metric_name, value, timestamp) "
+        "VALUES (%s, %s, %s, %s, %s)"
+    )
+
+    SERIES_SQL = (
+        "SELECT timestamp, value FROM logs "
+        "WHERE device_id = %s AND metric_name = %s AND timestamp >= %s AND timestamp {end_op} %s "
+        "ORDER BY timestamp"
+    )
+
+    def __init__(self, host: str, user: str, password: str, database: str,
+                 pool_min: int = 1, pool_max: int = 4, require_log_key: bool = True):
+        self.require_log_key = require_log_key
+        self.has_log_key = True
+        self.config = {
+            'host': host, 'user': user, 'password': password,
+            'database': database, 'charset': 'utf8mb4'
+        }
+        # 쓰기 / 조회가 함께 쓰는 커넥션 풀
+        self.pool = ConnectionPool(
+            lambda: pymysql.connect(**self.config),
+            min_size=pool_min, max_size=pool_max
+        )
+
+    def connect(self):
+        try:
+            self.pool.open()
+            with self.pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(self.LOG_KEY_CHECK_SQL)
+                    has_log_key = cursor.fetchone()
+        except (pymysql.Error, PoolTimeout) as e:
+            raise StorageError(str(e)) from e
+
+        self.has_log_key = bool(has_log_key)
+        if self.has_log_key:
+            return
+        if self.require_log_key:
+            raise SchemaError(f"logs.log_key UNIQUE 컬럼이 없습니다 (스풀 사용 시 필수) - "
+                              f"마이그레이션 필요: {self.MIGRATION};")
+        print(f"[WARNING] logs.log_key 컬럼이 없어 중복 방지 없이 저장합니다 (스풀을 쓰려면: {self.MIGRATION};)")
+
+    def write_rows(self, rows: List[tuple]):
+        try:
+            with self.pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    if self.has_log_key:
+                        cursor.executemany(self.INSERT_SQL, rows)
+                    else:
+                        cursor.executemany(self.PLAIN_INSERT_SQL, [row[1:] for row in rows])
+                conn.commit()
+        except (pymysql.Error, PoolTimeout) as e:
+            # 오류 난 커넥션은 풀이 폐기하고 다음 acquire에서 새로 생성
+            raise StorageError(str(e)) from e
+
+    def query(self, sql: str, params: tuple = None) -> list:
+        try:
+            with self.pool.connection() as conn:
+                with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+                    cursor.execute(sql, params)
+                    return list(cursor.fetchall())
+        except (pymysql.Error, PoolTimeout) as e:
+            raise StorageError(str(e)) from e
+
+    def read_series(self, device_id: str, metric_name: str, start: float, end: float,
+                    include_end: bool = True) -> List[Tuple[float, str]]:
+        sql = self.SERIES_SQL.format(end_op='<=' if include_end else '<')
+        params = (device_id, metric_name, datetime.fromtimestamp(start), datetime.fromtimestamp(end))
+        try:
+            with self.pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    return [(timestamp.timestamp(), value) for timestamp, value in cursor.fetchall()]
+        except (pymysql.Error, PoolTimeout) as e:
+            raise StorageError(str(e)) from e
+
+    def describe(self) -> str:
+        return f"{self.config['host']}/{self.config['database']}"
+
+    def stats(self) -> dict:
+        return {'pool': self.pool.stats()}
+
+    def close(self):
+        self.pool.close()
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    내장 SQLite 저장소 (WAL 모드)
+    DB 서버 없는 엣지 환경 / 로컬 테스트용
+    """
+
+    name = 'sqlite'
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS logs ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        " log_key TEXT UNIQUE,"
+        " device_id TEXT NOT NULL,"
+        " data_type TEXT NOT NULL,"
+        " metric_name TEXT NOT NULL,"
+        " value TEXT,"
+        " timestamp TEXT NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS idx_logs_metric_time "
+        "ON logs (device_id, metric_name, timestamp)",
+    )
+
+    # 중복 log_key만 무시 (OR IGNORE는 NOT NULL 위반 행도 조용히 버림)
+    INSERT_SQL = (
+        "INSERT INTO logs (log_key, device_id, data_type, metric_name, value, timestamp) "
+        "VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (log_key) DO NOTHING"
+    )
+
+    SERIES_SQL = (
+        "SELECT timestamp, value FROM logs "
+        "WHERE device_id = ? AND metric_name = ? AND timestamp >= ? AND timestamp {end_op} ? "
+        "ORDER BY timestamp"
+    )
+
+    def __init__(self, path: str = 'iot_logs.db'):
+        self.path = path
+        self.write_conn = None
+        self.read_conn = None
+        self.write_lock = threading.Lock()
+        self.read_lock = threading.Lock()
+
+    def connect(self):
+        try:
+            self.write_conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.write_conn.execute("PRAGMA journal_mode=WAL")
+            self.write_conn.execute("PRAGMA synchronous=NORMAL")
+            for ddl in self.SCHEMA:
+                self.write_conn.execute(ddl)
+            self.write_conn.commit()
+
+            # WAL이므로 조회는 쓰기와 별도 커넥션에서 동시에 가능
+            self.read_conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.read_conn.row_factory = sqlite3.Row
+        except sqlite3.Error as e:
+            raise StorageError(str(e)) from e
+
+    def write_rows(self, rows: List[tuple]):
+        if not self.write_conn:
+            raise StorageError("SQLite 연결이 없습니다")
+
+        try:
+            with self.write_lock:
+                with self.write_conn:
+                    self.write_conn.executemany(
+                        self.INSERT_SQL,
+                        [(*row[:5], str(row[5])) for row in rows]
+                    )
+        except sqlite3.Error as e:
+            raise StorageError(str(e)) from e
+
+    def query(self, sql: str, params: tuple = None) -> list:
+        if not self.read_conn:
+            raise StorageError("SQLite 연결이 없습니다")
+
+        try:
+            with self.read_lock:
+                cursor = self.read_conn.execute(sql, params or ())
+                return [dict(row) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            raise StorageError(str(e)) from e
+
+    def read_series(self, device_id: str, metric_name: str, start: float, end: float,
+                    include_end: bool = True) -> List[Tuple[float, str]]:
+        if not self.read_conn:
+            raise StorageError("SQLite 연결이 없습니다")
+
+        sql = self.SERIES_SQL.format(end_op='<=' if include_end else '<')
+        # timestamp는 str(datetime) 형식으로 저장되어 있어 같은 형식의 문자열로 비교
+        params = (device_id, metric_name, str(datetime.fromtimestamp(start)), str(datetime.fromtimestamp(end)))
+        try:
+            with self.read_lock:
+                rows = self.read_conn.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            raise StorageError(str(e)) from e
+        return [(datetime.fromisoformat(timestamp).timestamp(), value) for timestamp, value in rows]
+
+    def describe(self) -> str:
+        return f"sqlite:{self.path}"
+
+    def close(self):
+        for conn in (self.read_conn, self.write_conn):
+            if conn:
+                conn.close()
+        self.read_conn = self.write_conn = None
@@ -1,16 +1,38 @@
 # test_app.py
 """시리얼 모니터 통합 테스트"""
 
+import os
 import time
+import tempfile
+import asyncio
+import fcntl
+import struct
+import termios
 import threading
 from queue import Queue
-from unittest.mock import Mock, MagicMock, patch
+from unittest.mock import ANY, Mock, MagicMock, patch
 
 from models import CMORequest, SerialData
 from parser import SerialParser
 from monitor import SerialMonitor
 from queue_processor import QueueProcessor
 from database import DatabaseHandler
+from reader import SerialReader
+from framer import LineFramer
+from pipeline import IngestPipeline
+from ingest_buffer import IngestBuffer
+from db_pool import ConnectionPool, PoolTimeout
+from spool import LogSpool
+from storage import SQLiteBackend
+from scheduler import DeadlineScheduler
+from lanes import CoalesceRules, CommandLanes, PriorityRules
+from shaper import TxShaper
+from state_store import StateStore
+from journal import CursorTooOld, EventJournal
+from broadcast import SSEBroadcaster
+import pymysql
+from async_app import AsyncCommandQueue, AsyncQueueProcessor
+from app import SerialMonitorApp
 
 
 class MockSerialPort:
@@ -34,6 +56,33 @@ class MockSerialPort:
         self.is_open = False
 
 
+class PipeSerialPort:
+    """fileno를 가진 시리얼 포트 Mock (os.pipe 기반)"""
+    
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        self.is_open = True
+    
+    @property
+    def in_waiting(self):
+        buf = fcntl.ioctl(self.read_fd, termios.FIONREAD, b'\0\0\0\0')
+        return struct.unpack('i', buf)[0]
+    
+    def fileno(self):
+        return self.read_fd
+    
+    def read(self, size=1):
+        return os.read(self.read_fd, size)
+    
+    def feed(self, data: bytes):
+        os.write(self.write_fd, data)
+    
+    def close(self):
+        self.is_open = False
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+
 def test_parser():
     """파서 테스트"""
     print("\n[TEST 1] 파서 테스트")
@@ -246,7 +295,8 @@ def test_serial_monitor_sen_handling():
     monitor._handle_sen(parsed)
     
     # DB에 저장되었는지 확인
-    db_handler.insert_log.assert_called_with("sensor_001", "SEN", "temperature", "25.5")
+    db_handler.insert_log.assert_called_with("sensor_001", "SEN", "temperature", "25.5",
+                                             parsed.received_at)
     print("✓ SEN 데이터 DB 저장 완료")
 
 
@@ -295,6 +345,1359 @@ def test_end_to_end_flow():
     print("✓ 엔드-투-엔드 흐름 완료!")
 
 
+def test_serial_reader_dispatch():
+    """SerialReader 다중 포트 디스패치 테스트"""
+    print("\n[TEST 10] SerialReader 다중 포트 디스패치 테스트")
+    print("=" * 60)
+    
+    cmd_queue = Queue()
+    db_handler = Mock(spec=DatabaseHandler)
+    
+    reader = SerialReader(select_timeout=0.1)
+    ports = {}
+    for device_id in ["dht_001", "cur_001"]:
+        monitor = SerialMonitor(device_id, f"/dev/{device_id}", cmd_queue, db_handler)
+        monitor.ser = PipeSerialPort()
+        monitor.running = True
+        assert reader.register(monitor)
+        ports[device_id] = monitor
+    
+    thread = threading.Thread(target=reader.run, daemon=True)
+    thread.start()
+    
+    # 한 줄을 두 번에 나눠 보내도 완성된 줄만 처리되어야 함
+    ports["dht_001"].ser.feed(b"SEN,TEM,2")
+    ports["cur_001"].ser.feed(b"SEN,LIGHT,512\n")
+    time.sleep(0.2)
+    ports["dht_001"].ser.feed(b"5\nSEN,HUM,40\n")
+    time.sleep(0.2)
+    
+    reader.stop()
+    thread.join(timeout=1)
+    
+    db_handler.insert_log.assert_any_call("dht_001", "SEN", "TEM", "25", ANY)
+    db_handler.insert_log.assert_any_call("dht_001", "SEN", "HUM", "40", ANY)
+    db_handler.insert_log.assert_any_call("cur_001", "SEN", "LIGHT", "512", ANY)
+    assert db_handler.insert_log.call_count == 3
+    print("✓ 하나의 리더 스레드에서 모든 포트의 줄 단위 처리 완료")
+    
+    for monitor in ports.values():
+        monitor.ser.close()
+    reader.close()
+
+
+def test_async_queue_processor():
+    """AsyncQueueProcessor 타임아웃 예약 테스트"""
+    print("\n[TEST 11] AsyncQueueProcessor 타임아웃 예약 테스트")
+    print("=" * 60)
+    
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        cmd_queue = AsyncCommandQueue(loop)
+        mock_monitor = Mock()
+        mock_monitor.send_command.return_value = True
+        processor = AsyncQueueProcessor(cmd_queue, {"ele_001": mock_monitor}, loop)
+        task = loop.create_task(processor.run_async())
+        
+        # ACK 받는 요청
+        cmd_queue.put(CMORequest("ele_001", "FLOOR", "2", "CMO,FLOOR,2", timeout=0.2))
+        await asyncio.sleep(0.05)
+        assert "ele_001:FLOOR" in processor.pending_requests
+        processor.handle_ack("ele_001", "FLOOR")
+        assert not processor.timers
+        print("✓ ACK 수신 시 예약된 타임아웃 취소")
+        
+        # ACK 없는 요청 - 큐가 비어 있어도 제시간에 만료
+        cmd_queue.put(CMORequest("ele_001", "CANCEL", "1", "CMO,CANCEL,1", timeout=0.1))
+        await asyncio.sleep(0.05)
+        assert "ele_001:CANCEL" in processor.pending_requests
+        await asyncio.sleep(0.1)
+        assert "ele_001:CANCEL" not in processor.pending_requests
+        print("✓ call_later로 예약된 타임아웃에 만료")
+        
+        processor.stop()
+        task.cancel()
+        
+        # 한 번에 들어온 명령은 레인을 거쳐 병합 / 우선순위 순으로 전송
+        sent = []
+        monitors = {}
+        for device_id in ("cur_001", "ent_001"):
+            monitors[device_id] = Mock()
+            monitors[device_id].send_command.side_effect = \
+                lambda command, device_id=device_id: sent.append(f"{device_id}:{command}") or True
+        processor = AsyncQueueProcessor(cmd_queue, monitors, loop)
+        task = loop.create_task(processor.run_async())
+        
+        opened = CMORequest("cur_001", "MOTOR", "1", "CMO,MOTOR,1")
+        for cmo in (opened, CMORequest("cur_001", "MOTOR", "0", "CMO,MOTOR,0"),
+                    CMORequest("ent_001", "MOTOR", "1", "CMO,MOTOR,1")):
+            cmd_queue.put(cmo)
+        await asyncio.sleep(0.05)
+        assert sent == ["ent_001:CMO,MOTOR,1", "cur_001:CMO,MOTOR,0"]
+        assert opened.future.result(timeout=0)['status'] == 'superseded'
+        print("✓ asyncio 런타임에서도 레인 병합 / 우선순위 적용")
+        
+        processor.stop()
+        task.cancel()
+    
+    asyncio.run(scenario())
+
+
+def test_line_framer():
+    """LineFramer 프레이밍 테스트"""
+    print("\n[TEST 12] LineFramer 프레이밍 테스트")
+    print("=" * 60)
+    
+    framer = LineFramer(max_frame_size=32)
+    
+    frames = framer.feed(b"SEN,CUR_STEP,10\r\nSEN,CUR_STEP,20\nSEN,CUR_")
+    assert frames == [b"SEN,CUR_STEP,10", b"SEN,CUR_STEP,20"]
+    assert framer.pending() == len(b"SEN,CUR_")
+    print("✓ 한 번의 수신에서 여러 프레임 분리, 미완성 프레임 보관")
+    
+    frames = framer.feed(b"STEP,30\n\n")
+    assert frames == [b"SEN,CUR_STEP,30"]
+    assert framer.pending() == 0
+    print("✓ 다음 수신에서 미완성 프레임 완성")
+    
+    assert framer.feed(b"X" * 40) == []
+    assert framer.pending() == 0 and framer.dropped_bytes == 40
+    print("✓ 구분자 없이 너무 긴 데이터는 폐기")
+    
+    parsed = SerialParser.parse_batch([b"SEN,TEM,25", b"\xff\xfe", b"BAD"], "dht_001")
+    assert [p.metric_name for p in parsed] == ["TEM"]
+    print("✓ parse_batch는 잘못된 프레임을 건너뜀")
+
+
+def test_ingest_pipeline():
+    """IngestPipeline 워커 처리 테스트"""
+    print("\n[TEST 13] IngestPipeline 워커 처리 테스트")
+    print("=" * 60)
+    
+    cmd_queue = Queue()
+    db_handler = Mock(spec=DatabaseHandler)
+    
+    # 느린 DB 저장 시뮬레이션
+    db_handler.insert_log.side_effect = lambda *args: time.sleep(0.05)
+    
+    monitors = {}
+    pipeline = IngestPipeline(monitors, workers=2, queue_size=100)
+    for device_id in ["dht_001", "cur_001"]:
+        monitor = SerialMonitor(device_id, f"/dev/{device_id}", cmd_queue, db_handler)
+        monitor.pipeline = pipeline
+        monitors[device_id] = monitor
+    
+    pipeline.start()
+    
+    # 리더 쪽 호출은 DB 저장을 기다리지 않고 바로 반환
+    start = time.time()
+    for i in range(5):
+        monitors["dht_001"]._dispatch_frames([f"SEN,TEM,{i}".encode()], time.time())
+    monitors["cur_001"]._dispatch_frames([b"SEN,LIGHT,100"], time.time())
+    assert time.time() - start < 0.05
+    print("✓ 리더는 느린 DB 저장에 막히지 않음")
+    
+    assert pipeline.stats()['submitted'] == 6
+    pipeline.stop()
+    
+    stats = pipeline.stats()
+    assert stats['processed'] == 6
+    assert sum(stats['queue_depths']) == 0
+    
+    # 같은 디바이스의 순서 유지
+    tem_values = [c.args[3] for c in db_handler.insert_log.call_args_list if c.args[2] == "TEM"]
+    assert tem_values == ["0", "1", "2", "3", "4"]
+    print(f"✓ 워커에서 순서대로 처리 완료 (stats: {stats})")
+    
+    # 한 번에 읽은 프레임은 디바이스별로 묶어서 파싱
+    db_handler.insert_log.side_effect = None
+    pipeline = IngestPipeline(monitors, workers=1, queue_size=100)
+    for monitor in monitors.values():
+        monitor.pipeline = pipeline
+    received_at = time.time()
+    pipeline.submit("dht_001", [b"SEN,TEM,20", b"SEN,HUM,40", b"SEN,TEM,21"], received_at)
+    pipeline.submit("cur_001", [b"SEN,LIGHT,200"], received_at)
+    with patch.object(SerialParser, 'parse_batch', wraps=SerialParser.parse_batch) as parse_batch:
+        pipeline.start()
+        pipeline.stop()
+    assert sorted((c.args[1], len(c.args[0])) for c in parse_batch.call_args_list) == \
+        [("cur_001", 1), ("dht_001", 3)]
+    assert pipeline.stats()['processed'] == 4
+    print("✓ 워커 배치를 디바이스별 parse_batch 한 번으로 처리")
+
+
+def test_ingest_buffer_policies():
+    """IngestBuffer 부하 차단 정책 테스트"""
+    print("\n[TEST 14] IngestBuffer 부하 차단 정책 테스트")
+    print("=" * 60)
+    
+    # latest: 같은 metric은 최신 값으로 교체, CMD/ACK는 용량을 넘어도 유지
+    buffer = IngestBuffer(capacity=4, sen_policy='latest', high_watermark=0.5)
+    buffer.put("cur_001", b"SEN,CUR_STEP,1")
+    buffer.put("cur_001", b"SEN,LIGHT,10")
+    for step in range(2, 50):
+        buffer.put("cur_001", f"SEN,CUR_STEP,{step}".encode())
+    for i in range(5):
+        assert buffer.put("cur_001", f"ACK,MOTOR,{i}".encode())
+    
+    frames = [item.frame for item in buffer.get_batch(max_items=100)]
+    assert frames[:2] == [b"SEN,CUR_STEP,49", b"SEN,LIGHT,10"]
+    assert frames[2:] == [f"ACK,MOTOR,{i}".encode() for i in range(5)]
+    stats = buffer.stats()
+    assert stats['shed']['coalesced'] == 48
+    assert stats['critical_over_capacity'] == 3
+    print(f"✓ latest 정책: {stats}")
+    
+    # sample: 부하 상태에서 metric별 N개 중 1개
+    buffer = IngestBuffer(capacity=100, sen_policy='sample', sample_rate=5, high_watermark=0.01)
+    for i in range(21):
+        buffer.put("dht_001", f"SEN,TEM,{i}".encode())
+    assert buffer.qsize() == 5
+    assert buffer.stats()['shed']['sampled_out'] == 16
+    print("✓ sample 정책: 5개 중 1개만 유지")
+    
+    # drop: 용량 초과분 SEN 버림
+    buffer = IngestBuffer(capacity=3, sen_policy='drop', high_watermark=1.0)
+    for i in range(10):
+        buffer.put("dht_001", f"SEN,HUM,{i}".encode())
+    assert buffer.qsize() == 3
+    assert buffer.stats()['shed']['dropped'] == 7
+    print("✓ drop 정책: 용량 초과 SEN 버림")
+
+
+def test_database_batch_writer():
+    """DatabaseHandler 일괄 저장 테스트"""
+    print("\n[TEST 15] DatabaseHandler 일괄 저장 테스트")
+    print("=" * 60)
+    
+    handler = DatabaseHandler("localhost", "user", "pw", "iot",
+                              batch_size=3, flush_interval_ms=100)
+    conn = MagicMock()
+    handler.backend.pool.connect_fn = lambda: conn
+    cursor = conn.cursor.return_value.__enter__.return_value
+    assert handler.connect()
+    
+    # 크기 도달 시 한 번에 저장
+    received_at = time.time() - 5
+    for i in range(3):
+        handler.insert_log("dht_001", "SEN", "TEM", str(i), received_at)
+    time.sleep(0.05)
+    assert cursor.executemany.call_count == 1
+    rows = cursor.executemany.call_args.args[1]
+    assert [row[4] for row in rows] == ["0", "1", "2"]
+    assert abs(rows[0][5].timestamp() - received_at) < 0.001
+    assert conn.commit.call_count == 1
+    print("✓ batch_size 도달 시 executemany + commit 1회, 수신 시각 유지")
+    
+    # 시간 도달 시 저장
+    handler.insert_log("dht_001", "SEN", "HUM", "40")
+    time.sleep(0.2)
+    assert cursor.executemany.call_count == 2
+    print("✓ flush_interval 경과 시 저장")
+    
+    # 종료 시 남은 데이터 저장
+    handler.insert_log("dht_001", "SEN", "HUM", "41")
+    handler.close()
+    assert cursor.executemany.call_count == 3
+    print("✓ 종료 시 남은 버퍼 저장")
+    assert "ON DUPLICATE KEY UPDATE" in cursor.executemany.call_args.args[0]
+    
+    # log_key 마이그레이션 전 DB -> 스풀이 있어도 시작 실패
+    with tempfile.TemporaryDirectory() as tmp:
+        handler = DatabaseHandler("localhost", "user", "pw", "iot",
+                                  spool_path=os.path.join(tmp, 'spool.db'))
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value.fetchone.return_value = None
+        handler.backend.pool.connect_fn = lambda: conn
+        assert not handler.connect() and handler.spool.pending() == 0
+        handler.spool.close()
+    print("✓ 스풀 사용 시 log_key 컬럼이 없으면 스풀로 넘기지 않고 연결 실패")
+    
+    # 스풀 없이 실행하면 마이그레이션 전 DB도 log_key 없이 저장
+    handler = DatabaseHandler("localhost", "user", "pw", "iot", batch_size=1)
+    conn = MagicMock()
+    cursor = conn.cursor.return_value.__enter__.return_value
+    cursor.fetchone.return_value = None
+    handler.backend.pool.connect_fn = lambda: conn
+    assert handler.connect()
+    handler.insert_log("dht_001", "SEN", "TEM", "25")
+    sql, rows = cursor.executemany.call_args.args
+    assert "log_key" not in sql and rows == [("dht_001", "SEN", "TEM", "25", ANY)]
+    handler.close()
+    print("✓ 스풀이 없으면 log_key 없는 기존 테이블에 저장")
+
+
+def test_connection_pool():
+    """ConnectionPool 테스트"""
+    print("\n[TEST 16] ConnectionPool 테스트")
+    print("=" * 60)
+    
+    created = []
+    def connect():
+        conn = MagicMock()
+        created.append(conn)
+        return conn
+    
+    pool = ConnectionPool(connect, min_size=1, max_size=2, ping_interval=0, acquire_timeout=0.1)
+    pool.open()
+    assert pool.stats()['size'] == 1
+    
+    a = pool.acquire()
+    b = pool.acquire()
+    assert pool.stats()['utilization'] == 1.0
+    try:
+        pool.acquire()
+        assert False, "max_size 초과 시 PoolTimeout이어야 함"
+    except PoolTimeout:
+        pass
+    print("✓ max_size 초과 시 대기 후 PoolTimeout")
+    
+    # 오류 난 커넥션은 폐기
+    pool.release(a, broken=True)
+    pool.release(b)
+    assert pool.stats()['size'] == 1
+    
+    # ping 실패한 idle 커넥션은 새 커넥션으로 교체
+    b.ping.side_effect = Exception("gone")
+    c = pool.acquire()
+    assert c is not b and pool.stats()['replaced'] == 1
+    pool.release(c)
+    print(f"✓ 죽은 커넥션 교체 (stats: {pool.stats()})")
+    
+    pool.close()
+    assert pool.stats()['size'] == 0
+
+
+def test_database_spool():
+    """DB 장애 시 로컬 스풀 저장 / 재전송 테스트"""
+    print("\n[TEST 17] DB 장애 시 로컬 스풀 테스트")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        handler = DatabaseHandler("localhost", "user", "pw", "iot", batch_size=1,
+                                  spool_path=os.path.join(tmp, "spool.db"),
+                                  retry_interval=0.1)
+        db_up = False
+        written = []
+        
+        def connect():
+            if not db_up:
+                raise pymysql.err.OperationalError(2003, "down")
+            conn = MagicMock()
+            cursor = conn.cursor.return_value.__enter__.return_value
+            cursor.executemany.side_effect = lambda sql, rows: written.extend(rows)
+            return conn
+        
+        handler.backend.pool.connect_fn = connect
+        
+        # DB가 꺼져 있어도 시작하고 로컬에 저장
+        assert handler.connect()
+        for i in range(3):
+            assert handler.insert_log("dht_001", "SEN", "TEM", str(i))
+        assert handler.spool.pending() == 3
+        assert written == []
+        print("✓ DB 장애 중 로컬 스풀에 저장")
+        
+        # DB 복구 후 재전송 (log_key 유지)
+        spooled_keys = [row[0] for row in handler.spool.conn.execute("SELECT log_key FROM spool ORDER BY id")]
+        db_up = True
+        time.sleep(0.15)
+        handler.insert_log("dht_001", "SEN", "TEM", "3")
+        assert [row[4] for row in written] == ["0", "1", "2", "3"]
+        assert [row[0] for row in written[:3]] == spooled_keys
+        assert handler.spool.pending() == 0 and not handler.spooling
+        print(f"✓ DB 복구 후 순서대로 재전송 (stats: {handler.stats()['spool']})")
+        
+        handler.close()
+
+
+def test_sqlite_backend():
+    """SQLite 저장소 테스트"""
+    print("\n[TEST 18] SQLite 저장소 테스트")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        handler = DatabaseHandler(backend=SQLiteBackend(os.path.join(tmp, "logs.db")),
+                                  batch_size=10, flush_interval_ms=50)
+        assert handler.connect()
+        
+        for i in range(25):
+            handler.insert_log("dht_001", "SEN", "TEM", str(20 + i % 5))
+        handler.flush()
+        
+        rows = handler.query(
+            "SELECT metric_name, value FROM logs WHERE device_id = ? ORDER BY id",
+            ("dht_001",)
+        )
+        assert len(rows) == 25
+        assert rows[0] == {"metric_name": "TEM", "value": "20"}
+        assert handler.stats()['backend'] == "sqlite"
+        print("✓ DB 서버 없이 SQLite에 일괄 저장 / 조회")
+        
+        handler.close()
+
+
+def test_deadline_scheduler():
+    """ACK 타임아웃 힙 스케줄러 테스트"""
+    print("\n[TEST 19] ACK 타임아웃 힙 스케줄러 테스트")
+    print("=" * 60)
+    
+    scheduler = DeadlineScheduler()
+    for i in range(1000):
+        scheduler.schedule(f"dev_{i}", 100.0 + (i * 7919) % 1000, i)
+    for i in range(0, 1000, 2):
+        scheduler.cancel(f"dev_{i}")
+    
+    expired = scheduler.pop_expired(600.0)
+    deadlines = [100.0 + (i * 7919) % 1000 for _, i in expired]
+    assert deadlines == sorted(deadlines) and all(d <= 600.0 for d in deadlines)
+    assert all(i % 2 == 1 for _, i in expired)
+    assert len(scheduler) == 500 - len(expired)
+    print(f"✓ 취소된 항목 제외, 만료 순서대로 {len(expired)}개 추출")
+    
+    # 큐에 명령이 계속 들어와도 타임아웃은 제시간에 처리
+    cmd_queue = Queue()
+    mock_monitor = Mock()
+    mock_monitor.send_command.return_value = True
+    processor = QueueProcessor(cmd_queue, {"ele_001": mock_monitor, "cur_001": mock_monitor})
+    thread = threading.Thread(target=processor.run, daemon=True)
+    thread.start()
+    
+    cmd_queue.put(CMORequest("ele_001", "FLOOR", "2", "CMO,FLOOR,2", timeout=0.2))
+    start = time.time()
+    while time.time() - start < 0.35:
+        cmd_queue.put(CMORequest("cur_001", "MOTOR", "1", "CMO,MOTOR,1", timeout=10))
+        time.sleep(0.01)
+    
+    assert "ele_001:FLOOR" not in processor.pending_requests
+    assert "cur_001:MOTOR" in processor.pending_requests
+    print("✓ 명령이 계속 들어오는 중에도 타임아웃 만료")
+    
+    # 큐가 비어 있을 때 전송 워커가 등록한 만료도 늦지 않음 (큐 대기 시간과 무관)
+    late = []
+    for i in range(5):
+        cmo = CMORequest("ele_001", "CANCEL", str(i), f"CMO,CANCEL,{i}", timeout=0.2)
+        cmd_queue.put(cmo)
+        result = cmo.future.result(timeout=2)
+        assert result['status'] == 'timeout'
+        late.append(time.time() - cmo.sent_at - cmo.timeout)
+    assert max(late) < 0.1
+    print(f"✓ 빈 큐에서도 제시간에 만료 (최대 {max(late) * 1000:.0f}ms 늦음)")
+    
+    processor.stop()
+    thread.join(timeout=2)
+
+
+def test_device_lanes():
+    """디바이스별 명령 레인 테스트"""
+    print("\n[TEST 20] 디바이스별 명령 레인 테스트")
+    print("=" * 60)
+    
+    sent = []
+    
+    # 이동 중이라 느리게 응답하는 엘리베이터
+    slow_monitor = Mock()
+    slow_monitor.send_command.side_effect = lambda cmd: time.sleep(0.2) or sent.append(("ele_001", cmd)) or True
+    fast_monitor = Mock()
+    fast_monitor.send_command.side_effect = lambda cmd: sent.append(("cur_001", cmd)) or True
+    
+    cmd_queue = Queue()
+    processor = QueueProcessor(cmd_queue, {"ele_001": slow_monitor, "cur_001": fast_monitor},
+                               dispatch_workers=2, coalesce=False)
+    thread = threading.Thread(target=processor.run, daemon=True)
+    thread.start()
+    
+    for floor in ["1", "2", "3"]:
+        cmd_queue.put(CMORequest("ele_001", "FLOOR", floor, f"CMO,FLOOR,{floor}"))
+    for step in ["1", "2", "3"]:
+        cmd_queue.put(CMORequest("cur_001", "MOTOR", step, f"CMO,MOTOR,{step}"))
+    
+    time.sleep(0.1)
+    assert [cmd for dev, cmd in sent if dev == "cur_001"] == ["CMO,MOTOR,1", "CMO,MOTOR,2", "CMO,MOTOR,3"]
+    assert processor.lanes.stats()["ele_001"]["depth"] == 2
+    print("✓ 엘리베이터 적체와 관계없이 커튼 명령 전송")
+    
+    time.sleep(0.6)
+    assert [cmd for dev, cmd in sent if dev == "ele_001"] == ["CMO,FLOOR,1", "CMO,FLOOR,2", "CMO,FLOOR,3"]
+    print(f"✓ 디바이스 내 순서 유지 (lanes: {processor.lanes.stats()})")
+    
+    processor.stop()
+    thread.join(timeout=2)
+
+
+def test_ack_correlation():
+    """seq 기반 ACK 매칭 테스트"""
+    print("\n[TEST 21] seq 기반 ACK 매칭 테스트")
+    print("=" * 60)
+    
+    # 파서: 기존 3필드 / seq 4필드 모두 지원
+    assert SerialParser.parse("ACK,FLOOR,2", "ele_001").seq is None
+    assert SerialParser.parse("ACK,FLOOR,2,7", "ele_001").seq == 7
+    assert SerialParser.parse("SEN,TEM,25,1", "dht_001") is None
+    print("✓ ACK 4번째 필드 seq 파싱")
+    
+    mock_monitor = Mock()
+    mock_monitor.send_command.return_value = True
+    processor = QueueProcessor(Queue(), {"ele_001": mock_monitor}, correlation_ids=True)
+    
+    first = CMORequest("ele_001", "FLOOR", "2", "CMO,FLOOR,2")
+    second = CMORequest("ele_001", "FLOOR", "3", "CMO,FLOOR,3")
+    processor._process_cmo(first)
+    processor._process_cmo(second)
+    mock_monitor.send_command.assert_called_with(f"CMO,FLOOR,3,{second.seq}")
+    assert len(processor.pending_requests["ele_001:FLOOR"]) == 2
+    print("✓ 같은 metric 명령 2개가 덮어쓰지 않고 모두 대기")
+    
+    # 두 번째 명령의 ACK가 먼저 와도 정확히 매칭
+    processor.handle_ack("ele_001", "FLOOR", second.seq)
+    assert list(processor.pending_requests["ele_001:FLOOR"].values()) == [first]
+    
+    # seq 없는 기존 형식 ACK는 가장 먼저 보낸 요청과 매칭
+    processor.handle_ack("ele_001", "FLOOR")
+    assert "ele_001:FLOOR" not in processor.pending_requests
+    assert len(processor.deadlines) == 0
+    print("✓ seq / 기존 형식 ACK 모두 올바른 요청과 매칭, 타임아웃 취소")
+
+
+def test_command_coalescing():
+    """명령 병합 테스트"""
+    print("\n[TEST 22] 명령 병합 테스트")
+    print("=" * 60)
+    
+    lanes = CommandLanes(CoalesceRules())
+    
+    # 버튼 연타: 같은 FLOOR 명령은 하나로
+    first = CMORequest("ele_001", "FLOOR", "2", "CMO,FLOOR,2")
+    assert lanes.put(first) is first
+    assert lanes.put(CMORequest("ele_001", "FLOOR", "2", "CMO,FLOOR,2")) is first
+    lanes.put(CMORequest("ele_001", "FLOOR", "3", "CMO,FLOOR,3"))
+    
+    # 커튼 OPEN 후 CLOSE: 대기 중인 OPEN은 CLOSE로 교체
+    lanes.put(CMORequest("cur_001", "MOTOR", "1", "CMO,MOTOR,1"))
+    lanes.put(CMORequest("cur_001", "MOTOR", "0", "CMO,MOTOR,0"))
+    
+    stats = lanes.stats()
+    assert stats["ele_001"]["depth"] == 2 and stats["ele_001"]["merged"] == 1
+    assert stats["cur_001"]["depth"] == 1 and stats["cur_001"]["superseded"] == 1
+    
+    commands = []
+    while True:
+        item = lanes.take(timeout=0)
+        if not item:
+            break
+        commands.append(item[1].command)
+        lanes.done(item[0])
+    assert sorted(commands) == ["CMO,FLOOR,2", "CMO,FLOOR,3", "CMO,MOTOR,0"]
+    print(f"✓ 중복 병합 / 대체 명령 교체 (stats: {lanes.stats()})")
+    
+    # 타임아웃된 OPEN의 재전송이 그 뒤에 보낸 CLOSE를 교체하면 안 됨
+    stale = CMORequest("cur_001", "MOTOR", "1", "CMO,MOTOR,1", timestamp=time.time() - 5)
+    close = CMORequest("cur_001", "MOTOR", "0", "CMO,MOTOR,0")
+    lanes.put(close)
+    assert lanes.put(stale) is stale and stale.future.result(timeout=0)['status'] == 'superseded'
+    assert not close.future.done() and lanes.stats()["cur_001"]["depth"] == 1
+    print("✓ 늦게 들어온 이전 명령(재전송)은 새 명령을 교체하지 않고 생략")
+
+
+def test_retry_and_circuit_breaker():
+    """재전송 / 서킷 브레이커 테스트"""
+    print("\n[TEST 23] 재전송 / 서킷 브레이커 테스트")
+    print("=" * 60)
+    
+    mock_monitor = Mock()
+    mock_monitor.send_command.return_value = True
+    processor = QueueProcessor(Queue(), {"ele_001": mock_monitor},
+                               retries=1, backoff_base=0.01, failure_threshold=2, guarded={"ele_001"},
+                               open_seconds=0.1, probe_commands={"ele_001": ("FLOOR", "1")})
+    
+    def dispatch_next():
+        device_id, queued = processor.lanes.take(timeout=0)
+        processor._process_cmo(queued)
+        processor.lanes.done(device_id)
+        return queued
+    
+    # 첫 타임아웃 -> 백오프 후 재전송
+    cmo = CMORequest("ele_001", "FLOOR", "2", "CMO,FLOOR,2", timeout=0.05)
+    processor._process_cmo(cmo)
+    time.sleep(0.06)
+    processor._check_pending_timeouts()
+    assert len(processor.retry_at) == 1
+    time.sleep(0.02)
+    processor._check_retries()
+    assert dispatch_next() is cmo and cmo.attempts == 2
+    print("✓ ACK 타임아웃 후 백오프 뒤 재전송")
+    
+    # 연속 실패 -> 브레이커 open, 이후 명령은 전송하지 않음
+    time.sleep(0.06)
+    processor._check_pending_timeouts()
+    assert len(processor.retry_at) == 0
+    assert processor.health.is_open("ele_001")
+    processor._process_cmo(CMORequest("ele_001", "FLOOR", "3", "CMO,FLOOR,3"))
+    assert mock_monitor.send_command.call_count == 2
+    print("✓ 연속 실패 시 브레이커 open, 전송 생략")
+    
+    # open_seconds 후 프로브 -> ACK 받으면 closed
+    time.sleep(0.11)
+    processor._send_probes()
+    processor._send_probes()
+    probe = dispatch_next()
+    assert probe.probe and processor.lanes.qsize() == 0
+    mock_monitor.send_command.assert_called_with("CMO,FLOOR,1")
+    processor.handle_ack("ele_001", "FLOOR")
+    
+    health = processor.health.stats()["ele_001"]
+    assert health["state"] == "closed" and not processor.health.is_open("ele_001")
+    assert health["failures"] == 2 and health["successes"] == 1 and health["score"] < 100
+    print(f"✓ 프로브 ACK 수신 후 closed (health: {health})")
+    
+    # guarded가 아닌 명령(출입문 MOTOR 등)은 타임아웃돼도 재전송 / 차단하지 않음
+    processor.monitors["ent_001"] = mock_monitor
+    for _ in range(3):
+        cmo = CMORequest("ent_001", "MOTOR", "1", "CMO,MOTOR,1", timeout=0.01)
+        processor._process_cmo(cmo)
+        time.sleep(0.02)
+        processor._check_pending_timeouts()
+        assert cmo.future.result(timeout=0)['status'] == 'timeout'
+    assert len(processor.retry_at) == 0 and not processor.health.is_open("ent_001")
+    print("✓ guarded가 아닌 명령은 재전송 / 차단 없이 timeout")
+    
+    # DEVICE:METRIC guard - half_open에서 guarded가 아닌 명령은 프로브 자리를 차지하지 않음
+    processor = QueueProcessor(Queue(), {"dht_001": mock_monitor}, failure_threshold=1,
+                               open_seconds=0.05, guarded=["dht_001:AIR"])
+    
+    def expire(cmo):
+        processor._process_cmo(cmo)
+        time.sleep(0.02)
+        processor._check_pending_timeouts()
+        return cmo.future.result(timeout=0)['status']
+    
+    assert expire(CMORequest("dht_001", "AIR", "1", "CMO,AIR,1", timeout=0.01)) == 'timeout'
+    assert processor.health.is_open("dht_001")
+    time.sleep(0.06)
+    assert expire(CMORequest("dht_001", "HEAT", "1", "CMO,HEAT,1", timeout=0.01)) == 'timeout'
+    air = CMORequest("dht_001", "AIR", "0", "CMO,AIR,0", timeout=0.5)
+    processor._process_cmo(air)
+    assert air.probe and not air.future.done()
+    processor.handle_ack("dht_001", "AIR")
+    assert processor.health.stats()["dht_001"]["state"] == "closed"
+    print("✓ guarded가 아닌 명령의 타임아웃으로 브레이커가 고착되지 않음")
+    
+    # 판정 없이 끝난 프로브(모니터 없음 등)는 자리를 반환
+    processor.health.record_failure("dht_001")
+    time.sleep(0.06)
+    processor.probe_commands = {"dht_001": ("AIR", "1")}
+    processor._send_probes()
+    del processor.monitors["dht_001"]
+    device_id, probe = processor.lanes.take(timeout=0)
+    processor._dispatch(device_id, probe)
+    assert probe.future.result(timeout=0)['status'] == 'error'
+    assert not processor.health.is_open("dht_001")
+    print("✓ acked / timeout 외 결과로 끝난 프로브는 자리 반환")
+
+
+def test_command_wait_for_ack():
+    """wait=true 명령 API 테스트"""
+    print("\n[TEST 24] wait=true 명령 API 테스트")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        app = SerialMonitorApp({'backend': SQLiteBackend(os.path.join(tmp, 'logs.db'))}, {})
+        processor = QueueProcessor(app.cmd_queue, app.monitors)
+        app.queue_processor = processor
+        
+        # FLOOR는 50ms 뒤 ACK, CANCEL은 응답 없음
+        def send_command(command):
+            if command.startswith("CMO,FLOOR"):
+                threading.Timer(0.05, processor.handle_ack, ("ele_001", "FLOOR")).start()
+            return True
+        mock_monitor = Mock()
+        mock_monitor.send_command.side_effect = send_command
+        app.monitors["ele_001"] = mock_monitor
+        
+        thread = threading.Thread(target=processor.run, daemon=True)
+        thread.start()
+        client = app.flask_app.test_client()
+        
+        response = client.post('/api/command', json={
+            'device_id': 'ele_001', 'metric_name': 'FLOOR', 'value': '2', 'wait': True
+        })
+        body = response.get_json()
+        assert response.status_code == 200 and body['status'] == 'acked'
+        assert body['rtt_ms'] >= 40
+        print(f"✓ ACK 수신 후 응답 (rtt: {body['rtt_ms']}ms)")
+        
+        response = client.post('/api/command?wait=true&timeout_ms=100', json={
+            'device_id': 'ele_001', 'metric_name': 'CANCEL', 'value': '1'
+        })
+        assert response.status_code == 504 and response.get_json()['status'] == 'pending'
+        print("✓ timeout_ms 안에 ACK가 없으면 504")
+        
+        # wait 없는 기존 호출은 바로 반환
+        response = client.post('/api/command', json={
+            'device_id': 'ele_001', 'metric_name': 'FLOOR', 'value': '3'
+        })
+        assert response.status_code == 200 and 'status' not in response.get_json()
+        
+        # 잘못된 timeout_ms는 큐에 넣기 전에 400 (명령을 보내지 않음)
+        time.sleep(0.05)
+        sent_before = mock_monitor.send_command.call_count
+        for query, timeout_ms in (('', 'abc'), ('', [1]), ('?timeout_ms=1.5', None)):
+            body = {'device_id': 'ele_001', 'metric_name': 'FLOOR', 'value': '4', 'wait': True}
+            if timeout_ms is not None:
+                body['timeout_ms'] = timeout_ms
+            response = client.post('/api/command' + query, json=body)
+            assert response.status_code == 400 and response.get_json()['success'] is False
+        time.sleep(0.05)
+        assert mock_monitor.send_command.call_count == sent_before and app.waiters.acquire(blocking=False)
+        app.waiters.release()
+        print("✓ 잘못된 timeout_ms는 명령을 보내지 않고 400")
+        
+        processor.stop()
+        thread.join(timeout=2)
+    
+    # 대체 / 병합된 요청도 결과가 확정됨
+    lanes = CommandLanes(CoalesceRules())
+    opening = CMORequest("cur_001", "MOTOR", "1", "CMO,MOTOR,1")
+    lanes.put(opening)
+    lanes.put(CMORequest("cur_001", "MOTOR", "0", "CMO,MOTOR,0"))
+    assert opening.future.result(timeout=0)['status'] == 'superseded'
+    
+    first = CMORequest("ele_001", "FLOOR", "2", "CMO,FLOOR,2")
+    duplicate = CMORequest("ele_001", "FLOOR", "2", "CMO,FLOOR,2")
+    duplicate.follow(first)
+    first.resolve('acked', rtt_ms=12.0)
+    assert duplicate.future.result(timeout=0)['merged'] is True
+    print("✓ 대체된 요청은 superseded, 병합된 요청은 남은 요청의 결과를 따름")
+
+
+def test_priority_lanes():
+    """우선순위 레인 테스트"""
+    print("\n[TEST 25] 우선순위 레인 테스트")
+    print("=" * 60)
+    
+    def drain(lanes):
+        commands = []
+        while True:
+            item = lanes.take(timeout=0)
+            if not item:
+                return commands
+            commands.append(f"{item[0]}:{item[1].command}")
+            lanes.done(item[0])
+    
+    assert PriorityRules().classify(CMORequest("ent_001", "MOTOR", "1", "CMO,MOTOR,1")) == "critical"
+    assert PriorityRules().classify(CMORequest("cur_001", "MOTOR", "1", "CMO,MOTOR,1")) == "background"
+    
+    # 자동화 트래픽이 쌓여 있어도 출입문 / 엘리베이터 취소가 먼저
+    lanes = CommandLanes()
+    for step in range(5):
+        lanes.put(CMORequest("cur_001", "MOTOR", str(step), f"CMO,MOTOR,{step}"))
+    lanes.put(CMORequest("dht_001", "AIR", "1", "CMO,AIR,1"))
+    lanes.put(CMORequest("ele_001", "FLOOR", "3", "CMO,FLOOR,3"))
+    lanes.put(CMORequest("ele_001", "CANCEL", "1", "CMO,CANCEL,1"))
+    lanes.put(CMORequest("ent_001", "MOTOR", "1", "CMO,MOTOR,1"))
+    lanes.put(CMORequest("dht_001", "HEAT", "1", "CMO,HEAT,1", priority="interactive"))
+    
+    commands = drain(lanes)
+    assert commands[:4] == ["ele_001:CMO,CANCEL,1", "ent_001:CMO,MOTOR,1",
+                            "ele_001:CMO,FLOOR,3", "dht_001:CMO,HEAT,1"]
+    assert [c for c in commands if c.startswith("cur_001")] == [f"cur_001:CMO,MOTOR,{i}" for i in range(5)]
+    stats = lanes.priority_stats()
+    assert stats["critical"]["dispatched"] == 2 and stats["background"]["dispatched"] == 6
+    print(f"✓ critical -> interactive -> background 순서, 클래스 안에서는 FIFO (stats: {stats})")
+    
+    # 기아 방지: 오래 기다린 background는 새 critical보다 먼저
+    lanes = CommandLanes(aging=0.1)
+    lanes.put(CMORequest("cur_001", "MOTOR", "1", "CMO,MOTOR,1"))
+    time.sleep(0.25)
+    lanes.put(CMORequest("ent_001", "MOTOR", "1", "CMO,MOTOR,1"))
+    assert drain(lanes) == ["cur_001:CMO,MOTOR,1", "ent_001:CMO,MOTOR,1"]
+    assert lanes.priority_stats()["background"]["max_wait_ms"] >= 250
+    print("✓ aging 시간만큼 기다린 명령은 승격되어 기아 없음")
+    
+    # aging=0: 승격 없이 클래스 순서 그대로
+    lanes = CommandLanes(aging=0)
+    lanes.put(CMORequest("cur_001", "MOTOR", "1", "CMO,MOTOR,1"))
+    time.sleep(0.01)
+    lanes.put(CMORequest("ent_001", "MOTOR", "1", "CMO,MOTOR,1"))
+    assert drain(lanes) == ["ent_001:CMO,MOTOR,1", "cur_001:CMO,MOTOR,1"]
+    print("✓ aging=0이면 승격 없음")
+
+
+def test_tx_shaper():
+    """송신 속도 제한 테스트"""
+    print("\n[TEST 26] 송신 속도 제한 테스트")
+    print("=" * 60)
+    
+    # 바이트 제한: 버스트(20바이트) 이후에는 1000바이트/초
+    shaper = TxShaper(byte_rate=1000, line_rate=1000, byte_burst=20, line_burst=100)
+    start = time.monotonic()
+    for _ in range(10):
+        assert shaper.acquire(10)
+    elapsed = time.monotonic() - start
+    assert 0.07 <= elapsed < 0.5
+    stats = shaper.stats()
+    assert stats['sent_bytes'] == 100 and stats['throttled'] >= 7 and stats['utilization'] > 0
+    print(f"✓ 100바이트 전송에 {elapsed * 1000:.0f}ms (stats: {stats})")
+    
+    # 줄 제한: 초당 50줄
+    shaper = TxShaper(byte_rate=1e6, line_rate=50, line_burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        shaper.acquire(5)
+    assert time.monotonic() - start >= 0.09
+    print("✓ 초당 명령 수 제한")
+    
+    # 대기 시간 안에 토큰이 없으면 거부
+    shaper = TxShaper(byte_rate=10, byte_burst=10)
+    assert shaper.acquire(10)
+    assert not shaper.acquire(10, timeout=0.05)
+    assert shaper.stats()['rejected'] == 1
+    print("✓ timeout 초과 시 전송 거부")
+
+
+def test_port_writer():
+    """포트 송신 스레드 테스트"""
+    print("\n[TEST 27] 포트 송신 스레드 테스트")
+    print("=" * 60)
+    
+    class SlowPort:
+        """write마다 50ms 걸리는 포트"""
+        is_open = True
+        
+        def __init__(self):
+            self.writes = []
+            self.fail = False
+        
+        def write(self, data):
+            time.sleep(0.05)
+            if self.fail:
+                raise OSError("USB 연결 끊김")
+            self.writes.append(data)
+        
+        def close(self):
+            self.is_open = False
+    
+    monitor = SerialMonitor("ele_001", "/dev/ttyTEST", Queue(), Mock(spec=DatabaseHandler),
+                            tx_line_rate=1000)
+    monitor.ser = SlowPort()
+    
+    # 포트가 느려도 호출자는 바로 반환
+    start = time.monotonic()
+    handles = [monitor.send_command("CMO,FLOOR,1")]
+    time.sleep(0.01)  # 첫 write 진행 중
+    handles += [monitor.send_command(cmd) for cmd in ("CMO,FLOOR,2", "CMO,FLOOR,3")]
+    assert time.monotonic() - start < 0.04 and all(handles)
+    assert all(handle.result(timeout=1) for handle in handles)
+    
+    # 첫 write 동안 쌓인 두 명령은 write 한 번으로
+    assert monitor.ser.writes == [b"CMO,FLOOR,1\n", b"CMO,FLOOR,2\nCMO,FLOOR,3\n"]
+    stats = monitor.writer.stats()
+    assert stats['batches'] == 2 and stats['coalesced'] == 1 and stats['max_latency_ms'] >= 50
+    print(f"✓ 즉시 반환 / 작은 write 병합 (writer: {stats})")
+    
+    # write 실패 -> 핸들이 거짓, QueueProcessor는 pending 정리
+    monitor.ser.fail = True
+    processor = QueueProcessor(Queue(), {"ele_001": monitor})
+    cmo = CMORequest("ele_001", "CANCEL", "1", "CMO,CANCEL,1")
+    processor._process_cmo(cmo)
+    result = cmo.future.result(timeout=1)
+    assert result['status'] == 'send_failed'
+    assert "ele_001:CANCEL" not in processor.pending_requests and len(processor.deadlines) == 0
+    print("✓ write 실패 시 요청 정리 및 send_failed")
+    
+    monitor.close()
+    
+    # 줄 버킷(버스트 2줄)을 넘는 명령은 한 write에 묶지 않음
+    monitor = SerialMonitor("ele_001", "/dev/ttyTEST", Queue(), Mock(spec=DatabaseHandler),
+                            tx_byte_rate=100000, tx_line_rate=20)
+    monitor.ser = SlowPort()
+    handles = [monitor.send_command(f"CMO,FLOOR,{i}") for i in range(5)]
+    assert all(handle.result(timeout=2) for handle in handles)
+    assert all(write.count(b"\n") <= 2 for write in monitor.ser.writes)
+    assert b"".join(monitor.ser.writes).count(b"\n") == 5
+    print(f"✓ 묶음은 줄 버킷 허용량 이내 (write {len(monitor.ser.writes)}회)")
+    monitor.close()
+    assert not monitor.send_command("CMO,FLOOR,1")
+    
+    # 속도 제한에 걸려도 밀린 명령은 레인에 남아 우선순위 적용 (송신 대기열에는 한 줄씩만)
+    monitor = SerialMonitor("ele_001", "/dev/ttyTEST", Queue(), Mock(spec=DatabaseHandler),
+                            tx_byte_rate=100000, tx_line_rate=20)
+    monitor.ser = SlowPort()
+    processor = QueueProcessor(Queue(), {"ele_001": monitor})
+    processor.running = True
+    processor._start_dispatchers()
+    floors = [CMORequest("ele_001", "FLOOR", str(i), f"CMO,FLOOR,{i}", timeout=0.3) for i in range(10)]
+    for cmo in floors:
+        processor._enqueue(cmo)
+    processor._enqueue(CMORequest("ele_001", "CANCEL", "1", "CMO,CANCEL,1"))
+    time.sleep(0.02)
+    assert processor.lanes.stats()["ele_001"]["depth"] >= 9 and monitor.writer.qsize() <= 1
+    
+    deadline = time.time() + 3
+    while len(monitor.ser.writes) < 11 and time.time() < deadline:
+        time.sleep(0.02)
+    lines = b"".join(monitor.ser.writes).split(b"\n")
+    assert lines.index(b"CMO,CANCEL,1") <= 2
+    print(f"✓ 속도 제한 중에도 critical 명령이 먼저 전송 ({lines.index(b'CMO,CANCEL,1') + 1}번째)")
+    
+    # ACK 타임아웃은 write가 끝난 시점부터 (송신 대기 중 만료 없음)
+    assert floors[-1].sent_at - floors[-1].timestamp >= 0.3
+    processor._check_pending_timeouts()
+    assert not floors[-1].future.done() and floors[0].future.result(timeout=0)['status'] == 'timeout'
+    print("✓ ACK 타임아웃은 실제 write 시점부터")
+    processor.stop()
+    monitor.close()
+
+
+def test_state_store():
+    """디바이스 / metric별 상태 저장소 테스트"""
+    print("\n[TEST 28] 디바이스 / metric별 상태 저장소 테스트")
+    print("=" * 60)
+    
+    store = StateStore()
+    store.update("ele_001", "SEN", "FLOOR", "2", 100.0)
+    store.update("dht_001", "SEN", "TEM", "25")
+    before = store.snapshot()
+    store.update("dht_001", "SEN", "TEM", "26")
+    store.update("cur_001", "ACK", "MOTOR", "1")
+    
+    # 폴링 사이에 들어온 값도 모두 남음
+    state = store.snapshot().to_dict()
+    assert state['devices']['ele_001']['FLOOR'] == {'data_type': 'SEN', 'value': '2', 'timestamp': 100.0, 'seq': 1}
+    assert state['devices']['dht_001']['TEM']['value'] == '26'
+    assert state['version'] == 4
+    
+    # 대시보드가 쓰는 기존 필드는 가장 최근 업데이트
+    assert (state['device_id'], state['data_type'], state['metric_name'], state['value']) == ("cur_001", "ACK", "MOTOR", "1")
+    print("✓ 디바이스 / metric별 최신 값 + 기존 단일 값 필드")
+    
+    # 이전 스냅샷은 변하지 않음
+    assert before.version == 2 and before.devices['dht_001']['TEM'].value == "25"
+    assert "cur_001" not in before.devices
+    try:
+        before.devices['dht_001'] = {}
+        assert False, "스냅샷이 수정됨"
+    except TypeError:
+        pass
+    print("✓ 스냅샷은 불변 (copy-on-write)")
+    
+    # 쓰는 중에 읽어도 스냅샷 내용은 항상 일관됨
+    def writer():
+        for i in range(2000):
+            store.update("dht_001", "SEN", "HUM", str(i))
+    thread = threading.Thread(target=writer)
+    thread.start()
+    while thread.is_alive():
+        snapshot = store.snapshot()
+        newest = max(state.seq for metrics in snapshot.devices.values() for state in metrics.values())
+        assert newest == snapshot.version
+    thread.join()
+    assert store.get("dht_001", "HUM").value == "1999"
+    print(f"✓ 동시 쓰기 중 일관된 스냅샷 (version: {store.snapshot().version})")
+
+
+def test_event_journal():
+    """이벤트 저널 / /api/events 테스트"""
+    print("\n[TEST 29] 이벤트 저널 / /api/events 테스트")
+    print("=" * 60)
+    
+    journal = EventJournal(capacity=5)
+    for i in range(3):
+        journal.append({'type': 'SEN', 'device_id': 'dht_001', 'metric_name': 'TEM', 'value': str(i)})
+    assert [e['seq'] for e in journal.read(0)] == [1, 2, 3]
+    assert [e['value'] for e in journal.read(2)] == ['2']
+    
+    # 용량을 넘으면 오래된 이벤트부터 밀려남
+    for i in range(3, 8):
+        journal.append({'type': 'SEN', 'device_id': 'dht_001', 'metric_name': 'TEM', 'value': str(i)})
+    assert journal.oldest() == 4 and journal.latest() == 8
+    assert [e['seq'] for e in journal.read(3)] == [4, 5, 6, 7, 8]
+    assert [e['seq'] for e in journal.read(None, limit=2)] == [4, 5]
+    try:
+        journal.read(2)
+        assert False, "밀려난 커서가 허용됨"
+    except CursorTooOld as e:
+        assert (e.oldest, e.latest) == (4, 8)
+    print("✓ 고정 크기 링 버퍼, 밀려난 커서는 CursorTooOld")
+    
+    # 수신 데이터 + CMO 전송 / 결과가 순서대로 기록
+    with tempfile.TemporaryDirectory() as tmp:
+        app = SerialMonitorApp({'backend': SQLiteBackend(os.path.join(tmp, 'logs.db'))}, {},
+                               journal_size=8)
+        mock_monitor = Mock()
+        mock_monitor.send_command.return_value = True
+        processor = QueueProcessor(app.cmd_queue, {"ele_001": mock_monitor})
+        processor.journal = app.journal
+        
+        monitor = SerialMonitor("ele_001", "/dev/ttyTEST", app.cmd_queue, Mock(spec=DatabaseHandler))
+        monitor.journal = app.journal
+        monitor.queue_processor = processor
+        
+        processor._enqueue(CMORequest("ele_001", "FLOOR", "2", "CMO,FLOOR,2"))
+        device_id, queued = processor.lanes.take(timeout=0)
+        processor._process_cmo(queued)
+        processor.lanes.done(device_id)
+        monitor._process_data("ACK,FLOOR,2")
+        
+        client = app.flask_app.test_client()
+        body = client.get('/api/events?since=0').get_json()
+        assert [(e['type'], e.get('status')) for e in body['events']] == [
+            ('CMO', 'sent'), ('ACK', None), ('CMO', 'acked')
+        ]
+        assert body['next'] == 3 and body['latest'] == 3 and not body['more']
+        
+        body = client.get('/api/events?since=1&limit=1').get_json()
+        assert [e['seq'] for e in body['events']] == [2] and body['more']
+        print("✓ /api/events since / limit 조회")
+        
+        for i in range(10):
+            monitor._process_data(f"ACK,FLOOR,{i}")
+        response = client.get('/api/events?since=1')
+        assert response.status_code == 410 and response.get_json()['oldest'] == 6
+        print("✓ 밀려난 커서는 410 (cursor too old)")
+        
+        # 전송 전에 대체된 명령도 결과 기록
+        processor.monitors["cur_001"] = mock_monitor
+        latest = app.journal.latest()
+        processor._enqueue(CMORequest("cur_001", "MOTOR", "1", "CMO,MOTOR,1"))
+        processor._enqueue(CMORequest("cur_001", "MOTOR", "0", "CMO,MOTOR,0"))
+        events = app.journal.read(latest)
+        assert [(e['value'], e['status']) for e in events] == [('1', 'superseded')]
+        print("✓ 대체된 명령은 superseded로 기록")
+
+
+def test_sse_stream():
+    """SSE 스트림 테스트"""
+    print("\n[TEST 30] SSE 스트림 테스트")
+    print("=" * 60)
+    
+    broadcaster = SSEBroadcaster(max_buffer=4, downsample_at=2)
+    fast = broadcaster.subscribe()
+    slow = broadcaster.subscribe()
+    journal = EventJournal(100, broadcaster)
+    
+    # 한 번 직렬화한 프레임을 모든 구독자가 공유
+    journal.append({'type': 'ACK', 'device_id': 'ele_001', 'metric_name': 'FLOOR', 'value': '2'})
+    (seq_a, frame_a), = fast.next_frames(0)
+    (seq_b, frame_b), = slow.next_frames(0)
+    assert seq_a == seq_b == 1 and frame_a is frame_b
+    assert frame_a.startswith(b"id: 1\nevent: ACK\ndata: {")
+    print("✓ 이벤트당 한 번 직렬화 후 공유")
+    
+    # 느린 클라이언트: 절반 이상 쌓이면 SEN 생략, 가득 차면 연결 종료
+    for i in range(4):
+        journal.append({'type': 'SEN', 'device_id': 'dht_001', 'metric_name': 'TEM', 'value': str(i)})
+        fast.next_frames(0)
+    assert len(slow.buffer) == 2 and slow.skipped == 2
+    for i in range(3):
+        journal.append({'type': 'ACK', 'device_id': 'ele_001', 'metric_name': 'FLOOR', 'value': str(i)})
+    assert slow.next_frames(0) is None and broadcaster.stats()['disconnected'] == 1
+    assert broadcaster.subscribers == (fast,)
+    print("✓ 느린 클라이언트 SEN 생략 후 버퍼 초과 시 연결 종료")
+    
+    # /api/stream: 저널에서 이어받은 뒤 새 이벤트 푸시
+    with tempfile.TemporaryDirectory() as tmp:
+        app = SerialMonitorApp({'backend': SQLiteBackend(os.path.join(tmp, 'logs.db'))}, {})
+        app.STREAM_KEEPALIVE = 0.05
+        app.journal.append({'type': 'SEN', 'device_id': 'dht_001', 'metric_name': 'TEM', 'value': '25'})
+        
+        response = app.flask_app.test_client().get('/api/stream', headers={'Last-Event-ID': '0'},
+                                                   buffered=False)
+        assert response.mimetype == 'text/event-stream'
+        chunks = iter(response.response)
+        assert next(chunks) == b"retry: 2000\n\n"
+        assert b'"value":"25"' in next(chunks)
+        
+        app.journal.append({'type': 'ACK', 'device_id': 'ele_001', 'metric_name': 'FLOOR', 'value': '3'})
+        chunk = next(chunks)
+        assert chunk.startswith(b"id: 2\nevent: ACK")
+        assert next(chunks) == b": keepalive\n\n"
+        assert app.broadcaster.stats()['subscribers'] == 1
+        
+        response.close()
+        assert app.broadcaster.stats()['subscribers'] == 0
+        print("✓ /api/stream Last-Event-ID 이어받기 + 실시간 푸시")
+        
+        # 서버 재시작 후 예전 커서로 재연결 -> reset 이후 새 이벤트는 seq가 작아도 전송
+        response = app.flask_app.test_client().get('/api/stream', headers={'Last-Event-ID': '5000'},
+                                                   buffered=False)
+        chunks = iter(response.response)
+        assert next(chunks) == b"retry: 2000\n\n"
+        assert next(chunks) == b"event: reset\ndata: 2\n\n"
+        app.journal.append({'type': 'ACK', 'device_id': 'ele_001', 'metric_name': 'FLOOR', 'value': '4'})
+        assert next(chunks).startswith(b"id: 3\nevent: ACK")
+        response.close()
+        print("✓ 이어받을 수 없는 커서는 reset 후 새 이벤트부터 전송")
+
+
+def test_state_conditional_get():
+    """/api/state ETag / long-poll 테스트"""
+    print("\n[TEST 31] /api/state ETag / long-poll 테스트")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        app = SerialMonitorApp({'backend': SQLiteBackend(os.path.join(tmp, 'logs.db'))}, {})
+        client = app.flask_app.test_client()
+        app.system_state.update("ele_001", "SEN", "FLOOR", "1")
+        
+        response = client.get('/api/state')
+        assert response.status_code == 200 and response.headers['ETag'] == '"v1"'
+        assert response.get_json()['metric_name'] == "FLOOR"
+        
+        # 변경 없음 -> 304, 본문 없음
+        response = client.get('/api/state', headers={'If-None-Match': '"v1"'})
+        assert response.status_code == 304 and response.data == b''
+        print("✓ If-None-Match가 현재 버전이면 304")
+        
+        # long-poll: 변경되면 바로 응답
+        threading.Timer(0.1, app.system_state.update, ("ele_001", "SEN", "FLOOR", "2")).start()
+        start = time.monotonic()
+        response = client.get('/api/state?wait_ms=2000', headers={'If-None-Match': '"v1"'})
+        elapsed = time.monotonic() - start
+        assert response.status_code == 200 and response.headers['ETag'] == '"v2"'
+        assert response.get_json()['value'] == "2" and 0.08 <= elapsed < 1.5
+        print(f"✓ long-poll 중 변경되면 즉시 응답 ({elapsed * 1000:.0f}ms)")
+        
+        # long-poll: 변경 없이 wait_ms 경과 -> 304
+        start = time.monotonic()
+        response = client.get('/api/state?wait_ms=100', headers={'If-None-Match': '"v2"'})
+        assert response.status_code == 304 and time.monotonic() - start >= 0.09
+        print("✓ wait_ms 동안 변경 없으면 304")
+
+
+def test_production_server():
+    """production(waitress) 서버 모드 테스트"""
+    print("\n[TEST 32] production 서버 모드 테스트")
+    print("=" * 60)
+    
+    import http.client
+    import socket
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        app = SerialMonitorApp({'backend': SQLiteBackend(os.path.join(tmp, 'logs.db'))}, {})
+        assert app.server_config['mode'] == 'dev' and app.server_config['port'] == 5000
+        print("✓ 기본값은 개발 서버")
+        
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        
+        app = SerialMonitorApp(
+            {'backend': SQLiteBackend(os.path.join(tmp, 'logs.db'))}, {},
+            server_config={'mode': 'production', 'host': '127.0.0.1', 'port': port, 'threads': 4}
+        )
+        assert app.server_config['threads'] == 4 and app.server_config['backlog'] == 1024
+        print("✓ 지정한 값만 덮어씀")
+        
+        # 스레드를 점유하는 요청은 종류별로 스레드의 1/4까지 (8 스레드 -> 2개씩)
+        capped = SerialMonitorApp({'backend': SQLiteBackend(os.path.join(tmp, 'logs.db'))}, {},
+                                  max_waiters=256, server_config={'threads': 8})
+        assert capped.waiters.acquire(blocking=False) and capped.waiters.acquire(blocking=False)
+        assert not capped.waiters.acquire(blocking=False)
+        client = capped.flask_app.test_client()
+        streams = [client.get('/api/stream', buffered=False) for _ in range(2)]
+        assert [r.status_code for r in streams] == [200, 200]
+        assert client.get('/api/stream', buffered=False).status_code == 503
+        streams[0].close()
+        assert capped.broadcaster.stats()['subscribers'] == 1
+        third = client.get('/api/stream', buffered=False)
+        assert third.status_code == 200
+        third.close()
+        streams[1].close()
+        print("✓ wait=true / long-poll / SSE는 각각 HTTP 스레드의 1/4까지")
+        
+        app.system_state.update("ele_001", "SEN", "FLOOR", "3")
+        server = app._create_production_server()
+        assert server is not None
+        errors = []
+        previous_hook = threading.excepthook
+        threading.excepthook = lambda args: errors.append(args.exc_value)
+        app.http_running = True
+        thread = threading.Thread(target=app._serve_production, args=(server,), daemon=True)
+        thread.start()
+        
+        try:
+            # keep-alive 연결 하나로 여러 요청
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            for _ in range(3):
+                conn.request('GET', '/api/state')
+                response = conn.getresponse()
+                body = response.read()
+                assert response.status == 200 and b'"FLOOR"' in body
+            assert response.getheader('Server') == 'iot-serial-monitor'
+            print("✓ waitress로 /api/state 응답 (keep-alive 재사용)")
+            
+            # keep-alive 연결이 열린 채로 종료해도 서버 스레드가 스스로 정리
+            app.http_running = False
+            thread.join(timeout=2)
+            assert not thread.is_alive() and not errors
+            assert not server._map
+            conn.close()
+            print("✓ 연결이 남아 있어도 서버 스레드에서 정리 후 종료")
+        finally:
+            app.http_running = False
+            thread.join(timeout=2)
+            threading.excepthook = previous_hook
+
+
+def test_history_downsampling():
+    """/api/history 다운샘플링 테스트"""
+    print("\n[TEST 33] /api/history 다운샘플링 테스트")
+    print("=" * 60)
+    
+    import math
+    import numpy as np
+    from datetime import datetime
+    from history import build_series
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        app = SerialMonitorApp({'backend': SQLiteBackend(os.path.join(tmp, 'logs.db'))}, {})
+        app.db_handler.connect()
+        client = app.flask_app.test_client()
+        
+        # 5000개 (1초 간격, 사인파) + 숫자가 아닌 값 하나
+        start = time.time() - 6000
+        rows = [(f"k{i}", "dht_001", "SEN", "TEM", str(20 + 5 * math.sin(i / 100)),
+                 datetime.fromtimestamp(start + i)) for i in range(5000)]
+        rows.append(("bad", "dht_001", "SEN", "TEM", "ERR", datetime.fromtimestamp(start + 10.5)))
+        app.db_handler.backend.write_rows(rows)
+        
+        query = f'/api/history?device_id=dht_001&metric=TEM&from={start}&to={start + 5000}'
+        
+        body = client.get(query + '&max_points=100').get_json()
+        assert body['raw_points'] == 5000 and body['downsampled'] == 'minmax'
+        assert body['points'] == len(body['t']) <= 100 and sum(body['count']) == 5000
+        assert min(body['min']) >= 15 and max(body['max']) <= 25
+        assert all(lo <= avg <= hi for lo, avg, hi in zip(body['min'], body['avg'], body['max']))
+        print(f"✓ minmax: 5000 -> {body['points']}개 구간 (min / max / avg / count)")
+        
+        body = client.get(query + '&max_points=100&method=lttb').get_json()
+        assert body['points'] == 100 and body['downsampled'] == 'lttb'
+        assert body['t'][0] == round(start, 3) and body['t'] == sorted(body['t'])
+        print("✓ lttb: 5000 -> 100개 점 (첫 / 마지막 점 포함, 시각순)")
+        
+        # lttb는 3점 미만이면 minmax로 대체 (max_points 상한 유지)
+        body = client.get(query + '&max_points=2&method=lttb').get_json()
+        assert body['downsampled'] == 'minmax' and body['points'] <= 2
+        series = build_series(np.arange(1000.0), np.arange(1000.0), 2, 'lttb')
+        assert series['points'] == 2 and series['downsampled'] == 'minmax'
+        print("✓ lttb max_points < 3이면 minmax로 대체")
+        
+        # 구간 일부 + max_points 이하면 원본 그대로
+        body = client.get(f'/api/history?device_id=dht_001&metric=TEM'
+                          f'&from={start + 100}&to={start + 199}').get_json()
+        assert body['downsampled'] is None and body['points'] == 100 and len(body['value']) == 100
+        print("✓ max_points 이하면 원본 반환")
+        
+        assert client.get('/api/history?device_id=dht_001').status_code == 400
+        assert client.get(query + '&method=median').status_code == 400
+        assert client.get('/api/history?device_id=dht_001&metric=TEM&from=yesterday').status_code == 400
+        for bad in ('from=nan', 'to=1e20', 'from=-1e15', 'to=inf', f'from={start + 10}&to={start}'):
+            response = client.get(f'/api/history?device_id=dht_001&metric=TEM&{bad}')
+            assert response.status_code == 400 and response.get_json()['success'] is False, bad
+        
+        # 0은 생략이 아니라 1970-01-01
+        body = client.get('/api/history?device_id=dht_001&metric=TEM&from=0&to=0').get_json()
+        assert body['from'] == 0 and body['to'] == 0 and body['raw_points'] == 0
+        print("✓ 잘못된 파라미터는 400")
+        
+        app.db_handler.close()
+
+
+def test_history_ring_buffer():
+    """최근 이력 링 버퍼 테스트"""
+    print("\n[TEST 34] 최근 이력 링 버퍼 테스트")
+    print("=" * 60)
+    
+    import numpy as np
+    from datetime import datetime
+    from ring_buffer import MetricRing, RingBufferStore
+    
+    # 가득 차면 가장 오래된 값부터 덮어씀
+    ring = MetricRing(5)
+    for i in range(8):
+        ring.append(100.0 + i, float(i))
+    assert len(ring) == 5 and ring.oldest() == 103.0
+    times, values = ring.window(105, 107)
+    assert times.tolist() == [105.0, 106.0, 107.0] and values.tolist() == [5.0, 6.0, 7.0]
+    assert np.shares_memory(times, ring.times)
+    print("✓ 링 경계에 걸치지 않은 구간은 복사 없이 view")
+    times, values = ring.window(0, 1000)
+    assert times.tolist() == [103.0, 104.0, 105.0, 106.0, 107.0]
+    print("✓ 경계에 걸친 구간은 시각순으로 이어 붙임")
+    
+    # 수신 워커가 계속 덮어쓰는 중에 읽어도 구간 / 순서가 섞이지 않음
+    ring = MetricRing(50)
+    stop = threading.Event()
+    
+    def writer():
+        i = 0
+        while not stop.is_set():
+            ring.append(float(i), float(i))
+            i += 1
+    
+    thread = threading.Thread(target=writer, daemon=True)
+    thread.start()
+    try:
+        for _ in range(2000):
+            times, values, oldest = ring.read(0, 1e12)
+            if len(times):
+                assert (np.diff(times) == 1).all() and (times == values).all() and times[0] == oldest
+    finally:
+        stop.set()
+        thread.join()
+    print("✓ 쓰기 중 read()는 일관된 복사본")
+    
+    # 메모리 예산: metric 2개분만 -> 세 번째는 버퍼 없이 DB에서만 조회
+    store = RingBufferStore(capacity=10, memory_budget=2 * 10 * 16)
+    for metric in ("TEM", "HUM", "LIGHT"):
+        store.append("dht_001", metric, 1.0, "1")
+    store.append("dht_001", "TEM", 2.0, "ERR")
+    stats = store.stats()
+    assert stats['metrics'] == 2 and stats['untracked'] == 1 and stats['memory_bytes'] <= 320
+    assert store.get("dht_001", "LIGHT") is None and len(store.get("dht_001", "TEM")) == 1
+    print("✓ 메모리 예산을 넘는 metric은 버퍼를 만들지 않음")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        app = SerialMonitorApp({'backend': SQLiteBackend(os.path.join(tmp, 'logs.db'))}, {},
+                               history_capacity=100)
+        app.db_handler.connect()
+        client = app.flask_app.test_client()
+        
+        # 수신 SEN은 링 버퍼에도 들어감
+        monitor = SerialMonitor("dht_001", "/dev/ttyTEST", app.cmd_queue, Mock(spec=DatabaseHandler))
+        monitor.history = app.history
+        monitor._process_data("SEN,TEM,23.5")
+        assert len(app.history.get("dht_001", "TEM")) == 1
+        print("✓ SEN 수신 시 링 버퍼에 추가")
+        
+        # DB에는 200개, 링 버퍼에는 최근 100개
+        now = time.time()
+        app.history = RingBufferStore(capacity=100)
+        start = now - 200
+        rows = [(f"k{i}", "dht_001", "SEN", "HUM", str(i), datetime.fromtimestamp(start + i)) for i in range(200)]
+        app.db_handler.backend.write_rows(rows)
+        for i in range(100, 200):
+            app.history.append("dht_001", "HUM", start + i, str(i))
+        
+        query = '/api/history?device_id=dht_001&metric=HUM&max_points=1000'
+        body = client.get(query + f'&from={start + 150}&to={now}').get_json()
+        assert body['source'] == 'memory' and body['value'] == [float(i) for i in range(150, 200)]
+        print("✓ 버퍼 안의 구간은 메모리에서만 조회")
+        
+        body = client.get(query + f'&from={start}&to={now}').get_json()
+        assert body['source'] == 'memory+db' and body['value'] == [float(i) for i in range(200)]
+        rows = app.db_handler.read_series("dht_001", "HUM", start, start + 100, include_end=False)
+        assert rows[-1][1] == "99"
+        print("✓ 버퍼 이전 구간만 DB에서 이어 붙임")
+        
+        body = client.get(query.replace('HUM', 'TEM') + '&from=0').get_json()
+        assert body['source'] == 'db'
+        assert client.get('/api/health').get_json()['history']['metrics'] == 1
+        
+        app.db_handler.close()
+
+
 def run_all_tests():
     """모든 테스트 실행"""
     print("\n" + "=" * 60)
@@ -311,6 +1714,31 @@ def run_all_tests():
         test_serial_monitor_cmd_handling()
         test_serial_monitor_sen_handling()
         test_end_to_end_flow()
+        test_serial_reader_dispatch()
+        test_async_queue_processor()
+        test_line_framer()
+        test_ingest_pipeline()
+        test_ingest_buffer_policies()
+        test_database_batch_writer()
+        test_connection_pool()
+        test_database_spool()
+        test_sqlite_backend()
+        test_deadline_scheduler()
+        test_device_lanes()
+        test_ack_correlation()
+        test_command_coalescing()
+        test_retry_and_circuit_breaker()
+        test_command_wait_for_ack()
+        test_priority_lanes()
+        test_tx_shaper()
+        test_port_writer()
+        test_state_store()
+        test_event_journal()
+        test_sse_stream()
+        test_state_conditional_get()
+        test_production_server()
+        test_history_downsampling()
+        test_history_ring_buffer()
         
         print("\n" + "=" * 60)
         print("✅ 모든 테스트 통과!")
@@ -0,0 +1,159 @@
+# writer.py
+"""포트별 송신 스레드"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from shaper import TxShaper
+
+
+class WriteHandle(Future):
+    """
+    send_command 완료 핸들 - 결과는 전송 성공 여부 (bool)
+    전송 실패가 확정되기 전까지는 참이므로 기존 `if send_command(...)` 호출도 동작
+    """
+
+    def __bool__(self) -> bool:
+        return not self.done() or bool(self.result())
+
+    @classmethod
+    def failed(cls) -> 'WriteHandle':
+        handle = cls()
+        handle.set_result(False)
+        return handle
+
+
+class PortWriter:
+    """
+    포트 하나의 송신 대기열 + 송신 스레드
+    - 호출자는 submit()에서 바로 핸들을 받고, 실제 write는 이 스레드에서만 수행
+    - 대기 중인 짧은 명령들은 max_batch 바이트까지 모아 write 한 번으로 전송
+      (속도 제한이 있으면 줄 버킷에 남은 줄 수까지만 - 펌웨어는 loop 한 번에 명령 하나씩 처리)
+    - 속도 제한(TxShaper)은 묶음 단위로 적용
+    """
+
+    def __init__(self, name: str, write_fn: Callable[[bytes], object],
+                 shaper: Optional[TxShaper] = None, tx_timeout: Optional[float] = 5.0,
+                 max_batch: int = TxShaper.ARDUINO_RX_BUFFER):
+        self.name = name
+        self.write_fn = write_fn
+        self.shaper = shaper
+        self.tx_timeout = tx_timeout
+        self.max_batch = max_batch
+
+        self.pending = deque()  # (data, handle, 등록 시각)
+        self.cond = threading.Condition()
+        self.running = False
+        self.thread = None
+
+        self.batches = 0
+        self.writes = 0
+        self.failed = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.latency_last = 0.0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True, name=f"Writer-{self.name}")
+        self.thread.start()
+
+    def submit(self, data: bytes) -> WriteHandle:
+        """송신 요청 - 완료 핸들 즉시 반환"""
+        if not self.running:
+            return WriteHandle.failed()
+
+        handle = WriteHandle()
+        with self.cond:
+            self.pending.append((data, handle, time.monotonic()))
+            self.cond.notify()
+        return handle
+
+    def _next_batch(self) -> list:
+        """대기열에서 max_batch 바이트까지 꺼냄 (없으면 빈 목록)"""
+        with self.cond:
+            while self.running and not self.pending:
+                self.cond.wait(0.5)
+            if not self.pending:
+                return []
+
+            max_lines = self.shaper.line_allowance() if self.shaper else len(self.pending)
+            batch = [self.pending.popleft()]
+            size = len(batch[0][0])
+            while (self.pending and len(batch) < max_lines
+                   and size + len(self.pending[0][0]) <= self.max_batch):
+                item = self.pending.popleft()
+                batch.append(item)
+                size += len(item[0])
+            return batch
+
+    def _run(self):
+        while self.running:
+            batch = self._next_batch()
+            if batch:
+                self._write_batch(batch)
+
+    def _write_batch(self, batch: list):
+        data = b''.join(item[0] for item in batch)
+
+        ok = True
+        if self.shaper and not self.shaper.acquire(len(data), len(batch), self.tx_timeout):
+            print(f"[ERROR] {self.name} 송신 대기 시간 초과 ({len(batch)}건)")
+            ok = False
+        else:
+            try:
+                self.write_fn(data)
+            except Exception as e:
+                print(f"[ERROR] {self.name} 전송 실패: {e}")
+                ok = False
+
+        now = time.monotonic()
+        with self.cond:
+            self.batches += 1
+            if ok:
+                self.writes += len(batch)
+                for _, _, queued_at in batch:
+                    latency = now - queued_at
+                    self.latency_total += latency
+                    self.latency_max = max(self.latency_max, latency)
+                    self.latency_last = latency
+            else:
+                self.failed += len(batch)
+
+        for _, handle, _ in batch:
+            handle.set_result(ok)
+
+    def qsize(self) -> int:
+        with self.cond:
+            return len(self.pending)
+
+    def stats(self) -> dict:
+        """송신 대기 수 / 묶음 수 / write 지연 (ms)"""
+        with self.cond:
+            return {
+                'queued': len(self.pending),
+                'writes': self.writes,
+                'batches': self.batches,
+                'coalesced': max(0, self.writes + self.failed - self.batches),
+                'failed': self.failed,
+                'avg_latency_ms': round(self.latency_total / self.writes * 1000, 1) if self.writes else 0.0,
+                'max_latency_ms': round(self.latency_max * 1000, 1),
+                'last_latency_ms': round(self.latency_last * 1000, 1),
+            }
+
+    def stop(self, timeout: float = 1.0):
+        """송신 중지 - 남은 요청은 실패 처리"""
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        if self.thread:
+            self.thread.join(timeout=timeout)
+
+        with self.cond:
+            remaining = list(self.pending)
+            self.pending.clear()
+        for _, handle, _ in remaining:
+            handle.set_result(False)
@@ -764,17 +764,22 @@ class Ui_Dialog(object):
             self.polling_thread.join(timeout=2)
 
     def _poll_state(self):
-        """주기적으로 서버에서 상태 조회"""
+        """주기적으로 서버에서 상태 조회 (변경이 없으면 304, 변경될 때까지 최대 1초 대기)"""
+        etag = None
         while self.running:
             try:
                 response = requests.get(
                     f"{self.api_url}/api/state",
+                    params={'wait_ms': 1000},
+                    headers={'If-None-Match': etag} if etag else {},
                     timeout=2
                 )
-                state = response.json()
+                if response.status_code != 304:
+                    etag = response.headers.get('ETag')
+                    state = response.json()
 
-                # UI 업데이트
-                self.handle_serial_data(state)
+                    # UI 업데이트
+                    self.handle_serial_data(state)
 
             except requests.RequestException as e:
                 print(f"[ERROR] 상태 조회 실패: {e}")